@@ -0,0 +1,71 @@
+import hashlib
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session
+from urllib.parse import unquote
+
+from database.database import get_db
+from database.models.models import ImageBlob, ImageThumbnail, Product
+from utilities.common import get_product_image_bytes
+
+router = APIRouter()
+
+# Blobs are content-addressed, so a URL always serves the same bytes
+BLOB_CACHE_CONTROL = "public, max-age=31536000, immutable"
+LEGACY_CACHE_CONTROL = "public, max-age=86400"
+MISSING_THUMBNAIL_CACHE_CONTROL = "public, max-age=300"
+
+
+def image_response(request: Request, data: bytes, etag: str, media_type: str, cache_control: str):
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=media_type, headers=headers)
+
+
+@router.get("/product")
+def get_product_image(request: Request, id_url: str = Query(..., alias="id_url"),
+                      session: Session = Depends(get_db)):
+    """
+    Image of a product stored in the legacy inline column, for rows scraped before the image cache.
+    """
+    try:
+        product = session.query(Product).filter(Product.id_url == unquote(id_url)).first()
+        data = get_product_image_bytes(product) if product else None
+        if not data:
+            raise HTTPException(status_code=404, detail="Image not found")
+        etag = f'"{hashlib.sha256(data).hexdigest()}"'
+        return image_response(request, data, etag, "image/png", LEGACY_CACHE_CONTROL)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logging.error(f"Error fetching product image: {e}")
+        raise HTTPException(status_code=500, detail="An error occurred while fetching the product image.")
+
+
+@router.get("/{image_hash}")
+def get_image(request: Request, image_hash: str, size: str = Query(None, pattern="^(list|detail)$"),
+              session: Session = Depends(get_db)):
+    """
+    Original image, or one of its pre-sized thumbnails when `size` is given.
+    """
+    etag = f'"{image_hash}-{size}"' if size else f'"{image_hash}"'
+    # The hash is the ETag: revalidations are answered without touching the database, the session
+    # only checks out a connection on its first query
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": BLOB_CACHE_CONTROL})
+
+    if size:
+        thumbnail = session.get(ImageThumbnail, (image_hash, size))
+        if thumbnail:
+            return image_response(request, thumbnail.data, etag, thumbnail.content_type, BLOB_CACHE_CONTROL)
+
+    blob = session.get(ImageBlob, image_hash)
+    if not blob:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if size:
+        # Thumbnail not generated yet: serve the original under its own ETag, briefly, so the
+        # thumbnail is picked up once backfill_images.py has created it
+        return image_response(request, blob.data, f'"{image_hash}"', blob.content_type, MISSING_THUMBNAIL_CACHE_CONTROL)
+    return image_response(request, blob.data, etag, blob.content_type, BLOB_CACHE_CONTROL)
@@ -1,21 +1,22 @@
 import logging
 from datetime import datetime
 
-from fastapi import HTTPException, APIRouter
-from sqlalchemy import func
+from fastapi import Depends, HTTPException, APIRouter
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer
 
-from database.database import SessionLocal
-from database.models.models import Product, OwnedProduct, ScrapeData
+from database.database import get_async_db, get_db
+from database.models.models import Product, OwnedProduct, LatestScrape
 from schemas.product import OwnedProductCreate
-from utilities.common import encode_product_image
+from utilities.common import get_product_image_url
+from utilities.cache import cache, owned_tag
 
 router = APIRouter()
 
 
 @router.post("/add_owned_products")
-async def add_owned_product(data: OwnedProductCreate):
-    session = SessionLocal()
-
+def add_owned_product(data: OwnedProductCreate, session: Session = Depends(get_db)):
     product = session.query(Product).filter_by(id_url=data.product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found in the database")
@@ -37,6 +38,7 @@ async def add_owned_product(data: OwnedProductCreate):
         session.add(owned_product)
         session.commit()
         session.refresh(owned_product)
+        cache.invalidate(owned_tag(product.product_type))
     except Exception as e:
         session.rollback()
         logging.error(f"Error adding owned product: {str(e)}")
@@ -46,45 +48,29 @@ async def add_owned_product(data: OwnedProductCreate):
 
 
 @router.get("/get_owned_products")
-def get_owned_products():
-    session = SessionLocal()
+async def get_owned_products(session: AsyncSession = Depends(get_async_db)):
     try:
         logging.info("Starting query to fetch owned products")
 
-        latest_scrapes = (
-            session.query(
-                ScrapeData.product_id_url,
-                func.max(ScrapeData.scrape_date).label("latest_date")
-            )
-            .group_by(ScrapeData.product_id_url)
-            .subquery()
-        )
-
-        products_with_owned_entries = (
-            session.query(
+        products_with_owned_entries = (await session.execute(
+            select(
                 Product,
+                Product.image.isnot(None).label("has_legacy_image"),
                 func.count(OwnedProduct.owned_product_id).label("owned_entries_number"),
-                ScrapeData.min_price.label("current_min_price"),
-                ScrapeData.detailed_availability.label("current_availability"),
+                LatestScrape.min_price.label("current_min_price"),
+                LatestScrape.detailed_availability.label("current_availability"),
             )
+            .options(defer(Product.image))
             .join(OwnedProduct, Product.id_url == OwnedProduct.product_id)
-            .outerjoin(
-                latest_scrapes,
-                Product.id_url == latest_scrapes.c.product_id_url
-            )
-            .outerjoin(
-                ScrapeData,
-                (ScrapeData.product_id_url == latest_scrapes.c.product_id_url)
-                & (ScrapeData.scrape_date == latest_scrapes.c.latest_date),
-            )
+            .outerjoin(LatestScrape, Product.id_url == LatestScrape.product_id_url)
             .group_by(
                 Product.id_url,
-                ScrapeData.min_price,
-                ScrapeData.detailed_availability,
+                LatestScrape.min_price,
+                LatestScrape.detailed_availability,
                 Product.product_name,
                 Product.title,
                 Product.subtitle,
-                Product.image,
+                Product.image_hash,
                 Product.product_type,
                 Product.set_name,
                 Product.card_number,
@@ -94,9 +80,8 @@ def get_owned_products():
                 Product.pokemon_species,
                 Product.in_my_collection,
             )
-            .order_by(ScrapeData.min_price.desc())
-            .all()
-        )
+            .order_by(LatestScrape.min_price.desc())
+        )).all()
         logging.info(f"Query returned {len(products_with_owned_entries)} results")
 
         if not products_with_owned_entries:
@@ -104,11 +89,12 @@ def get_owned_products():
             raise HTTPException(status_code=404, detail="No owned products found")
 
         result = []
-        for product, owned_entries_number, current_min_price, current_availability in products_with_owned_entries:
+        for product, has_legacy_image, owned_entries_number, current_min_price, current_availability \
+                in products_with_owned_entries:
             result.append({
                 "id_url": product.id_url,
                 "title": product.title,
-                "image": encode_product_image(product.image),
+                "image_url": get_product_image_url(product.id_url, product.image_hash, has_legacy_image, "list"),
                 "language": product.language,
                 "set_name": product.set_name,
                 "in_my_collection": product.in_my_collection,
@@ -120,8 +106,8 @@ def get_owned_products():
         logging.info("Returning processed result")
         return result
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logging.error(f"Error in get_owned_products: {e}")
         raise HTTPException(status_code=500, detail="An error occurred")
-    finally:
-        session.close()
@@ -1,37 +1,53 @@
+import base64
+import json
 import logging
+from datetime import datetime
+from typing import Optional
 
-from fastapi import HTTPException, Query, APIRouter
+from fastapi import Depends, HTTPException, Query, APIRouter, Request, Response
 from urllib.parse import unquote
 
-from sqlalchemy import func
+from sqlalchemy import select, tuple_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
 
-from database.database import SessionLocal
-from database.models.models import Product, ScrapeData
-from utilities.common import encode_product_image
+from database.database import get_async_db
+from database.models.models import Product, LatestScrape, OwnedProduct, Offer
+from utilities.cache import cached_response, product_tag
+from utilities.common import get_product_image_url
+from utilities.price_history import get_bucketed_history, get_downsampled_history
 
 router = APIRouter()
 
+DETAIL_HISTORY_POINTS = 500
+MAX_HISTORY_POINTS = 5000
+
 
 @router.get("/product_detail")
-async def get_product_details(id_url: str = Query(..., alias="id_url")):
-    session = SessionLocal()
+async def get_product_details(id_url: str = Query(..., alias="id_url"),
+                              session: AsyncSession = Depends(get_async_db)):
     try:
         decoded_id_url = unquote(id_url)
         logging.info(f"Decoded id_url: {decoded_id_url}")
-        product = session.query(Product).filter(Product.id_url == decoded_id_url).first()
+        row = (await session.execute(
+            select(Product, Product.image.isnot(None).label("has_legacy_image"))
+            .options(defer(Product.image))
+            .filter(Product.id_url == decoded_id_url)
+        )).first()
 
-        if not product:
+        if not row:
             logging.error(f"Product not found for id_url: {decoded_id_url}")
             raise HTTPException(status_code=404, detail="Product not found")
+        product, has_legacy_image = row
 
-        all_scrapes = (
-            session.query(ScrapeData)
-            .filter_by(product_id_url=decoded_id_url)
-            .order_by(ScrapeData.scrape_date.desc())
-            .all()
+        # Bounded chart series, full resolution is available from /price_history
+        historical_scrapes = await session.run_sync(get_downsampled_history, decoded_id_url, DETAIL_HISTORY_POINTS)
+        historical_scrapes.reverse()
+        owned_products_count = await session.scalar(
+            select(func.count(OwnedProduct.owned_product_id)).filter(OwnedProduct.product_id == decoded_id_url)
         )
 
-        latest_scrape = all_scrapes[0] if all_scrapes else None  # Takes the last scrape by date
+        latest_scrape = await session.get(LatestScrape, decoded_id_url)
         latest_min_price = latest_scrape.min_price if latest_scrape else None
         latest_availability = latest_scrape.detailed_availability if latest_scrape else None
 
@@ -40,7 +56,7 @@ async def get_product_details(id_url: str = Query(..., alias="id_url")):
             "product_name": product.product_name,
             "title": product.title,
             "subtitle": product.subtitle,
-            "image": encode_product_image(product.image),
+            "image_url": get_product_image_url(product.id_url, product.image_hash, has_legacy_image, "detail"),
             "product_type": product.product_type,
             "set_name": product.set_name,
             "card_number": product.card_number,
@@ -51,129 +67,233 @@ async def get_product_details(id_url: str = Query(..., alias="id_url")):
             "current_min_price": latest_min_price,
             "current_availability": latest_availability,
             "in_my_collection": product.in_my_collection,
-            "owned_products_count": len(product.owned_products),
-            "historical_scrape_data": [
-                {
-                    "scrape_date": scrape.scrape_date,
-                    "avg_price": scrape.avg_price,
-                    "min_price": scrape.min_price,
-                    "max_price": scrape.max_price,
-                    "detailed_availability": scrape.detailed_availability,
-                    "total_availability": scrape.total_availability,
-                }
-                for scrape in all_scrapes
-            ],
+            "owned_products_count": owned_products_count,
+            "historical_scrape_data": historical_scrapes,
         }
 
         return product_data
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logging.error(f"Error fetching product details: {e}")
         raise HTTPException(status_code=500, detail="An error occurred while fetching the product details.")
-    finally:
-        session.close()
 
 
-@router.get("/singlesPokemon")
-async def get_singles_pokemon():
-    session = SessionLocal()
+@router.get("/price_history")
+async def get_price_history(id_url: str = Query(..., alias="id_url"),
+                            start: Optional[datetime] = None,
+                            end: Optional[datetime] = None,
+                            bucket: str = Query("day", pattern="^(day|week|raw)$"),
+                            max_points: int = Query(DETAIL_HISTORY_POINTS, ge=3, le=MAX_HISTORY_POINTS),
+                            session: AsyncSession = Depends(get_async_db)):
+    """
+    Price history of a product in [start, end): daily or weekly OHLC buckets computed in SQL, or
+    with bucket=raw the single scrapes downsampled with LTTB to at most `max_points`.
+    """
     try:
-        # Subquery to get the latest scrape date for each product
-        latest_scrapes = (
-            session.query(
-                ScrapeData.product_id_url,
-                func.max(ScrapeData.scrape_date).label("latest_date")
-            )
-            .group_by(ScrapeData.product_id_url)
-            .subquery()
-        )
+        decoded_id_url = unquote(id_url)
+        if bucket == "raw":
+            series = await session.run_sync(get_downsampled_history, decoded_id_url, max_points, start, end)
+        else:
+            series = await session.run_sync(get_bucketed_history, decoded_id_url, bucket, start, end)
+        return {"id_url": decoded_id_url, "bucket": bucket, "points": series}
+    except Exception as e:
+        logging.error(f"Error fetching price history: {e}")
+        raise HTTPException(status_code=500, detail="An error occurred while fetching the price history.")
 
-        # Join Product with the subquery and ScrapeData to fetch the latest scrape info
-        products_with_scrapes = (
-            session.query(
-                Product,
-                ScrapeData.min_price.label("current_min_price"),
-                ScrapeData.detailed_availability.label("current_availability"),
-            )
-            .join(latest_scrapes, Product.id_url == latest_scrapes.c.product_id_url)
-            .join(
-                ScrapeData,
-                (ScrapeData.product_id_url == latest_scrapes.c.product_id_url)
-                & (ScrapeData.scrape_date == latest_scrapes.c.latest_date),
-            )
-            .filter(Product.product_type == "Singles", Product.tcg_name == "Pokemon")
-            .order_by(ScrapeData.min_price.desc())
-            .all()
-        )
 
-        results = [
-            {
-                "id_url": product.id_url,
-                "title": product.title,
-                "image": encode_product_image(product.image),
-                "language": product.language,
-                "in_my_collection": product.in_my_collection,
-                "set_name": product.set_name,
-                "current_min_price": current_min_price,
-                "current_availability": current_availability,
-            }
-            for product, current_min_price, current_availability in products_with_scrapes
-        ]
-
-        return results
+@router.get("/offers")
+async def get_product_offers(id_url: str = Query(..., alias="id_url"), scrape_date: Optional[datetime] = None,
+                             session: AsyncSession = Depends(get_async_db)):
+    """
+    Offer table captured for a product, the most recent capture unless `scrape_date` is given.
+    """
+    try:
+        decoded_id_url = unquote(id_url)
+        if scrape_date is None:
+            scrape_date = await session.scalar(
+                select(func.max(Offer.scrape_date)).filter(Offer.product_id_url == decoded_id_url)
+            )
+        offers = (await session.scalars(
+            select(Offer)
+            .filter(Offer.product_id_url == decoded_id_url, Offer.scrape_date == scrape_date)
+            .order_by(Offer.position)
+        )).all()
+        return {
+            "id_url": decoded_id_url,
+            "scrape_date": scrape_date,
+            "total_quantity": sum(offer.quantity for offer in offers),
+            "offers": [
+                {
+                    "position": offer.position,
+                    "seller": offer.seller,
+                    "condition": offer.condition,
+                    "price": offer.price,
+                    "quantity": offer.quantity,
+                }
+                for offer in offers
+            ],
+        }
     except Exception as e:
-        logging.error(f"Error fetching singles Pokemon products: {e}")
-        raise HTTPException(status_code=500, detail="An error occurred while fetching singles Pokemon products.")
-    finally:
-        session.close()
+        logging.error(f"Error fetching product offers: {e}")
+        raise HTTPException(status_code=500, detail="An error occurred while fetching the product offers.")
 
 
-@router.get("/sealedPokemon")
-async def get_sealed_pokemon():
-    session = SessionLocal()
+# Columns that list endpoints can return through `fields=`
+LIST_COLUMNS = {
+    "id_url": Product.id_url,
+    "title": Product.title,
+    "language": Product.language,
+    "in_my_collection": Product.in_my_collection,
+    "set_name": Product.set_name,
+    "card_number": Product.card_number,
+    "pokemon_species": Product.pokemon_species,
+    "condition": Product.condition,
+    "current_min_price": LatestScrape.min_price,
+    "current_availability": LatestScrape.detailed_availability,
+    "current_avg_price": LatestScrape.avg_price,
+    "last_scrape_date": LatestScrape.scrape_date,
+}
+SINGLES_DEFAULT_FIELDS = ["id_url", "title", "image_url", "language", "in_my_collection", "set_name",
+                          "current_min_price", "current_availability"]
+SEALED_DEFAULT_FIELDS = ["id_url", "title", "image_url", "language", "in_my_collection",
+                         "current_min_price", "current_availability"]
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(min_price: float, id_url: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([min_price, id_url]).encode()).decode()
+
+
+def decode_cursor(cursor: str):
     try:
-        latest_scrapes = (
-            session.query(
-                ScrapeData.product_id_url,
-                func.max(ScrapeData.scrape_date).label("latest_date")
-            )
-            .group_by(ScrapeData.product_id_url)
-            .subquery()
-        )
+        min_price, id_url = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(min_price), str(id_url)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-        products_with_scrapes = (
-            session.query(
-                Product,
-                ScrapeData.min_price.label("current_min_price"),
-                ScrapeData.detailed_availability.label("current_availability"),
-            )
-            .join(latest_scrapes, Product.id_url == latest_scrapes.c.product_id_url)
-            .join(
-                ScrapeData,
-                (ScrapeData.product_id_url == latest_scrapes.c.product_id_url)
-                & (ScrapeData.scrape_date == latest_scrapes.c.latest_date),
-            )
-            .filter(Product.product_type != "Singles", Product.tcg_name == "Pokemon")
-            .order_by(ScrapeData.min_price.asc())
-            .all()
-        )
 
-        results = [
-            {
-                "id_url": product.id_url,
-                "title": product.title,
-                "image": encode_product_image(product.image),
-                "language": product.language,
-                "in_my_collection": product.in_my_collection,
-                "current_min_price": current_min_price,
-                "current_availability": current_availability,
-            }
-            for product, current_min_price, current_availability in products_with_scrapes
-        ]
-
-        return results
+def parse_fields(fields: Optional[str], default_fields: list) -> list:
+    if not fields:
+        return default_fields
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in LIST_COLUMNS and field != "image_url"]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+async def list_pokemon_products(session: AsyncSession, response: Response, singles: bool, descending: bool,
+                                default_fields: list, cursor: Optional[str], limit: Optional[int],
+                                set_name: Optional[str], language: Optional[str], species: Optional[str],
+                                min_price: Optional[float], max_price: Optional[float], fields: Optional[str]):
+    """
+    Keyset-paginated product listing ordered by (current min price, id_url).
+
+    Only the requested columns are selected. When `limit` is given and more rows follow,
+    the cursor of the next page is returned in the X-Next-Cursor header.
+    """
+    selected_fields = parse_fields(fields, default_fields)
+
+    columns = [LIST_COLUMNS["id_url"], LIST_COLUMNS["current_min_price"]]
+    columns += [LIST_COLUMNS[field] for field in selected_fields
+                if field in LIST_COLUMNS and LIST_COLUMNS[field] not in columns]
+    if "image_url" in selected_fields:
+        columns += [Product.image_hash, Product.image.isnot(None).label("has_legacy_image")]
+
+    query = (
+        select(*columns)
+        .select_from(Product)
+        .join(LatestScrape, Product.id_url == LatestScrape.product_id_url)
+        .filter(Product.tcg_name == "Pokemon")
+        .filter(Product.product_type == "Singles" if singles else Product.product_type != "Singles")
+    )
+    if set_name and singles:
+        query = query.filter(Product.set_name == set_name)
+    elif set_name:
+        # Sealed products carry no set name, their product name starts with it: Twilight-Masquerade-Booster-Box
+        query = query.filter(Product.product_name.startswith(set_name.replace(" ", "-"), autoescape=True))
+    if language:
+        query = query.filter(Product.language == language)
+    if species:
+        query = query.filter(Product.pokemon_species == species)
+    if min_price is not None:
+        query = query.filter(LatestScrape.min_price >= min_price)
+    if max_price is not None:
+        query = query.filter(LatestScrape.min_price <= max_price)
+
+    # Sorting on latest_scrapes columns only lets the (min_price, product_id_url) index serve the scan
+    sort_key = tuple_(LatestScrape.min_price, LatestScrape.product_id_url)
+    if cursor:
+        cursor_key = tuple_(*decode_cursor(cursor))
+        query = query.filter(sort_key < cursor_key if descending else sort_key > cursor_key)
+    if descending:
+        query = query.order_by(LatestScrape.min_price.desc(), LatestScrape.product_id_url.desc())
+    else:
+        query = query.order_by(LatestScrape.min_price.asc(), LatestScrape.product_id_url.asc())
+
+    rows = (await session.execute(query.limit(limit + 1) if limit else query)).all()
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].min_price, rows[-1].id_url)
+
+    results = []
+    for row in rows:
+        values = row._mapping
+        item = {}
+        for field in selected_fields:
+            if field == "image_url":
+                item[field] = get_product_image_url(values["id_url"], values["image_hash"],
+                                                    values["has_legacy_image"], "list")
+            else:
+                item[field] = values[LIST_COLUMNS[field]]
+        results.append(item)
+    return results
+
+
+@router.get("/singlesPokemon")
+async def get_singles_pokemon(request: Request,
+                              cursor: Optional[str] = None,
+                              limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                              set_name: Optional[str] = None,
+                              language: Optional[str] = None,
+                              species: Optional[str] = None,
+                              min_price: Optional[float] = None,
+                              max_price: Optional[float] = None,
+                              fields: Optional[str] = None,
+                              session: AsyncSession = Depends(get_async_db)):
+    def listing(response: Response):
+        return list_pokemon_products(session, response, True, True, SINGLES_DEFAULT_FIELDS, cursor, limit,
+                                     set_name, language, species, min_price, max_price, fields)
+
+    try:
+        return await cached_response(request, [product_tag("Singles", "Pokemon")], listing)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logging.error(f"Error fetching singles Pokemon products: {e}")
         raise HTTPException(status_code=500, detail="An error occurred while fetching singles Pokemon products.")
-    finally:
-        session.close()
+
+
+@router.get("/sealedPokemon")
+async def get_sealed_pokemon(request: Request,
+                             cursor: Optional[str] = None,
+                             limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                             set_name: Optional[str] = None,
+                             language: Optional[str] = None,
+                             min_price: Optional[float] = None,
+                             max_price: Optional[float] = None,
+                             fields: Optional[str] = None,
+                             session: AsyncSession = Depends(get_async_db)):
+    def listing(response: Response):
+        return list_pokemon_products(session, response, False, False, SEALED_DEFAULT_FIELDS, cursor, limit,
+                                     set_name, language, None, min_price, max_price, fields)
+
+    try:
+        return await cached_response(request, [product_tag("Sealed", "Pokemon")], listing)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logging.error(f"Error fetching sealed Pokemon products: {e}")
+        raise HTTPException(status_code=500, detail="An error occurred while fetching sealed Pokemon products.")
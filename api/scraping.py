@@ -1,100 +1,166 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 import asyncio
-import random
+import json
 import logging
 
 from typing import List
-from database.database import SessionLocal
+from sqlalchemy.orm import Session
+from database.database import get_db, session_scope
+from database.batch_writer import ScrapeBatchWriter
 from database.db_operations import save_product_data
+from scraping.jobs import ScrapeJobManager
+from scraping.refresh_policy import get_product_urls_to_scrape
+from scraping.resilience import ScrapeFailure
+from scraping.scheduler import ScrapeScheduler
 from scraping.scraper import fetch_product_data
-from utilities.common import get_url_partial_params, get_product_urls, get_product_urls_by_product_type
+from utilities.common import get_url_partial_params
 
 router = APIRouter()
 
+# Every job and bulk scrape writes through its own batch writer
+scrape_scheduler = ScrapeScheduler(fetch=fetch_product_data, writer_factory=ScrapeBatchWriter)
+job_manager = ScrapeJobManager(scrape_scheduler)
+
+JOB_STREAM_POLL_SECONDS = 1
+
+
+async def submit_scrape_job(product_urls: List[str], kind: str, queue: bool = False):
+    """
+    With `queue` the job is left to the worker.py processes instead of running in this one.
+    """
+    job_id = await job_manager.submit(product_urls, kind, "queue" if queue else "local")
+    return {"job_id": job_id, "total": len(set(product_urls)), "status_url": f"/api/scraping/jobs/{job_id}"}
+
+
+def load_product_urls(product_type: str = None, force: bool = False):
+    with session_scope() as session:
+        return get_product_urls_to_scrape(session, product_type, force)
+
+
+async def submit_due_scrape_job(product_type: str, kind: str, force: bool, queue: bool, not_found_detail: str):
+    product_urls, catalogue_size = await run_in_threadpool(load_product_urls, product_type, force)
+    if not catalogue_size:
+        raise HTTPException(status_code=404, detail=not_found_detail)
+    skipped = catalogue_size - len(product_urls)
+    if not product_urls:
+        return {"job_id": None, "total": 0, "skipped": skipped, "message": "No products are due for a refresh."}
+    return await submit_scrape_job(product_urls, kind, queue) | {"skipped": skipped}
+
 
 @router.get("/programmatic_scraping")
-async def programmatic_scraping():
-    session = SessionLocal()
-    try:
-        product_urls = get_product_urls(session)
-        if not product_urls:
-            raise HTTPException(status_code=404, detail="No product URLs found.")
-        return await scrape_bulk_products(product_urls)
-    finally:
-        session.close()
+async def programmatic_scraping(force: bool = False, queue: bool = False):
+    """
+    Starts a background job scraping every product due for a refresh, or every product with
+    force=true. With queue=true the job is run by the worker.py processes. Progress is available
+    under /jobs/{job_id}.
+    """
+    return await submit_due_scrape_job(None, "All", force, queue, "No product URLs found.")
 
 
 @router.get("/programmatic_scraping_singles")
-async def scrape_singles():
+async def scrape_singles(force: bool = False, queue: bool = False):
     """
-    Scrapes only Singles products.
+    Starts a background job scraping the Singles products due for a refresh.
     """
-    session = SessionLocal()
-    try:
-        product_urls = get_product_urls_by_product_type(session, "Singles")
-        if not product_urls:
-            raise HTTPException(status_code=404, detail="No Singles products found.")
-        return await scrape_bulk_products(product_urls)
-    finally:
-        session.close()
+    return await submit_due_scrape_job("Singles", "Singles", force, queue, "No Singles products found.")
 
 
 @router.get("/programmatic_scraping_sealed")
-async def scrape_sealed():
+async def scrape_sealed(force: bool = False, queue: bool = False):
     """
-    Scrapes only Sealed products.
+    Starts a background job scraping the Sealed products due for a refresh.
     """
-    session = SessionLocal()
-    try:
-        product_urls = get_product_urls_by_product_type(session, "Sealed")
-        if not product_urls:
-            raise HTTPException(status_code=404, detail="No Sealed products found.")
-        return await scrape_bulk_products(product_urls)
-    finally:
-        session.close()
+    return await submit_due_scrape_job("Sealed", "Sealed", force, queue, "No Sealed products found.")
 
 
 @router.post("/scrape")
-async def scrape_product(product_url: str):
-    session = SessionLocal()
+async def scrape_product(product_url: str, session: Session = Depends(get_db)):
     try:
         partial_params = get_url_partial_params(product_url)
-        product_data = fetch_product_data(partial_params)
-        save_product_data(session, product_data)
+        product_data = await run_in_threadpool(scrape_scheduler.fetch_with_retries, partial_params)
+        await run_in_threadpool(save_product_data, session, product_data)
 
         return {"message": f"Salvataggio di {product_data['title']} avvenuto con successo!"}
 
     except HTTPException as e:
         raise e
 
+    except ScrapeFailure as e:
+        raise HTTPException(status_code=502, detail=f"{e.kind}: {e}")
+
     except Exception as e:
         logging.error(e)
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
-    finally:
-        session.close()
-
 
 @router.post("/scrape_bulk")
 async def scrape_bulk_products(product_urls: List[str]):
-    session = SessionLocal()
-    results = []
-    try:
-        for product_url in product_urls:
-            try:
-                partial_params = get_url_partial_params(product_url)
-                product_data = fetch_product_data(partial_params)
-
-                save_product_data(session, product_data)
-                results.append({"product_url": product_url, "status": "success",
-                                "message": f"Salvataggio di {product_data['title']} avvenuto con successo!"})
-            except HTTPException as e:
-                results.append({"product_url": product_url, "status": "error", "message": str(e.detail)})
-            except Exception as e:
-                results.append(
-                    {"product_url": product_url, "status": "error", "message": "An unexpected error occurred"})
-            await asyncio.sleep(random.uniform(1, 2))
-
-        return {"results": results}
-    finally:
-        session.close()
+    results = await scrape_scheduler.run(product_urls)
+    return {"results": results}
+
+
+@router.get("/failures")
+async def get_scrape_failures():
+    """
+    Fetch counters of this process by outcome and failure kind, and the circuit breaker state.
+    """
+    breaker = scrape_scheduler.circuit_breaker
+    return scrape_scheduler.metrics.snapshot() | {
+        "circuit_breaker": {"open": breaker.remaining_pause() > 0, "pause_seconds": round(breaker.remaining_pause(), 1),
+                            "trips": breaker.trips},
+    }
+
+
+@router.post("/jobs")
+async def create_scrape_job(product_urls: List[str], queue: bool = False):
+    if not product_urls:
+        raise HTTPException(status_code=400, detail="No product URLs given.")
+    return await submit_scrape_job(product_urls, "Custom", queue)
+
+
+@router.get("/jobs/{job_id}")
+async def get_scrape_job(job_id: str):
+    status = await run_in_threadpool(job_manager.get_status, job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Scrape job not found.")
+    return status
+
+
+@router.get("/jobs/{job_id}/stream")
+async def stream_scrape_job(job_id: str):
+    """
+    Streams the job progress as newline-delimited JSON: one "item" event per finished URL
+    and a "progress" event with counters and throughput after every poll.
+    """
+    status = await run_in_threadpool(job_manager.get_status, job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Scrape job not found.")
+
+    async def events():
+        seen_items = set()
+        finished_since = None
+        while True:
+            status = await run_in_threadpool(job_manager.get_status, job_id, finished_since)
+            for item in status.pop("items"):
+                if item["item_id"] in seen_items:
+                    continue
+                seen_items.add(item["item_id"])
+                finished_since = item["finished_at"]
+                yield json.dumps({"event": "item", **item}, default=str) + "\n"
+            yield json.dumps({"event": "progress", **status}, default=str) + "\n"
+            if not status["running"]:
+                break
+            await asyncio.sleep(JOB_STREAM_POLL_SECONDS)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@router.post("/jobs/{job_id}/resume")
+async def resume_scrape_job(job_id: str):
+    if job_manager.is_running(job_id):
+        raise HTTPException(status_code=409, detail="Scrape job is already running.")
+    if not await job_manager.resume(job_id):
+        raise HTTPException(status_code=404, detail="Scrape job not found.")
+    return {"job_id": job_id, "status_url": f"/api/scraping/jobs/{job_id}"}
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import logging
 
-from database.database import SessionLocal
+from database.database import get_async_db
+from utilities.cache import cached_response, owned_tag, product_tag
 from utilities.common import get_total_current_price, get_total_bought_price
+from utilities.portfolio import PORTFOLIO_TAGS, get_portfolio_valuation
 
 router = APIRouter()
 
@@ -11,28 +14,35 @@ print("Statistics router loaded")
 
 
 @router.get("/total_singles_current_price")
-async def get_total_singles_current_price():
-    session = SessionLocal()
+async def get_total_singles_current_price(request: Request, session: AsyncSession = Depends(get_async_db)):
     try:
         logging.info("Fetching total current price for Singles")
-        total_price = get_total_current_price(session, "Singles")
-        return total_price
+        return await cached_response(request, [owned_tag("Singles"), product_tag("Singles")],
+                                     lambda response: get_total_current_price(session, "Singles"))
     except Exception as e:
         logging.error(f"Error fetching singles Pokemon products: {e}")
         raise HTTPException(status_code=500, detail="An error occurred while fetching singles Pokemon products.")
-    finally:
-        session.close()
 
 
 @router.get("/total_singles_bought_price")
-async def get_total_singles_bought_price():
-    session = SessionLocal()
+async def get_total_singles_bought_price(request: Request, session: AsyncSession = Depends(get_async_db)):
     try:
         logging.info("Fetching total bought price for Singles")
-        total_price = get_total_bought_price(session, "Singles")
-        return total_price
+        return await cached_response(request, [owned_tag("Singles")],
+                                     lambda response: get_total_bought_price(session, "Singles"))
     except Exception as e:
         logging.error(f"Error fetching singles Pokemon products: {e}")
         raise HTTPException(status_code=500, detail="An error occurred while fetching singles Pokemon products.")
-    finally:
-        session.close()
+
+
+@router.get("/portfolio")
+async def get_portfolio(request: Request, session: AsyncSession = Depends(get_async_db)):
+    """
+    Current value, cost basis and P&L of the owned products, per product type and per product.
+    """
+    try:
+        return await cached_response(request, PORTFOLIO_TAGS,
+                                     lambda response: get_portfolio_valuation(session))
+    except Exception as e:
+        logging.error(f"Error computing the portfolio valuation: {e}")
+        raise HTTPException(status_code=500, detail="An error occurred while computing the portfolio valuation.")
@@ -0,0 +1,89 @@
+"""
+Moves legacy products.image bytes into the content-addressed image store and generates the
+missing thumbnails of every stored image.
+
+    python backfill_images.py [--batch-size 100] [--clear-legacy]
+"""
+import argparse
+import logging
+
+from sqlalchemy import func
+
+from database.database import session_scope
+from database.models.models import ImageBlob, ImageThumbnail, Product
+from scraping.image_pipeline import THUMBNAIL_SIZES, open_image, store_image, store_thumbnails
+
+logging.basicConfig(level=logging.INFO)
+
+
+def backfill_legacy_product_images(batch_size: int, clear_legacy: bool):
+    migrated = 0
+    last_id_url = ""
+    with session_scope() as session:
+        while True:
+            products = (
+                session.query(Product)
+                .filter(Product.image.isnot(None), Product.image_hash.is_(None), Product.id_url > last_id_url)
+                .order_by(Product.id_url)
+                .limit(batch_size)
+                .all()
+            )
+            if not products:
+                break
+            for product in products:
+                image_hash = store_image(session, product.image, product.id_url)
+                if image_hash:
+                    product.image_hash = image_hash
+                    if clear_legacy:
+                        product.image = None
+                    migrated += 1
+                last_id_url = product.id_url
+            session.commit()
+            session.expunge_all()
+            logging.info(f"Migrated {migrated} legacy product images")
+    return migrated
+
+
+def backfill_missing_thumbnails(batch_size: int):
+    generated = 0
+    with session_scope() as session:
+        complete = {
+            image_hash for (image_hash,) in
+            session.query(ImageThumbnail.image_hash)
+            .group_by(ImageThumbnail.image_hash)
+            .having(func.count() >= len(THUMBNAIL_SIZES))
+        }
+        last_hash = ""
+        while True:
+            blobs = (
+                session.query(ImageBlob)
+                .filter(ImageBlob.image_hash > last_hash)
+                .order_by(ImageBlob.image_hash)
+                .limit(batch_size)
+                .all()
+            )
+            if not blobs:
+                break
+            for blob in blobs:
+                last_hash = blob.image_hash
+                if blob.image_hash in complete:
+                    continue
+                image = open_image(blob.data, blob.image_hash)
+                if image is not None:
+                    store_thumbnails(session, blob.image_hash, image)
+                    generated += 1
+            session.commit()
+            session.expunge_all()
+            logging.info(f"Generated thumbnails for {generated} images")
+    return generated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the image store and its thumbnails.")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--clear-legacy", action="store_true",
+                        help="Empty products.image once its bytes are in the image store")
+    args = parser.parse_args()
+
+    backfill_legacy_product_images(args.batch_size, args.clear_legacy)
+    backfill_missing_thumbnails(args.batch_size)
@@ -0,0 +1,204 @@
+"""
+Load-tests the listing, owned products and statistics endpoints on a synthetic catalogue: by
+default 50k products with two years of weekly scrapes. The catalogue is built once per database
+and reused by later runs unless --rebuild is given.
+
+    python -m benchmarks.api_benchmark [--database-url URL] [--products 50000] [--days 730]
+                                       [--requests 200] [--concurrency 8] [--output api.json]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlencode
+
+import httpx
+import numpy as np
+from sqlalchemy import func, insert
+
+from benchmarks.harness import DEFAULT_DATABASE_URL, bind_database, compare_results, print_results, write_results
+from database.database import SessionLocal
+from database.db_operations import upsert_latest_scrapes
+from database.models.models import Base, OwnedProduct, Product, ScrapeData
+from main import app
+from utilities.cache import cache
+
+SETS = ["Brilliant-Stars", "Lost-Origin", "Silver-Tempest", "Crown-Zenith", "Paldea-Evolved", "Obsidian-Flames",
+        "151", "Paradox-Rift", "Temporal-Forces", "Twilight-Masquerade", "Surging-Sparks", "Prismatic-Evolutions"]
+SPECIES = ["Pikachu", "Charizard", "Sylveon", "Umbreon", "Mew", "Gengar", "Eevee", "Lugia", "Rayquaza", "Gardevoir"]
+SEALED_TYPES = ["Booster-Boxes", "Elite-Trainer-Boxes", "Boosters"]
+# Products built and inserted per transaction
+CATALOGUE_CHUNK = 1000
+
+
+def product_row(index: int, rng) -> dict:
+    singles = index % 10 != 0
+    set_name = SETS[index % len(SETS)]
+    category = "Singles" if singles else SEALED_TYPES[index % len(SEALED_TYPES)]
+    product_name = f"{set_name}/Card-{index}" if singles else f"{set_name}-Product-{index}"
+    return {
+        "id_url": f"https://www.cardmarket.com/it/Pokemon/Products/{category}/{product_name}?language=5&minCondition=2",
+        "product_name": product_name,
+        "title": f"Card {index}" if singles else f"{set_name} Product {index}",
+        "subtitle": "",
+        "product_type": category,
+        "set_name": set_name if singles else "",
+        "card_number": str(index % 300) if singles else "",
+        "language": "5",
+        "condition": "2",
+        "tcg_name": "Pokemon",
+        "pokemon_species": SPECIES[int(rng.integers(len(SPECIES)))] if singles else "",
+        "in_my_collection": False,
+    }
+
+
+def scrape_rows(id_url: str, dates: list, rng) -> list:
+    """
+    A log-normal random walk of the min price with availability drifting around its start.
+    """
+    start_price = rng.lognormal(mean=1.5, sigma=1.2)
+    min_prices = start_price * np.exp(np.cumsum(rng.normal(0, 0.03, len(dates))))
+    availabilities = np.maximum(1, rng.integers(5, 400) + np.cumsum(rng.integers(-3, 4, len(dates))))
+    return [
+        {
+            "product_id_url": id_url,
+            "scrape_date": scrape_date,
+            "total_availability": int(availability) * 2,
+            "detailed_availability": int(availability),
+            "min_price": round(float(min_price), 2),
+            "max_price": round(float(min_price) * 6, 2),
+            "avg_price": round(float(min_price) * 1.8, 2),
+        }
+        for scrape_date, min_price, availability in zip(dates, min_prices, availabilities)
+    ]
+
+
+def build_catalogue(args):
+    rng = np.random.default_rng(args.seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    dates = [now - timedelta(days=day) for day in range(args.days, -1, -args.interval_days)]
+    owned_every = max(args.products // max(args.owned, 1), 1)
+    started = time.perf_counter()
+    for chunk_start in range(0, args.products, CATALOGUE_CHUNK):
+        products = [product_row(index, rng) for index in range(chunk_start, min(chunk_start + CATALOGUE_CHUNK,
+                                                                                  args.products))]
+        scrapes = [row for product in products for row in scrape_rows(product["id_url"], dates, rng)]
+        latest = {row["product_id_url"]: row for row in scrapes}
+        owned = [
+            {"product_id": product["id_url"], "owned_qty": int(rng.integers(1, 4)),
+             "buy_price": latest[product["id_url"]]["min_price"], "buy_date": dates[0], "buy_availability": 10}
+            for index, product in enumerate(products, chunk_start) if index % owned_every == 0
+        ]
+        session = SessionLocal()
+        try:
+            session.execute(insert(Product), products)
+            session.execute(insert(ScrapeData), scrapes)
+            upsert_latest_scrapes(session, list(latest.values()))
+            if owned:
+                session.execute(insert(OwnedProduct), owned)
+            session.commit()
+        finally:
+            session.close()
+        logging.warning(f"Catalogue: {chunk_start + len(products)}/{args.products} products "
+                        f"({time.perf_counter() - started:.0f}s)")
+
+
+def catalogue_size() -> int:
+    session = SessionLocal()
+    try:
+        return session.query(func.count(Product.id_url)).scalar()
+    finally:
+        session.close()
+
+
+async def load_test(client: httpx.AsyncClient, path: str, requests: int, concurrency: int, before=None) -> dict:
+    """
+    Send `requests` GETs with at most `concurrency` in flight; latencies in ms and overall throughput.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def one():
+        async with semaphore:
+            if before:
+                before()
+            started = time.perf_counter()
+            response = await client.get(path)
+            timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {path} returned {response.status_code}: {response.text[:200]}")
+
+    await client.get(path)  # warm up
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        "runs": requests,
+        "concurrency": concurrency,
+        "requests_per_second": round(requests / elapsed, 2),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "min_ms": round(timings[0], 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+async def run_benchmarks(args) -> dict:
+    session = SessionLocal()
+    try:
+        detail_url = session.query(Product.id_url).filter(Product.product_type == "Singles").first()[0]
+    finally:
+        session.close()
+
+    cases = {
+        "singlesPokemon": "/api/products/singlesPokemon",
+        "singlesPokemon[set_name]": f"/api/products/singlesPokemon?set_name={SETS[0]}",
+        "sealedPokemon": "/api/products/sealedPokemon",
+        "product_detail": f"/api/products/product_detail?{urlencode({'id_url': detail_url})}",
+        "get_owned_products": "/api/owned_products/get_owned_products",
+        "total_singles_current_price": "/api/statistics/total_singles_current_price",
+        "total_singles_bought_price": "/api/statistics/total_singles_bought_price",
+        "portfolio[cached]": "/api/statistics/portfolio",
+    }
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for case, path in cases.items():
+            results[case] = await load_test(client, path, args.requests, args.concurrency)
+        results["portfolio[cold]"] = await load_test(client, "/api/statistics/portfolio", max(args.requests // 10, 1),
+                                                     1, before=cache.clear)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the API on a synthetic catalogue.")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL.replace("benchmark", "api_benchmark"))
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--days", type=int, default=730, help="History length of every product")
+    parser.add_argument("--interval-days", type=int, default=7, help="Days between two scrapes of a product")
+    parser.add_argument("--owned", type=int, default=500, help="Owned products in the portfolio")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rebuild", action="store_true", help="Drop and rebuild the catalogue")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", type=Path, default=Path("api_benchmark.json"))
+    parser.add_argument("--baseline", type=Path, help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    engine = bind_database(args.database_url)
+    if args.rebuild:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+    if not catalogue_size():
+        build_catalogue(args)
+    results = asyncio.run(run_benchmarks(args))
+    print_results(results)
+    write_results(args.output, "api", vars(args) | {"catalogue_products": catalogue_size()}, results)
+    if args.baseline:
+        compare_results(results, args.baseline)
@@ -0,0 +1,123 @@
+import time
+
+from selenium.common import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from scraping.offers import COUNT_ROWS_SCRIPT, NEW_ROWS_SCRIPT
+from scraping.page_parser import make_soup
+from scraping.scraping_selectors import ScrapingSelectorsEnum
+
+# Parent of the offer rows, where "load more" appends them
+OFFER_TABLE_BODY = ".article-table .table-body"
+
+
+class FakeElement:
+    """
+    The part of a Selenium WebElement the scraper uses, over a parsed HTML element.
+    """
+
+    def __init__(self, element, on_click=None):
+        self.element = element
+        self.on_click = on_click
+
+    @property
+    def text(self) -> str:
+        return self.element.get_text(" ", strip=True)
+
+    def get_attribute(self, name: str):
+        return self.element.get(name)
+
+    def find_element(self, by, value):
+        return find_element(self.element, by, value)
+
+    def find_elements(self, by, value):
+        return find_elements(self.element, by, value)
+
+    def is_displayed(self) -> bool:
+        return True
+
+    def is_enabled(self) -> bool:
+        return True
+
+    def click(self):
+        if self.on_click:
+            self.on_click()
+
+
+def find_elements(root, by, value) -> list:
+    if by != By.CSS_SELECTOR:
+        raise NotImplementedError(f"FakeWebDriver only supports CSS selectors, not {by}")
+    return [FakeElement(element) for element in root.select(value)]
+
+
+def find_element(root, by, value) -> FakeElement:
+    elements = find_elements(root, by, value)
+    if not elements:
+        raise NoSuchElementException(f"Unable to locate element: {value}")
+    return elements[0]
+
+
+class FakeWebDriver:
+    """
+    Browserless stand-in for a Chrome WebDriver serving recorded pages.
+
+    `page_for_url` maps a URL to the HTML `get` loads; `load_delay` seconds are slept on every
+    `get` to model the browser's page load, so pool and scheduler overhead stay measurable.
+    `extra_rows_for_url` maps a URL to the batches of offer rows (HTML strings) that successive
+    clicks on "load more" append to the offer table, the button is gone once they run out.
+    """
+
+    def __init__(self, page_for_url, load_delay: float = 0.0, extra_rows_for_url=None):
+        self.page_for_url = page_for_url
+        self.load_delay = load_delay
+        self.extra_rows_for_url = extra_rows_for_url
+        self.current_url = "about:blank"
+        self.page_source = "<html></html>"
+        self.pages_loaded = 0
+        self._soup = None
+        self._extra_rows = []
+
+    def get(self, url: str):
+        if self.load_delay:
+            time.sleep(self.load_delay)
+        self.current_url = url
+        self.page_source = self.page_for_url(url)
+        self.pages_loaded += 1
+        self._soup = None
+        self._extra_rows = list(self.extra_rows_for_url(url)) if self.extra_rows_for_url else []
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = make_soup(self.page_source)
+        return self._soup
+
+    def load_more(self):
+        table = self.soup.select_one(OFFER_TABLE_BODY)
+        rows = make_soup("".join(self._extra_rows.pop(0)))
+        for row in (rows.body or rows).find_all(recursive=False):
+            table.append(row)
+
+    def find_element(self, by=By.CSS_SELECTOR, value=None):
+        if value == ScrapingSelectorsEnum.LOAD_MORE_BUTTON.value:
+            if not self._extra_rows:
+                raise NoSuchElementException(f"Unable to locate element: {value}")
+            return FakeElement(self.soup, self.load_more)
+        return find_element(self.soup, by, value)
+
+    def find_elements(self, by=By.CSS_SELECTOR, value=None):
+        return find_elements(self.soup, by, value)
+
+    def execute_script(self, script, *args):
+        """
+        Runs the offer table scripts of scraping.offers, anything else returns None.
+        """
+        if script == COUNT_ROWS_SCRIPT:
+            return len(self.soup.select(args[0]))
+        if script == NEW_ROWS_SCRIPT:
+            selector, start, count = args
+            return [str(row) for row in self.soup.select(selector)[start:start + count]]
+        return None
+
+    def quit(self):
+        pass
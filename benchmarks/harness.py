@@ -0,0 +1,94 @@
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database.database import AsyncSessionLocal, SessionLocal, async_database_url
+from database.models.models import Base
+
+DEFAULT_DATABASE_URL = f"sqlite:///{Path(tempfile.gettempdir()) / 'cardmarket_benchmark.sqlite'}"
+# A case this much slower than in the baseline file is reported as a regression
+REGRESSION_THRESHOLD = 1.2
+
+
+def measure(function, repeat: int, warmup: int = 1) -> dict:
+    """
+    Call `function` `warmup` + `repeat` times and summarise the timed calls in milliseconds.
+    """
+    for _ in range(warmup):
+        function()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "runs": repeat,
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "min_ms": round(timings[0], 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+def bind_database(database_url: str):
+    """
+    Point every SessionLocal of the application at the benchmark database and create its tables.
+    """
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    SessionLocal.configure(bind=engine)
+    AsyncSessionLocal.configure(bind=create_async_engine(async_database_url(database_url)))
+    return engine
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict):
+    print(f"{'case':<44} {'median (ms)':>12} {'p95 (ms)':>10} {'runs':>6}")
+    for case, result in results.items():
+        print(f"{case:<44} {result['median_ms']:>12.3f} {result['p95_ms']:>10.3f} {result['runs']:>6}")
+
+
+def write_results(path: Path, suite: str, parameters: dict, results: dict):
+    path.write_text(json.dumps({
+        "suite": suite,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": parameters,
+        "results": results,
+    }, indent=2, default=str))
+    print(f"Results written to {path}")
+
+
+def compare_results(results: dict, baseline_path: Path, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """
+    Print the median of every case against a previous results file, return the regressed cases.
+    """
+    baseline = json.loads(baseline_path.read_text())["results"]
+    regressions = []
+    for case, result in results.items():
+        if case not in baseline:
+            continue
+        ratio = result["median_ms"] / baseline[case]["median_ms"] if baseline[case]["median_ms"] else 1.0
+        flag = "REGRESSION" if ratio > threshold else ""
+        print(f"{case:<44} {baseline[case]['median_ms']:>10.3f} -> {result['median_ms']:>10.3f} ms {ratio:>6.2f}x {flag}")
+        if flag:
+            regressions.append(case)
+    return regressions
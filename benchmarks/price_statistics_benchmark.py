@@ -0,0 +1,69 @@
+"""
+Times the offer-table price statistics on synthetic tables of increasing size, against the
+pure Python parsing and band filter the scraper used before the NumPy statistics.
+
+    python -m benchmarks.price_statistics_benchmark [--sizes 100 10000 1000000] [--repeat 5]
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from scraping.price_statistics import compute_price_statistics
+
+
+def python_final_prices(price_texts):
+    """
+    The scraper's former calculate_final_prices_from_texts, kept as the baseline.
+    """
+    prices = []
+    for price_text in price_texts:
+        try:
+            prices.append(float(price_text.replace(".", "").replace(",", ".").replace("€", "").strip()))
+        except ValueError:
+            continue
+    if not prices:
+        return 0, 0, 0
+    initial_average = sum(prices) / len(prices)
+    filtered_prices = [price for price in prices if (1 / 9) * initial_average <= price <= 5 * initial_average]
+    if not filtered_prices:
+        return 0, 0, 0
+    sorted_prices = sorted(filtered_prices)
+    minimum_price = sum(sorted_prices[:2]) / len(sorted_prices[:2])
+    return (round(sum(filtered_prices) / len(filtered_prices), 2), round(minimum_price, 2),
+            round(max(filtered_prices), 2))
+
+
+def synthetic_price_texts(size: int, seed: int = 42) -> list:
+    """
+    Log-normal offer prices around 20 € with 2% absurd listings, formatted like cardmarket.
+    """
+    rng = np.random.default_rng(seed)
+    prices = rng.lognormal(mean=3.0, sigma=0.4, size=size)
+    outliers = rng.random(size) < 0.02
+    prices[outliers] *= rng.choice([0.01, 50.0], size=int(outliers.sum()))
+    return [f"{price:,.2f} €".replace(",", " ").replace(".", ",").replace(" ", ".") for price in prices]
+
+
+def time_call(function, argument, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(argument)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the offer-table price statistics.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'offers':>10} {'python (ms)':>12} {'numpy (ms)':>12} {'speedup':>8}")
+    for size in args.sizes:
+        price_texts = synthetic_price_texts(size)
+        python_time = time_call(python_final_prices, price_texts, args.repeat)
+        numpy_time = time_call(compute_price_statistics, price_texts, args.repeat)
+        print(f"{size:>10} {python_time * 1000:>12.2f} {numpy_time * 1000:>12.2f} {python_time / numpy_time:>7.1f}x")
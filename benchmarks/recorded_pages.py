@@ -0,0 +1,82 @@
+"""
+Recorded cardmarket product pages replayed by the benchmarks, one per product type.
+
+The committed pages are stand-ins with the structure the selectors expect. Record real ones
+(kept out of git by preference, they carry seller names) with:
+
+    python -m benchmarks.recorded_pages --singles URL --sealed URL
+"""
+import argparse
+import io
+from functools import lru_cache
+from pathlib import Path
+
+import httpx
+from PIL import Image
+
+from scraping.http_fetcher import fetch_page_html
+from scraping.page_parser import make_soup
+from scraping.scraping_selectors import ScrapingSelectorsEnum
+
+PAGES_DIR = Path(__file__).parent / "pages"
+PAGE_FILES = {"singles": "singles_product.html", "sealed": "sealed_product.html"}
+
+
+@lru_cache(maxsize=1)
+def placeholder_image() -> bytes:
+    """
+    JPEG served for every product image URL, sized like a cardmarket card scan.
+    """
+    buffer = io.BytesIO()
+    Image.new("RGB", (250, 349), (200, 120, 160)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def load_pages(pages_dir: Path = PAGES_DIR) -> dict:
+    return {kind: (pages_dir / file_name).read_text(encoding="utf-8") for kind, file_name in PAGE_FILES.items()}
+
+
+def page_kind(url: str) -> str:
+    return "singles" if "/Products/Singles/" in url else "sealed"
+
+
+def page_replayer(pages: dict):
+    """
+    URL -> recorded HTML of that product type, for FakeWebDriver.
+    """
+    return lambda url: pages[page_kind(url)]
+
+
+def extra_rows_replayer(pages: dict, batches: int):
+    """
+    URL -> `batches` copies of the offer rows of its recorded page, the rows "load more" reveals in FakeWebDriver.
+    """
+    rows = {kind: [str(row) for row in make_soup(html).select(ScrapingSelectorsEnum.OFFER_ROWS.value)]
+            for kind, html in pages.items()}
+    return lambda url: [rows[page_kind(url)]] * batches
+
+
+def recorded_http_client(pages: dict) -> httpx.Client:
+    """
+    HTTP client answering product URLs with the recorded pages and anything else with an image.
+    """
+    def handler(request: httpx.Request) -> httpx.Response:
+        if "/Products/" in request.url.path:
+            return httpx.Response(200, text=pages[page_kind(str(request.url))])
+        return httpx.Response(200, content=placeholder_image(), headers={"Content-Type": "image/jpeg"})
+
+    return httpx.Client(transport=httpx.MockTransport(handler))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record product pages for the offline benchmarks.")
+    parser.add_argument("--singles", help="URL of a Singles product page")
+    parser.add_argument("--sealed", help="URL of a sealed product page")
+    parser.add_argument("--pages-dir", type=Path, default=PAGES_DIR)
+    args = parser.parse_args()
+
+    for kind, url in (("singles", args.singles), ("sealed", args.sealed)):
+        if url:
+            path = args.pages_dir / PAGE_FILES[kind]
+            path.write_text(fetch_page_html(url), encoding="utf-8")
+            print(f"Recorded {url} to {path}")
@@ -0,0 +1,121 @@
+"""
+Replays the recorded product pages through the scraping pipeline without a browser or network:
+field extraction, calculate_final_prices, the Selenium fetch on a FakeWebDriver, the HTTP fetch on
+a mocked transport, save_product_data, the batch writer and a whole scheduler run.
+
+    python -m benchmarks.scraper_benchmark [--database-url URL] [--repeat 50] [--output scraper.json]
+                                           [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+from pathlib import Path
+
+from selenium.webdriver.common.by import By
+
+from benchmarks.fake_webdriver import FakeWebDriver
+from benchmarks.harness import DEFAULT_DATABASE_URL, bind_database, compare_results, measure, print_results, \
+    write_results
+from benchmarks.recorded_pages import load_pages, page_replayer, recorded_http_client
+from database.batch_writer import ScrapeBatchWriter
+from database.database import SessionLocal
+from database.db_operations import save_product_data
+from scraping.driver_pool import DriverPool
+from scraping.http_fetcher import fetch_product_data_http, set_http_client
+from scraping.page_parser import extract_page_fields
+from scraping.scheduler import HostRateLimiter, ScrapeScheduler
+from scraping.scraper import fetch_product_data_selenium
+from scraping.scraper_utilities import calculate_final_prices
+from scraping.scraping_selectors import ScrapingSelectorsEnum
+from utilities.common import get_url_partial_params
+
+SINGLES_URL = "https://www.cardmarket.com/it/Pokemon/Products/Singles/Brilliant-Stars/Sylveon-VMAX-BRSTG15?language=5&minCondition=2"
+SEALED_URL = "https://www.cardmarket.com/it/Pokemon/Products/Booster-Boxes/Twilight-Masquerade-Booster-Box?language=5&minCondition=2"
+
+
+def synthetic_url(index: int) -> str:
+    return f"https://www.cardmarket.com/it/Pokemon/Products/Singles/Benchmark-Set/Card-{index}?language=5&minCondition=2"
+
+
+def run_benchmarks(args) -> dict:
+    pages = load_pages()
+    set_http_client(recorded_http_client(pages))
+    pool = DriverPool(lambda: FakeWebDriver(page_replayer(pages), args.page_load_ms / 1000), size=args.concurrency)
+    singles = get_url_partial_params(SINGLES_URL)
+    sealed = get_url_partial_params(SEALED_URL)
+    results = {}
+
+    for kind, params in (("singles", singles), ("sealed", sealed)):
+        html = pages[kind]
+        results[f"extract_page_fields[{kind}]"] = measure(
+            lambda: extract_page_fields(html, params.product_type, params.tcg_name), args.repeat)
+
+    driver = FakeWebDriver(page_replayer(pages))
+    driver.get(SINGLES_URL)
+    price_elements = driver.find_elements(By.CSS_SELECTOR, ScrapingSelectorsEnum.TABLE_PRICES.value)
+    results["calculate_final_prices[singles]"] = measure(lambda: calculate_final_prices(price_elements), args.repeat)
+
+    for kind, params in (("singles", singles), ("sealed", sealed)):
+        results[f"fetch_selenium[{kind}]"] = measure(lambda: fetch_product_data_selenium(params, pool), args.repeat)
+        results[f"fetch_http[{kind}]"] = measure(lambda: fetch_product_data_http(params), args.repeat)
+
+    product_data = fetch_product_data_http(singles)
+    prices = itertools.count()
+
+    def save(changed: bool):
+        session = SessionLocal()
+        try:
+            # A moving price makes every scrape a stored one, a fixed one exercises the unchanged skip
+            scrape = product_data | {"min_price": product_data["min_price"] + next(prices)} if changed else product_data
+            save_product_data(session, scrape)
+        finally:
+            session.close()
+
+    results["save_product_data[changed]"] = measure(lambda: save(True), args.repeat)
+    results["save_product_data[unchanged]"] = measure(lambda: save(False), args.repeat)
+
+    writer = ScrapeBatchWriter(batch_size=args.batch_size + 1)
+    batch_counter = itertools.count()
+
+    def write_batch():
+        batch_number = next(batch_counter)
+        for index in range(args.batch_size):
+            writer.add(product_data | {"id_url": synthetic_url(index), "min_price": float(batch_number)})
+        writer.flush()
+
+    results[f"batch_writer[{args.batch_size}]"] = measure(write_batch, max(args.repeat // 10, 1))
+
+    scheduler = ScrapeScheduler(
+        fetch=lambda params: fetch_product_data_selenium(params, pool),
+        writer_factory=lambda: ScrapeBatchWriter(batch_size=args.batch_size),
+        concurrency=args.concurrency, rate_limiter=HostRateLimiter(rate=1_000_000, burst=1_000_000),
+    )
+    urls = [synthetic_url(index) for index in range(args.scheduler_urls)]
+    results[f"scheduler_run[{args.scheduler_urls} urls]"] = measure(
+        lambda: asyncio.run(scheduler.run(urls)), max(args.repeat // 10, 1))
+    scheduler.shutdown()
+    pool.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of the scraping pipeline.")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--page-load-ms", type=float, default=0, help="Simulated browser page load time")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--scheduler-urls", type=int, default=100)
+    parser.add_argument("--output", type=Path, default=Path("scraper_benchmark.json"))
+    parser.add_argument("--baseline", type=Path, help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    # The per-product info logs would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    bind_database(args.database_url)
+    results = run_benchmarks(args)
+    print_results(results)
+    write_results(args.output, "scraper", vars(args), results)
+    if args.baseline:
+        compare_results(results, args.baseline)
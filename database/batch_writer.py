@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from database.database import SessionLocal, session_scope
+from database.db_operations import insert_ignore_existing, upsert_latest_scrapes, split_unchanged_scrapes, \
+    mark_latest_scrapes_checked, update_product_image_hashes, SCRAPE_FIELDS
+from database.models.models import Product, ScrapeData
+from scraping.price_statistics import STATISTICS_FIELDS
+from utilities.cache import cache, product_tags
+from utilities.metrics import SCRAPE_STAGE_SECONDS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCRAPE_BATCH_SIZE = int(os.getenv("SCRAPE_BATCH_SIZE", "50"))
+SCRAPE_BATCH_MAX_DELAY = float(os.getenv("SCRAPE_BATCH_MAX_DELAY", "30"))
+
+PRODUCT_FIELDS = ("id_url", "product_name", "title", "subtitle", "image_hash", "product_type", "set_name",
+                  "card_number", "language", "condition", "tcg_name", "pokemon_species")
+
+
+class ScrapeBatchWriter:
+    """
+    Buffers scraped product dicts and writes them in batches, one transaction per batch.
+
+    New products are inserted with ON CONFLICT DO NOTHING so existing rows are left
+    untouched apart from their image hash, which follows the revalidated image. All ScrapeData
+    rows of the batch go in a single multi-row INSERT and latest_scrapes is upserted in the
+    same transaction.
+
+    Every product can be added with the result reported for its URL. Those results are only
+    handed back by the call that wrote their batch, so a URL is reported as saved once its
+    scrape is committed. Use one writer per scrape run: a batch mixes whatever was added.
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size=SCRAPE_BATCH_SIZE,
+                 max_delay=SCRAPE_BATCH_MAX_DELAY):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._buffer = []
+        self._oldest_at = None
+        self._lock = threading.Lock()
+
+    def add(self, product_data: dict, result: dict = None) -> list:
+        """
+        Buffer a scraped product. Returns the results of the batch written when the buffer is full
+        or too old, see `flush`, otherwise an empty list.
+        """
+        with self._lock:
+            if not self._buffer:
+                self._oldest_at = time.monotonic()
+            self._buffer.append((product_data, product_data.get("scrape_date") or datetime.utcnow(), result))
+            full = len(self._buffer) >= self.batch_size
+            stale = time.monotonic() - self._oldest_at >= self.max_delay
+        if full or stale:
+            return self.flush()
+        return []
+
+    def flush(self) -> list:
+        """
+        Write out the buffered products and return the results added with them. When the batch
+        cannot be written every one of its results is turned into an error, so the URLs are
+        scraped again when their job is resumed.
+        """
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        results = [result for _, _, result in batch if result is not None]
+        if not batch:
+            return results
+        try:
+            self.write_batch([(product_data, scrape_date) for product_data, scrape_date, _ in batch])
+        except Exception as e:
+            logger.error("A batch of %s scrapes was not saved, their URLs are reported as failed: %s", len(batch), e)
+            for result in results:
+                result.update(status="error", message="Saving the scrape failed")
+        return results
+
+    @SCRAPE_STAGE_SECONDS.labels("db_write").time()
+    def write_batch(self, batch):
+        products = {}
+        for product_data, _ in batch:
+            products.setdefault(product_data["id_url"], {
+                field: product_data[field] for field in PRODUCT_FIELDS
+            } | {"in_my_collection": False})
+
+        scrapes = [
+            {"product_id_url": product_data["id_url"], "scrape_date": scrape_date}
+            | {field: product_data[field] for field in SCRAPE_FIELDS}
+            | {field: product_data.get(field) for field in STATISTICS_FIELDS}
+            for product_data, scrape_date in batch
+        ]
+
+        # Scrapes with captured offers are always stored, the offers reference their date
+        keep = {(product_data["id_url"], scrape_date) for product_data, scrape_date in batch
+                if product_data.get("scrape_date")}
+
+        try:
+            with session_scope(self.session_factory) as session:
+                insert_ignore_existing(session, Product, list(products.values()))
+                image_changed = update_product_image_hashes(session, products.values())
+                changed, unchanged = split_unchanged_scrapes(session, scrapes, keep)
+                if changed:
+                    session.execute(insert(ScrapeData), changed)
+                    upsert_latest_scrapes(session, changed)
+                mark_latest_scrapes_checked(session, unchanged)
+        except SQLAlchemyError as e:
+            logger.error("An error occurred while saving a batch of %s scrapes (%s): %s",
+                         len(scrapes), ", ".join(products), str(e))
+            raise
+        changed_products = [products[scrape["product_id_url"]] for scrape in changed] \
+            + [products[id_url] for id_url in image_changed]
+        if changed_products:
+            cache.invalidate(*{tag for product in changed_products
+                               for tag in product_tags(product["product_type"], product["tcg_name"])})
+        logger.info("Saved a batch of %s scrapes for %s products, %s unchanged scrapes skipped",
+                    len(changed), len(products), len(unchanged))
@@ -1,18 +1,98 @@
+import os
+from contextlib import contextmanager
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from config import DATABASE_URL
+from database.pool_monitor import PoolMonitor
+
+# Connection pool of each engine, ignored on SQLite
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test each connection with a round trip before handing it out, dropping those the server closed
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Server-side limit of a single statement on PostgreSQL, 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+# Async driver used by the API read endpoints for each sync backend
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def engine_options(url: str, asynchronous: bool = False) -> dict:
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        return {}
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS:
+        if asynchronous:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
 
 # Creiamo l'engine
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 
 # Crea una SessionLocal per ogni richiesta
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+pool_monitor = PoolMonitor(engine, "sync")
 
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, asynchronous=True))
 
-# Funzione per ottenere la connessione al database (Dependency Injection di FastAPI)
-def get_db():
-    db = SessionLocal()
+# Sessions of the async read endpoints, objects stay usable after the request's commit
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+async_pool_monitor = PoolMonitor(async_engine.sync_engine, "async")
+
+
+@contextmanager
+def session_scope(session_factory=SessionLocal):
+    """
+    Session committed when the block succeeds, rolled back when it raises and closed either way.
+
+    Scrape workers and scripts open their sessions through it instead of calling SessionLocal()
+    by hand, so no error path can keep a pooled connection checked out.
+    """
+    session = session_factory()
     try:
-        yield db
+        yield session
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
     finally:
-        db.close()
+        session.close()
+
+
+# Funzione per ottenere la connessione al database (Dependency Injection di FastAPI)
+def get_db():
+    """
+    Session of a request, committed after the handler returns and closed even when it raises.
+    """
+    with session_scope() as session:
+        yield session
+
+
+async def get_async_db():
+    """
+    AsyncSession of a request, closed once the response is sent.
+    """
+    async with AsyncSessionLocal() as session:
+        yield session
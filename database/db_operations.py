@@ -1,8 +1,14 @@
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
 
 from fastapi import HTTPException
 
-from database.models.models import Product, ScrapeData
+from database.models.models import Product, ScrapeData, LatestScrape, Offer
+from scraping.price_statistics import STATISTICS_FIELDS
+from utilities.metrics import SCRAPE_STAGE_SECONDS
+from utilities.cache import cache, product_tags
+from sqlalchemy import bindparam, insert, update, or_, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 import logging
@@ -10,7 +16,182 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SCRAPE_FIELDS = ("total_availability", "detailed_availability", "min_price", "max_price", "avg_price")
+PRICE_FIELDS = ("min_price", "avg_price", "max_price")
 
+# Relative price change below which a scrape with unchanged availabilities is not stored
+SCRAPE_CHANGE_TOLERANCE = float(os.getenv("SCRAPE_CHANGE_TOLERANCE", "0.01"))
+# An unchanged scrape is stored anyway once the last stored one is this old, so series keep a daily point
+SCRAPE_UNCHANGED_MAX_AGE_HOURS = float(os.getenv("SCRAPE_UNCHANGED_MAX_AGE_HOURS", "24"))
+
+
+def dialect_insert(session, model):
+    """
+    INSERT of the session's dialect with ON CONFLICT support, None on databases without it.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    return None
+
+
+def insert_ignore_existing(session, model, rows):
+    """
+    Insert the `rows` dicts whose primary key is not stored yet, in the caller's transaction.
+
+    INSERT ... ON CONFLICT DO NOTHING where the dialect has it. Elsewhere the stored keys are read
+    first; a concurrent insert of the same key then fails the transaction instead of being skipped.
+    """
+    if not rows:
+        return
+    statement = dialect_insert(session, model)
+    if statement is not None:
+        session.execute(statement.values(rows).on_conflict_do_nothing())
+        return
+
+    key_columns = list(model.__table__.primary_key.columns)
+    unique_rows = {}
+    for row in rows:
+        unique_rows.setdefault(tuple(row[column.name] for column in key_columns), row)
+    stored = set(session.execute(select(*key_columns).where(tuple_(*key_columns).in_(list(unique_rows)))).tuples())
+    new_rows = [row for key, row in unique_rows.items() if key not in stored]
+    if new_rows:
+        session.execute(insert(model), new_rows)
+
+
+def upsert_latest_scrapes(session, scrapes):
+    """
+    Point latest_scrapes at the newest of the given ScrapeData rows, in the caller's transaction.
+
+    A row only replaces the stored one if it is not older, so out-of-order writes are harmless.
+    """
+    newest = {}
+    for scrape in scrapes:
+        current = newest.get(scrape["product_id_url"])
+        if not current or scrape["scrape_date"] >= current["scrape_date"]:
+            newest[scrape["product_id_url"]] = scrape
+    if not newest:
+        return
+
+    rows = [
+        {"product_id_url": product_id_url, "scrape_date": scrape["scrape_date"], "last_checked_at": scrape["scrape_date"]}
+        | {field: scrape[field] for field in SCRAPE_FIELDS}
+        for product_id_url, scrape in newest.items()
+    ]
+    statement = dialect_insert(session, LatestScrape)
+    if statement is None:
+        # No upsert on this database: update the stored rows under a row lock, insert the others
+        stored = {
+            latest.product_id_url: latest
+            for latest in session.query(LatestScrape).filter(LatestScrape.product_id_url.in_(newest)).with_for_update()
+        }
+        for row in rows:
+            latest = stored.get(row["product_id_url"])
+            if latest is None:
+                session.add(LatestScrape(**row))
+            elif latest.scrape_date <= row["scrape_date"]:
+                for field, value in row.items():
+                    setattr(latest, field, value)
+        session.flush()
+        return
+
+    statement = statement.values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[LatestScrape.product_id_url],
+        set_={field: statement.excluded[field] for field in ("scrape_date", "last_checked_at") + SCRAPE_FIELDS},
+        where=LatestScrape.scrape_date <= statement.excluded.scrape_date,
+    )
+    session.execute(statement)
+
+
+def is_unchanged_scrape(scrape: dict, previous: dict) -> bool:
+    """
+    True if `scrape` has the availabilities of `previous` and prices within SCRAPE_CHANGE_TOLERANCE of it.
+    """
+    if previous is None:
+        return False
+    if scrape["scrape_date"] - previous["scrape_date"] >= timedelta(hours=SCRAPE_UNCHANGED_MAX_AGE_HOURS):
+        return False
+    if any(scrape[field] != previous[field] for field in ("total_availability", "detailed_availability")):
+        return False
+    return all(
+        abs(scrape[field] - previous[field]) <= SCRAPE_CHANGE_TOLERANCE * abs(previous[field])
+        for field in PRICE_FIELDS
+    )
+
+
+def split_unchanged_scrapes(session, scrapes, keep=()):
+    """
+    Split scrape dicts into (changed, unchanged), comparing each with the latest stored scrape of
+    its product or with the previous changed one in `scrapes`.
+
+    Scrapes whose (product_id_url, scrape_date) is in `keep` always count as changed.
+    """
+    product_ids = {scrape["product_id_url"] for scrape in scrapes}
+    previous = {
+        latest.product_id_url: {"scrape_date": latest.scrape_date}
+        | {field: getattr(latest, field) for field in SCRAPE_FIELDS}
+        for latest in session.query(LatestScrape).filter(LatestScrape.product_id_url.in_(product_ids))
+    }
+
+    changed = []
+    unchanged = []
+    for scrape in sorted(scrapes, key=lambda item: item["scrape_date"]):
+        key = (scrape["product_id_url"], scrape["scrape_date"])
+        if key not in keep and is_unchanged_scrape(scrape, previous.get(scrape["product_id_url"])):
+            unchanged.append(scrape)
+        else:
+            changed.append(scrape)
+            previous[scrape["product_id_url"]] = scrape
+    return changed, unchanged
+
+
+def mark_latest_scrapes_checked(session, scrapes):
+    """
+    Record in latest_scrapes that the products of `scrapes` were checked, without storing them.
+    """
+    if not scrapes:
+        return
+    # One executemany on the table: an ORM update with a parameter list would be a bulk update by primary key
+    latest_scrapes = LatestScrape.__table__
+    session.execute(
+        update(latest_scrapes)
+        .where(latest_scrapes.c.product_id_url == bindparam("checked_product_id_url"),
+               or_(latest_scrapes.c.last_checked_at.is_(None),
+                   latest_scrapes.c.last_checked_at < bindparam("checked_at")))
+        .values(last_checked_at=bindparam("checked_at")),
+        [{"checked_product_id_url": scrape["product_id_url"], "checked_at": scrape["scrape_date"]}
+         for scrape in scrapes],
+    )
+
+
+def update_product_image_hashes(session, products) -> list:
+    """
+    Point the stored products among the `products` dicts at their scraped image hash, in the
+    caller's transaction. Returns the id_url of the products whose image changed.
+    """
+    image_hashes = {product["id_url"]: product["image_hash"] for product in products if product.get("image_hash")}
+    if not image_hashes:
+        return []
+    stored = dict(session.execute(
+        select(Product.id_url, Product.image_hash).where(Product.id_url.in_(list(image_hashes)))
+    ).all())
+    changed = [id_url for id_url, image_hash in image_hashes.items()
+               if id_url in stored and stored[id_url] != image_hash]
+    if changed:
+        products_table = Product.__table__
+        session.execute(
+            update(products_table)
+            .where(products_table.c.id_url == bindparam("changed_id_url"))
+            .values(image_hash=bindparam("changed_image_hash")),
+            [{"changed_id_url": id_url, "changed_image_hash": image_hashes[id_url]} for id_url in changed],
+        )
+    return changed
+
+
+@SCRAPE_STAGE_SECONDS.labels("db_write").time()
 def save_product_data(session: Session, product_data: dict):
     try:
         product = session.query(Product).filter_by(id_url=product_data['id_url']).first()
@@ -21,7 +202,7 @@ def save_product_data(session: Session, product_data: dict):
                 product_name=product_data['product_name'],
                 title=product_data['title'],
                 subtitle=product_data['subtitle'],
-                image=product_data['image'],
+                image_hash=product_data['image_hash'],
                 product_type=product_data['product_type'],
                 set_name=product_data['set_name'],
                 card_number=product_data['card_number'],
@@ -32,28 +213,61 @@ def save_product_data(session: Session, product_data: dict):
                 in_my_collection=False
             )
             session.add(product)
-            session.commit()
             logger.info("New product added to the database with ID: %s", product_data['id_url'])
+            image_changed = False
         else:
-            logger.info("Existing product not Updated: %s", product_data['id_url'])
-
-        scrape_data = ScrapeData(
-            product_id_url=product_data['id_url'],
-            scrape_date=datetime.utcnow(),
-            total_availability=product_data['total_availability'],
-            detailed_availability=product_data['detailed_availability'],
-            min_price=product_data['min_price'],
-            max_price=product_data['max_price'],
-            avg_price=product_data['avg_price']
-        )
-        session.add(scrape_data)
+            # The image cache revalidates known images, a new hash means the product image changed
+            image_changed = bool(update_product_image_hashes(session, [product_data]))
+            if image_changed:
+                logger.info("Image of existing product updated: %s", product_data['id_url'])
+            else:
+                logger.info("Existing product not Updated: %s", product_data['id_url'])
+
+        scrape = {
+            "product_id_url": product_data['id_url'],
+            "scrape_date": product_data.get('scrape_date') or datetime.utcnow(),
+        } | {field: product_data[field] for field in SCRAPE_FIELDS} \
+            | {field: product_data.get(field) for field in STATISTICS_FIELDS}
+        # A scrape with captured offers is always stored, the offers reference its date
+        keep = {(scrape["product_id_url"], scrape["scrape_date"])} if product_data.get('scrape_date') else ()
+        changed, unchanged = split_unchanged_scrapes(session, [scrape], keep)
+
+        if changed:
+            session.add(ScrapeData(**scrape))
+            session.flush()
+            upsert_latest_scrapes(session, changed)
+        mark_latest_scrapes_checked(session, unchanged)
         session.commit()
-        logger.info("Scrape data saved successfully for product ID: %s", product_data['id_url'])
+        if changed or image_changed:
+            cache.invalidate(*product_tags(product_data['product_type'], product_data['tcg_name']))
+        if changed:
+            logger.info("Scrape data saved successfully for product ID: %s", product_data['id_url'])
+        else:
+            logger.info("Scrape data unchanged, not stored for product ID: %s", product_data['id_url'])
 
     except SQLAlchemyError as e:
         session.rollback()
         logger.error("An error occurred while saving product data: %s", str(e))
         raise HTTPException(status_code=500, detail="An error occurred while saving data to the database")
-    finally:
-        # Close the session if you’re not using a session manager
-        session.close()
+
+
+def save_offers(session: Session, product_id_url: str, scrape_date: datetime, offers, chunk_size: int) -> int:
+    """
+    Insert a stream of offer dicts in chunks of `chunk_size`, committing each chunk.
+
+    Only one chunk is held in memory, however deep the offer table is. Returns the number of offers stored.
+    """
+    stored = 0
+    chunk = []
+    for position, offer in enumerate(offers):
+        chunk.append({"product_id_url": product_id_url, "scrape_date": scrape_date, "position": position} | offer)
+        if len(chunk) >= chunk_size:
+            session.execute(insert(Offer), chunk)
+            session.commit()
+            stored += len(chunk)
+            chunk = []
+    if chunk:
+        session.execute(insert(Offer), chunk)
+        session.commit()
+        stored += len(chunk)
+    return stored
@@ -0,0 +1,74 @@
+import hashlib
+import logging
+import threading
+
+from sqlalchemy import text
+
+from database.database import engine as default_engine
+
+logging.basicConfig(level=logging.INFO)
+
+# Fallback for databases without advisory locks, only exclusive within this process
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+def advisory_lock_key(name: str) -> int:
+    """
+    Stable signed 64 bit key of a lock name, the argument type of pg_try_advisory_lock.
+    """
+    return int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], "big", signed=True)
+
+
+class AdvisoryLock:
+    """
+    Named lock shared by every process using the database, non-blocking.
+
+    On PostgreSQL this is a session-level advisory lock held on a dedicated connection
+    until `release`, so it is also freed if the holder dies. Other databases get a
+    process-local lock, which is enough for single-instance SQLite setups.
+    """
+
+    def __init__(self, name: str, engine=default_engine):
+        self.name = name
+        self.engine = engine
+        self._connection = None
+        self._local_lock = None
+
+    def acquire(self) -> bool:
+        if self.engine.dialect.name == "postgresql":
+            connection = self.engine.connect()
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": advisory_lock_key(self.name)}
+            ).scalar()
+            connection.commit()
+            if not acquired:
+                connection.close()
+                return False
+            self._connection = connection
+            return True
+
+        with _local_locks_guard:
+            local_lock = _local_locks.setdefault(self.name, threading.Lock())
+        if not local_lock.acquire(blocking=False):
+            return False
+        self._local_lock = local_lock
+        return True
+
+    def release(self):
+        if self._connection is not None:
+            try:
+                self._connection.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": advisory_lock_key(self.name)}
+                )
+                self._connection.commit()
+            except Exception as e:
+                # Discarding the connection instead of pooling it ends the session, which frees the lock
+                logging.error(f"Error releasing advisory lock {self.name}: {e}")
+                self._connection.invalidate()
+            finally:
+                self._connection.close()
+                self._connection = None
+        if self._local_lock is not None:
+            self._local_lock.release()
+            self._local_lock = None
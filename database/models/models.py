@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, LargeBinary, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, LargeBinary, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -14,6 +14,7 @@ class Product(Base):
     title = Column(String, nullable=False)
     subtitle = Column(String, nullable=True)
     image = Column(LargeBinary, nullable=True)
+    image_hash = Column(String, ForeignKey('image_blobs.image_hash'), nullable=True)
     product_type = Column(String, nullable=False)
     set_name = Column(String, nullable=True)
     card_number = Column(String, nullable=True)
@@ -25,6 +26,37 @@ class Product(Base):
 
     scrapes = relationship("ScrapeData", back_populates="product")
     owned_products = relationship("OwnedProduct", back_populates="product")
+    image_blob = relationship("ImageBlob")
+
+
+class ImageBlob(Base):
+    __tablename__ = 'image_blobs'
+
+    image_hash = Column(String, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    content_type = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ImageThumbnail(Base):
+    __tablename__ = 'image_thumbnails'
+
+    image_hash = Column(String, ForeignKey('image_blobs.image_hash'), primary_key=True)
+    size = Column(String, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    content_type = Column(String, nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+
+
+class ImageSource(Base):
+    __tablename__ = 'image_sources'
+
+    source_url = Column(String, primary_key=True)
+    image_hash = Column(String, ForeignKey('image_blobs.image_hash'), nullable=False)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
 class OwnedProduct(Base):
@@ -41,8 +73,18 @@ class OwnedProduct(Base):
 
 
 class ScrapeData(Base):
+    """
+    One scrape of a product. Rows older than the rollup horizon are compacted to one row per
+    product and day, `sample_count` tells how many raw scrapes a row stands for.
+    """
     __tablename__ = 'scrapes'
+    __table_args__ = (
+        Index('ix_scrapes_product_date', 'product_id_url', text('scrape_date DESC')),
+    )
 
+    # On PostgreSQL migration 0006 makes the key (scrape_id, scrape_date), partitioned tables need the
+    # partition column in it. scrape_id alone stays unique there (one sequence), and SQLite needs it to
+    # be the only key to autoincrement, so the model keeps it. Alembic autogenerate does not compare keys.
     scrape_id = Column(Integer, primary_key=True)
     product_id_url = Column(String, ForeignKey('products.id_url'), nullable=False)
     scrape_date = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -51,5 +93,95 @@ class ScrapeData(Base):
     min_price = Column(Float, nullable=False)
     max_price = Column(Float, nullable=False)
     avg_price = Column(Float, nullable=False)
+    # Robust statistics of the offers after MAD outlier rejection, median_price is the p50
+    median_price = Column(Float, nullable=True)
+    trimmed_mean_price = Column(Float, nullable=True)
+    p10_price = Column(Float, nullable=True)
+    p25_price = Column(Float, nullable=True)
+    mad_price = Column(Float, nullable=True)
+    offer_count = Column(Integer, nullable=True)
+    outlier_count = Column(Integer, nullable=True)
+    sample_count = Column(Integer, nullable=False, default=1, server_default="1")
 
     product = relationship("Product", back_populates="scrapes")
+
+
+class Offer(Base):
+    """
+    One listing of a product's offer table, captured when offer scraping is enabled.
+
+    Offers are streamed in while the scrape is still running, before the product and scrape rows
+    are written, so they reference them by value: (product_id_url, scrape_date) of the scrape.
+    Offers whose scrape never lands are removed by the rollup, see delete_orphan_offers.
+    """
+    __tablename__ = 'offers'
+    __table_args__ = (
+        Index('ix_offers_product_date', 'product_id_url', 'scrape_date'),
+    )
+
+    offer_id = Column(Integer, primary_key=True)
+    product_id_url = Column(String, nullable=False)
+    scrape_date = Column(DateTime, nullable=False)
+    position = Column(Integer, nullable=False)
+    seller = Column(String, nullable=True)
+    condition = Column(String, nullable=True)
+    price = Column(Float, nullable=False)
+    quantity = Column(Integer, nullable=False)
+
+
+class LatestScrape(Base):
+    """
+    Copy of the most recent ScrapeData row of each product, kept up to date on every save.
+    """
+    __tablename__ = 'latest_scrapes'
+    __table_args__ = (
+        Index('ix_latest_scrapes_min_price_product', 'min_price', 'product_id_url'),
+    )
+
+    product_id_url = Column(String, ForeignKey('products.id_url'), primary_key=True)
+    scrape_date = Column(DateTime, nullable=False)
+    total_availability = Column(Integer, nullable=False)
+    detailed_availability = Column(Integer, nullable=False)
+    min_price = Column(Float, nullable=False)
+    max_price = Column(Float, nullable=False)
+    avg_price = Column(Float, nullable=False)
+    # Last time the product was scraped, also when an unchanged scrape was not stored
+    last_checked_at = Column(DateTime, nullable=True)
+
+
+class ScrapeJob(Base):
+    __tablename__ = 'scrape_jobs'
+
+    job_id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    total_items = Column(Integer, nullable=False, default=0)
+    # "local" jobs run in the API process, "queue" jobs are leased item by item by worker.py processes
+    mode = Column(String, nullable=False, default="local", server_default="local")
+
+    items = relationship("ScrapeJobItem", back_populates="job")
+
+
+class ScrapeJobItem(Base):
+    __tablename__ = 'scrape_job_items'
+    __table_args__ = (
+        Index('ix_scrape_job_items_status_available', 'status', 'available_at'),
+    )
+
+    item_id = Column(Integer, primary_key=True)
+    job_id = Column(String, ForeignKey('scrape_jobs.job_id'), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    product_url = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    message = Column(String, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Work queue state of "queue" jobs
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    available_at = Column(DateTime, nullable=True)
+    leased_by = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+
+    job = relationship("ScrapeJob", back_populates="items")
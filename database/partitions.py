@@ -0,0 +1,71 @@
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+logging.basicConfig(level=logging.INFO)
+
+SCRAPE_PARTITION_MONTHS_AHEAD = int(os.getenv("SCRAPE_PARTITION_MONTHS_AHEAD", "3"))
+
+
+def month_start(date: datetime, offset: int = 0) -> datetime:
+    month_index = date.year * 12 + date.month - 1 + offset
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def create_scrape_partition(session, month: datetime):
+    """
+    Create the partition of `month`, moving the rows of that month out of the default partition.
+
+    PostgreSQL refuses a new partition while the default one holds rows of its range (the
+    scheduler was down when the month started), so the default partition is detached for the move.
+    """
+    partition = f"scrapes_{month:%Y_%m}"
+    bounds = {"start": month, "end": month_start(month, 1)}
+    has_default = session.execute(text("SELECT to_regclass('scrapes_default')")).scalar()
+    if has_default:
+        session.execute(text("ALTER TABLE scrapes DETACH PARTITION scrapes_default"))
+    session.execute(text(
+        f"CREATE TABLE {partition} PARTITION OF scrapes "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{month_start(month, 1):%Y-%m-%d}')"
+    ))
+    if has_default:
+        moved = session.execute(text(
+            f"WITH moved AS (DELETE FROM scrapes_default WHERE scrape_date >= :start AND scrape_date < :end "
+            f"RETURNING *) INSERT INTO {partition} SELECT * FROM moved"
+        ), bounds).rowcount
+        session.execute(text("ALTER TABLE scrapes ATTACH PARTITION scrapes_default DEFAULT"))
+        if moved:
+            logging.info(f"Moved {moved} scrapes from scrapes_default to {partition}")
+
+
+def ensure_scrape_partitions(session, months_ahead: int = SCRAPE_PARTITION_MONTHS_AHEAD) -> int:
+    """
+    Create the monthly partitions of scrapes from the current month to `months_ahead` months ahead.
+
+    Only PostgreSQL deployments are partitioned (migration 0006), elsewhere this is a no-op.
+    A partition that cannot be created is logged and skipped, the rollup that follows still runs.
+    Returns the number of partitions created.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return 0
+
+    created = 0
+    now = datetime.utcnow()
+    for offset in range(months_ahead + 1):
+        month = month_start(now, offset)
+        partition = f"scrapes_{month:%Y_%m}"
+        if session.execute(text("SELECT to_regclass(:name)"), {"name": partition}).scalar():
+            continue
+        try:
+            with session.begin_nested():
+                create_scrape_partition(session, month)
+        except SQLAlchemyError as e:
+            logging.error(f"Could not create scrapes partition {partition}: {e}")
+            continue
+        created += 1
+        logging.info(f"Created scrapes partition {partition}")
+    session.commit()
+    return created
@@ -0,0 +1,116 @@
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+import greenlet
+from sqlalchemy import event
+
+from utilities.metrics import DB_CONNECTION_LEAKS, DB_POOL_CONNECTIONS
+
+logging.basicConfig(level=logging.INFO)
+
+# A connection checked out for longer is logged with the call site that acquired it, 0 disables the tracking
+DB_LEAK_WARN_SECONDS = float(os.getenv("DB_LEAK_WARN_SECONDS", "60"))
+# Share of checkouts whose call site is captured, walking the stack on every checkout is too slow
+DB_LEAK_CALL_SITE_SAMPLE = float(os.getenv("DB_LEAK_CALL_SITE_SAMPLE", "0.1"))
+# Application frames kept of each acquiring call site
+CALL_SITE_DEPTH = 3
+
+PROJECT_ROOT = str(Path(__file__).resolve().parents[1])
+# Session plumbing frames, the interesting caller is the one above them
+SESSION_FILES = {str(Path(__file__).resolve()), str(Path(__file__).resolve().with_name("database.py"))}
+
+POOL_STATES = {
+    "checked_out": lambda pool: pool.checkedout(),
+    "idle": lambda pool: pool.checkedin(),
+    "overflow": lambda pool: max(pool.overflow(), 0),
+    "size": lambda pool: pool.size(),
+}
+
+
+def caller_frames(frame):
+    """
+    Walk from `frame` to the outermost caller. The asyncio engine runs the sync code in a child
+    greenlet, whose stack is continued by the suspended frames of its parent.
+    """
+    current = greenlet.getcurrent()
+    while frame is not None:
+        yield frame
+        frame = frame.f_back
+        if frame is None and current.parent is not None:
+            current = current.parent
+            frame = current.gr_frame
+
+
+def call_site() -> str:
+    sites = []
+    for frame in caller_frames(sys._getframe(1)):
+        file_name = frame.f_code.co_filename
+        if file_name.startswith(PROJECT_ROOT) and "site-packages" not in file_name and file_name not in SESSION_FILES:
+            sites.append(f"{os.path.relpath(file_name, PROJECT_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}")
+            if len(sites) == CALL_SITE_DEPTH:
+                break
+    return " <- ".join(sites) or "unknown"
+
+
+class PoolMonitor:
+    """
+    Usage gauges of an engine's pool and leak detection of its connections.
+
+    Every checkout records when the connection was acquired, and a `call_site_sample` share of them
+    where from; the others only record the acquiring thread. Connections held past
+    `leak_warn_seconds` are logged with that call site once, on the next checkout of the pool, or
+    when they are finally returned.
+    """
+
+    def __init__(self, engine, name: str, leak_warn_seconds: float = DB_LEAK_WARN_SECONDS,
+                 call_site_sample: float = DB_LEAK_CALL_SITE_SAMPLE):
+        self.name = name
+        self.leak_warn_seconds = leak_warn_seconds
+        self.call_site_sample = call_site_sample
+        # connection record -> [checked out at, call site, already reported]
+        self._checked_out = {}
+        self._lock = threading.Lock()
+
+        # SingletonThreadPool and NullPool (in-memory SQLite) do not count their connections
+        if hasattr(engine.pool, "checkedout"):
+            for state, value in POOL_STATES.items():
+                DB_POOL_CONNECTIONS.labels(name, state).set_function(lambda value=value: value(engine.pool))
+
+        # Listening on the engine keeps the listeners on the pool recreated by engine.dispose()
+        if leak_warn_seconds > 0:
+            event.listen(engine, "checkout", self.on_checkout)
+            event.listen(engine, "checkin", self.on_checkin)
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        now = time.monotonic()
+        if random.random() < self.call_site_sample:
+            site = call_site()
+        else:
+            site = f"thread {threading.current_thread().name} (call site not sampled)"
+        with self._lock:
+            self._checked_out[connection_record] = [now, site, False]
+            leaks = [entry for entry in self._checked_out.values()
+                     if not entry[2] and now - entry[0] > self.leak_warn_seconds]
+            for entry in leaks:
+                entry[2] = True
+        for checked_out_at, leak_site, _ in leaks:
+            DB_CONNECTION_LEAKS.labels(self.name).inc()
+            logging.warning(f"Connection of the {self.name} pool held for {now - checked_out_at:.1f}s, "
+                            f"acquired at {leak_site}")
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            entry = self._checked_out.pop(connection_record, None)
+        if not entry:
+            return
+        checked_out_at, site, reported = entry
+        held = time.monotonic() - checked_out_at
+        if held > self.leak_warn_seconds:
+            if not reported:
+                DB_CONNECTION_LEAKS.labels(self.name).inc()
+            logging.warning(f"Connection of the {self.name} pool returned after {held:.1f}s, acquired at {site}")
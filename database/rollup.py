@@ -0,0 +1,100 @@
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, exists, func, select, update
+
+from database.models.models import Offer, ScrapeData
+from utilities.price_history import bucket_expression
+
+logging.basicConfig(level=logging.INFO)
+
+SCRAPE_ROLLUP_AFTER_DAYS = int(os.getenv("SCRAPE_ROLLUP_AFTER_DAYS", "90"))
+SCRAPE_ROLLUP_BATCH_SIZE = int(os.getenv("SCRAPE_ROLLUP_BATCH_SIZE", "500"))
+# Offers are stored before their scrape, give a scrape in flight this long to land
+OFFER_ORPHAN_AFTER_HOURS = float(os.getenv("OFFER_ORPHAN_AFTER_HOURS", "24"))
+
+
+def rollup_cutoff(older_than_days: int) -> datetime:
+    """
+    Midnight `older_than_days` days ago, so only whole days are ever compacted.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    return datetime(cutoff.year, cutoff.month, cutoff.day)
+
+
+def compact_product_day(session, product_id_url: str, day_start: datetime):
+    """
+    Replace the scrapes of one product and day with a single daily aggregate.
+
+    The last scrape of the day is kept and rewritten: lowest min price, highest max price,
+    sample-weighted average price, while availabilities and offer statistics stay the closing
+    ones. Its sample_count adds up the rows it replaces, so compacting twice gives the same result.
+    """
+    in_day = (
+        ScrapeData.product_id_url == product_id_url,
+        ScrapeData.scrape_date >= day_start,
+        ScrapeData.scrape_date < day_start + timedelta(days=1),
+    )
+    min_price, max_price, weighted_avg, samples = session.execute(
+        select(func.min(ScrapeData.min_price), func.max(ScrapeData.max_price),
+               func.sum(ScrapeData.avg_price * ScrapeData.sample_count), func.sum(ScrapeData.sample_count))
+        .where(*in_day)
+    ).one()
+    keep_id = session.execute(
+        select(ScrapeData.scrape_id).where(*in_day)
+        .order_by(ScrapeData.scrape_date.desc(), ScrapeData.scrape_id.desc())
+        .limit(1)
+    ).scalar()
+
+    session.execute(
+        update(ScrapeData).where(ScrapeData.scrape_id == keep_id, *in_day)
+        .values(min_price=min_price, max_price=max_price, avg_price=weighted_avg / samples, sample_count=samples)
+    )
+    return session.execute(delete(ScrapeData).where(ScrapeData.scrape_id != keep_id, *in_day)).rowcount
+
+
+def rollup_scrapes(session, older_than_days: int = SCRAPE_ROLLUP_AFTER_DAYS,
+                   batch_size: int = SCRAPE_ROLLUP_BATCH_SIZE) -> int:
+    """
+    Compact raw scrapes older than `older_than_days` into one row per product and day.
+
+    Commits every `batch_size` product-days; returns the number of deleted rows.
+    """
+    cutoff = rollup_cutoff(older_than_days)
+    day = bucket_expression(session.get_bind().dialect.name, "day").label("scrape_day")
+    groups = session.execute(
+        select(ScrapeData.product_id_url, day)
+        .where(ScrapeData.scrape_date < cutoff)
+        .group_by(ScrapeData.product_id_url, day)
+        .having(func.count() > 1)
+        .order_by(day)
+    ).all()
+
+    deleted = 0
+    for position, (product_id_url, day_start) in enumerate(groups, start=1):
+        if isinstance(day_start, str):
+            day_start = datetime.fromisoformat(day_start)
+        deleted += compact_product_day(session, product_id_url, day_start)
+        if position % batch_size == 0:
+            session.commit()
+            logging.info(f"Rolled up {position}/{len(groups)} product-days, {deleted} scrapes removed")
+    session.commit()
+    logging.info(f"Rolled up {len(groups)} product-days older than {cutoff:%Y-%m-%d}, {deleted} scrapes removed")
+    return deleted
+
+
+def delete_orphan_offers(session, older_than_hours: float = OFFER_ORPHAN_AFTER_HOURS) -> int:
+    """
+    Delete the offers whose scrape row does not exist: the scrape failed or was lost after its
+    offers were captured, or the rollup compacted it away. Returns the number of deleted offers.
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=older_than_hours)
+    has_scrape = exists().where(and_(ScrapeData.product_id_url == Offer.product_id_url,
+                                     ScrapeData.scrape_date == Offer.scrape_date))
+    deleted = session.execute(
+        delete(Offer).where(Offer.scrape_date < cutoff, ~has_scrape).execution_options(synchronize_session=False)
+    ).rowcount
+    session.commit()
+    logging.info(f"Deleted {deleted} offers without a scrape")
+    return deleted
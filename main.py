@@ -1,9 +1,23 @@
-from fastapi import FastAPI
+import asyncio
+import os
+import time
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from api import products, owned_products, scraping, statistics, images
+from database.database import async_engine
+from scraping.http_fetcher import close_http_client
+from scraping.periodic import PeriodicScraper
+from scraping.scraper import driver_pool
+from utilities.metrics import HTTP_REQUEST_SECONDS
 
-from api import products, owned_products, scraping, statistics
+# Run the SCRAPE_SCHEDULE_* schedules inside the API instead of the standalone periodic_scraper.py
+SCRAPE_SCHEDULER_IN_PROCESS = os.getenv("SCRAPE_SCHEDULER_IN_PROCESS", "false").lower() == "true"
 
 app = FastAPI()
+periodic_scraper_task = None
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,19 +25,78 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
+
+# API routers with their prefix and tag, the tag also labels their request metrics
+ROUTERS = (
+    (products.router, "/api/products", "Products"),
+    (owned_products.router, "/api/owned_products", "Owned Products"),
+    (scraping.router, "/api/scraping", "Scraping"),
+    (statistics.router, "/api/statistics", "Statistics"),
+    (images.router, "/api/images", "Images"),
 )
 
 # Include API routers
-app.include_router(products.router, prefix="/api/products", tags=["Products"])
-app.include_router(owned_products.router, prefix="/api/owned_products", tags=["Owned Products"])
-app.include_router(scraping.router, prefix="/api/scraping", tags=["Scraping"])
-app.include_router(statistics.router, prefix="/api/statistics", tags=["Statistics"])
+for router, prefix, tag in ROUTERS:
+    app.include_router(router, prefix=prefix, tags=[tag])
+
+
+def request_router(path: str) -> str:
+    """
+    Tag of the router serving `path`, "other" outside of the API routers.
+    """
+    for _, prefix, tag in ROUTERS:
+        if path == prefix or path.startswith(prefix + "/"):
+            return tag
+    return "other"
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    # An exception escaping the app is answered with a 500 by the server error middleware
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_REQUEST_SECONDS.labels(request_router(request.url.path), request.method, status) \
+            .observe(time.perf_counter() - start)
+
+
+@app.on_event("startup")
+async def resume_scrape_jobs():
+    global periodic_scraper_task
+    await scraping.job_manager.resume_unfinished_jobs()
+    if SCRAPE_SCHEDULER_IN_PROCESS:
+        periodic_scraper_task = asyncio.create_task(PeriodicScraper(scraping.job_manager).run_forever())
+
+
+@app.on_event("shutdown")
+def close_driver_pool():
+    if periodic_scraper_task:
+        periodic_scraper_task.cancel()
+    scraping.scrape_scheduler.shutdown()
+    driver_pool.close()
+    close_http_client()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
 
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to the API!"}
 
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 # EXAMPLE FOR BULKING SCRAPING
 # [
 #         "https://www.cardmarket.com/it/Pokemon/Products/Singles/Brilliant-Stars/Sylveon-V-BRSTG14?language=5&minCondition=2",
@@ -0,0 +1,51 @@
+"""add scrape jobs
+
+Revision ID: 0001_scrape_jobs
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_scrape_jobs'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scrape_jobs',
+        sa.Column('job_id', sa.String(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('total_items', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('job_id')
+    )
+    op.create_table(
+        'scrape_job_items',
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.String(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('product_url', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('message', sa.String(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['scrape_jobs.job_id'], ),
+        sa.PrimaryKeyConstraint('item_id')
+    )
+    op.create_index(op.f('ix_scrape_job_items_job_id'), 'scrape_job_items', ['job_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_scrape_job_items_job_id'), table_name='scrape_job_items')
+    op.drop_table('scrape_job_items')
+    op.drop_table('scrape_jobs')
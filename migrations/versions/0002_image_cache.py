@@ -0,0 +1,50 @@
+"""add content-addressed image cache
+
+Revision ID: 0002_image_cache
+Revises: 0001_scrape_jobs
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_image_cache'
+down_revision: Union[str, None] = '0001_scrape_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'image_blobs',
+        sa.Column('image_hash', sa.String(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('content_type', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('image_hash')
+    )
+    op.create_table(
+        'image_sources',
+        sa.Column('source_url', sa.String(), nullable=False),
+        sa.Column('image_hash', sa.String(), nullable=False),
+        sa.Column('etag', sa.String(), nullable=True),
+        sa.Column('last_modified', sa.String(), nullable=True),
+        sa.Column('fetched_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['image_hash'], ['image_blobs.image_hash'], ),
+        sa.PrimaryKeyConstraint('source_url')
+    )
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('image_hash', sa.String(), nullable=True))
+        batch_op.create_foreign_key('fk_products_image_hash', 'image_blobs', ['image_hash'], ['image_hash'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_constraint('fk_products_image_hash', type_='foreignkey')
+        batch_op.drop_column('image_hash')
+    op.drop_table('image_sources')
+    op.drop_table('image_blobs')
@@ -0,0 +1,36 @@
+"""add image thumbnails
+
+Revision ID: 0003_image_thumbnails
+Revises: 0002_image_cache
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_image_thumbnails'
+down_revision: Union[str, None] = '0002_image_cache'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'image_thumbnails',
+        sa.Column('image_hash', sa.String(), nullable=False),
+        sa.Column('size', sa.String(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('content_type', sa.String(), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=False),
+        sa.Column('height', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['image_hash'], ['image_blobs.image_hash'], ),
+        sa.PrimaryKeyConstraint('image_hash', 'size')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('image_thumbnails')
@@ -0,0 +1,51 @@
+"""add latest scrapes snapshot
+
+Revision ID: 0004_latest_scrapes
+Revises: 0003_image_thumbnails
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_latest_scrapes'
+down_revision: Union[str, None] = '0003_image_thumbnails'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'latest_scrapes',
+        sa.Column('product_id_url', sa.String(), nullable=False),
+        sa.Column('scrape_date', sa.DateTime(), nullable=False),
+        sa.Column('total_availability', sa.Integer(), nullable=False),
+        sa.Column('detailed_availability', sa.Integer(), nullable=False),
+        sa.Column('min_price', sa.Float(), nullable=False),
+        sa.Column('max_price', sa.Float(), nullable=False),
+        sa.Column('avg_price', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id_url'], ['products.id_url'], ),
+        sa.PrimaryKeyConstraint('product_id_url')
+    )
+    # Seed the snapshot with the newest existing scrape of every product (highest id on equal dates)
+    op.execute("""
+        INSERT INTO latest_scrapes (product_id_url, scrape_date, total_availability, detailed_availability,
+                                    min_price, max_price, avg_price)
+        SELECT s.product_id_url, s.scrape_date, s.total_availability, s.detailed_availability,
+               s.min_price, s.max_price, s.avg_price
+        FROM scrapes s
+        WHERE s.scrape_id = (
+            SELECT s2.scrape_id FROM scrapes s2
+            WHERE s2.product_id_url = s.product_id_url
+            ORDER BY s2.scrape_date DESC, s2.scrape_id DESC
+            LIMIT 1
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('latest_scrapes')
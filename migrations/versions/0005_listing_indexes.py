@@ -0,0 +1,26 @@
+"""add keyset pagination index on latest scrapes
+
+Revision ID: 0005_listing_indexes
+Revises: 0004_latest_scrapes
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_listing_indexes'
+down_revision: Union[str, None] = '0004_latest_scrapes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_latest_scrapes_min_price_product', 'latest_scrapes', ['min_price', 'product_id_url'],
+                    unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_latest_scrapes_min_price_product', table_name='latest_scrapes')
@@ -0,0 +1,91 @@
+"""scrapes composite index, sample count and monthly partitions on postgresql
+
+Revision ID: 0006_scrapes_storage
+Revises: 0005_listing_indexes
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_scrapes_storage'
+down_revision: Union[str, None] = '0005_listing_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+SCRAPE_COLUMNS = ("scrape_id, product_id_url, scrape_date, total_availability, detailed_availability, "
+                  "min_price, max_price, avg_price, sample_count")
+
+
+def month_start(date: datetime, offset: int = 0) -> datetime:
+    month_index = date.year * 12 + date.month - 1 + offset
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def create_scrapes_table(partitioned: bool, sequence: str) -> None:
+    primary_key = "PRIMARY KEY (scrape_id, scrape_date)" if partitioned else "PRIMARY KEY (scrape_id)"
+    partitioning = " PARTITION BY RANGE (scrape_date)" if partitioned else ""
+    op.execute(f"""
+        CREATE TABLE scrapes (
+            scrape_id INTEGER NOT NULL DEFAULT nextval('{sequence}'),
+            product_id_url VARCHAR NOT NULL REFERENCES products (id_url),
+            scrape_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            total_availability INTEGER NOT NULL,
+            detailed_availability INTEGER NOT NULL,
+            min_price DOUBLE PRECISION NOT NULL,
+            max_price DOUBLE PRECISION NOT NULL,
+            avg_price DOUBLE PRECISION NOT NULL,
+            sample_count INTEGER NOT NULL DEFAULT 1,
+            {primary_key}
+        ){partitioning}
+    """)
+
+
+def swap_scrapes_table(partitioned: bool) -> None:
+    """
+    Rebuild scrapes as a (non) partitioned table, moving rows and the id sequence over.
+    """
+    bind = op.get_bind()
+    op.execute("ALTER TABLE scrapes RENAME TO scrapes_old")
+    op.execute("ALTER TABLE scrapes_old RENAME CONSTRAINT scrapes_pkey TO scrapes_old_pkey")
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('scrapes_old', 'scrape_id')")).scalar()
+
+    create_scrapes_table(partitioned, sequence)
+    if partitioned:
+        # One partition per month from the oldest scrape to a few months ahead, anything
+        # outside that range lands in the default partition until its month is created
+        oldest = bind.execute(sa.text("SELECT min(scrape_date) FROM scrapes_old")).scalar() or datetime.utcnow()
+        month = month_start(oldest)
+        last = month_start(datetime.utcnow(), MONTHS_AHEAD)
+        while month <= last:
+            op.execute(f"CREATE TABLE scrapes_{month:%Y_%m} PARTITION OF scrapes "
+                       f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{month_start(month, 1):%Y-%m-%d}')")
+            month = month_start(month, 1)
+        op.execute("CREATE TABLE scrapes_default PARTITION OF scrapes DEFAULT")
+
+    op.execute(f"INSERT INTO scrapes ({SCRAPE_COLUMNS}) SELECT {SCRAPE_COLUMNS} FROM scrapes_old")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY scrapes.scrape_id")
+    op.execute("DROP TABLE scrapes_old")
+
+
+def upgrade() -> None:
+    op.add_column('scrapes', sa.Column('sample_count', sa.Integer(), server_default='1', nullable=False))
+    if op.get_bind().dialect.name == 'postgresql':
+        swap_scrapes_table(partitioned=True)
+    op.create_index('ix_scrapes_product_date', 'scrapes', ['product_id_url', sa.text('scrape_date DESC')],
+                    unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scrapes_product_date', table_name='scrapes')
+    if op.get_bind().dialect.name == 'postgresql':
+        swap_scrapes_table(partitioned=False)
+    with op.batch_alter_table('scrapes') as batch_op:
+        batch_op.drop_column('sample_count')
@@ -0,0 +1,34 @@
+"""add robust price statistics to scrapes
+
+Revision ID: 0007_scrape_statistics
+Revises: 0006_scrapes_storage
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007_scrape_statistics'
+down_revision: Union[str, None] = '0006_scrapes_storage'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PRICE_COLUMNS = ('median_price', 'trimmed_mean_price', 'p10_price', 'p25_price', 'mad_price')
+COUNT_COLUMNS = ('offer_count', 'outlier_count')
+
+
+def upgrade() -> None:
+    for column in PRICE_COLUMNS:
+        op.add_column('scrapes', sa.Column(column, sa.Float(), nullable=True))
+    for column in COUNT_COLUMNS:
+        op.add_column('scrapes', sa.Column(column, sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('scrapes') as batch_op:
+        for column in PRICE_COLUMNS + COUNT_COLUMNS:
+            batch_op.drop_column(column)
@@ -0,0 +1,39 @@
+"""add offers table
+
+Revision ID: 0008_offers
+Revises: 0007_scrape_statistics
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008_offers'
+down_revision: Union[str, None] = '0007_scrape_statistics'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'offers',
+        sa.Column('offer_id', sa.Integer(), nullable=False),
+        sa.Column('product_id_url', sa.String(), nullable=False),
+        sa.Column('scrape_date', sa.DateTime(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('seller', sa.String(), nullable=True),
+        sa.Column('condition', sa.String(), nullable=True),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('offer_id')
+    )
+    op.create_index('ix_offers_product_date', 'offers', ['product_id_url', 'scrape_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_offers_product_date', table_name='offers')
+    op.drop_table('offers')
@@ -0,0 +1,28 @@
+"""add last_checked_at to latest scrapes
+
+Revision ID: 0009_latest_scrapes_checked
+Revises: 0008_offers
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009_latest_scrapes_checked'
+down_revision: Union[str, None] = '0008_offers'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('latest_scrapes', sa.Column('last_checked_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE latest_scrapes SET last_checked_at = scrape_date")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('latest_scrapes') as batch_op:
+        batch_op.drop_column('last_checked_at')
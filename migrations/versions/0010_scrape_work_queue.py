@@ -0,0 +1,39 @@
+"""add work queue columns to scrape jobs
+
+Revision ID: 0010_scrape_work_queue
+Revises: 0009_latest_scrapes_checked
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010_scrape_work_queue'
+down_revision: Union[str, None] = '0009_latest_scrapes_checked'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('scrape_jobs', sa.Column('mode', sa.String(), server_default='local', nullable=False))
+    op.add_column('scrape_job_items', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('scrape_job_items', sa.Column('available_at', sa.DateTime(), nullable=True))
+    op.add_column('scrape_job_items', sa.Column('leased_by', sa.String(), nullable=True))
+    op.add_column('scrape_job_items', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_scrape_job_items_status_available', 'scrape_job_items', ['status', 'available_at'],
+                    unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scrape_job_items_status_available', table_name='scrape_job_items')
+    with op.batch_alter_table('scrape_job_items') as batch_op:
+        batch_op.drop_column('lease_expires_at')
+        batch_op.drop_column('leased_by')
+        batch_op.drop_column('available_at')
+        batch_op.drop_column('attempts')
+    with op.batch_alter_table('scrape_jobs') as batch_op:
+        batch_op.drop_column('mode')
@@ -0,0 +1,36 @@
+"""
+Standalone scrape scheduler: runs the SCRAPE_SCHEDULE_* cron schedules without an external
+cron or an HTTP call keeping a connection open. Safe to run next to the API or on several
+hosts, every run takes a database advisory lock first.
+
+    python periodic_scraper.py
+"""
+import asyncio
+import logging
+
+from api.scraping import job_manager, scrape_scheduler
+from scraping.http_fetcher import close_http_client
+from scraping.periodic import PeriodicScraper
+from scraping.scraper import driver_pool
+from utilities.cache import warn_if_cache_not_shared
+from utilities.metrics import start_metrics_server
+
+logging.basicConfig(level=logging.INFO)
+
+
+async def main():
+    start_metrics_server()
+    warn_if_cache_not_shared("periodic scraper")
+    try:
+        await PeriodicScraper(job_manager).run_forever()
+    finally:
+        scrape_scheduler.shutdown()
+        driver_pool.close()
+        close_http_client()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logging.info("Periodic scraper stopped")
@@ -0,0 +1,27 @@
+"""
+Keeps the scrapes table bounded: creates the upcoming monthly partitions (PostgreSQL only) and
+compacts scrapes older than the rollup horizon into one row per product and day, then deletes
+the captured offers left without a scrape.
+
+    python rollup_scrapes.py [--older-than-days 90] [--batch-size 500]
+"""
+import argparse
+import logging
+
+from database.database import session_scope
+from database.partitions import ensure_scrape_partitions
+from database.rollup import SCRAPE_ROLLUP_AFTER_DAYS, SCRAPE_ROLLUP_BATCH_SIZE, delete_orphan_offers, rollup_scrapes
+
+logging.basicConfig(level=logging.INFO)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partition maintenance and daily rollup of old scrapes.")
+    parser.add_argument("--older-than-days", type=int, default=SCRAPE_ROLLUP_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=SCRAPE_ROLLUP_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with session_scope() as session:
+        ensure_scrape_partitions(session)
+        rollup_scrapes(session, args.older_than_days, args.batch_size)
+        delete_orphan_offers(session)
@@ -7,7 +7,7 @@ from datetime import datetime
 class OwnedProductCreate(BaseModel):
     product_id: str
     owned_qty: int
-    buy_price: float
+    buy_price: float  # paid for all owned_qty units together
     buy_date: str
     buy_availability: int
 
@@ -0,0 +1,138 @@
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium.common import WebDriverException, TimeoutException, NoSuchElementException
+
+logging.basicConfig(level=logging.INFO)
+
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "2"))
+DRIVER_MAX_PAGES = int(os.getenv("DRIVER_MAX_PAGES", "50"))
+DRIVER_BORROW_TIMEOUT = float(os.getenv("DRIVER_BORROW_TIMEOUT", "300"))
+
+
+class PooledDriver:
+    """
+    A browser session owned by the pool, with the number of pages it has served.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages_served = 0
+        self.broken = False
+
+
+class DriverPool:
+    """
+    Keeps a fixed number of long-lived WebDriver sessions and lends them out.
+
+    Sessions are created lazily by `driver_factory`, health-checked before every loan and
+    recycled after `max_pages` pages or as soon as a borrower reports a crash.
+    """
+
+    def __init__(self, driver_factory, size=DRIVER_POOL_SIZE, max_pages=DRIVER_MAX_PAGES,
+                 borrow_timeout=DRIVER_BORROW_TIMEOUT):
+        if size < 1:
+            raise ValueError("Driver pool size must be at least 1")
+        self.driver_factory = driver_factory
+        self.size = size
+        self.max_pages = max_pages
+        self.borrow_timeout = borrow_timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._all = set()
+        self._closed = False
+
+    @contextmanager
+    def borrow(self):
+        """
+        Lend a healthy driver for the duration of the `with` block.
+
+        A WebDriverException raised inside the block (other than a timeout or a missing element)
+        marks the session as crashed, so it is quit and replaced instead of being reused.
+        """
+        if self._closed:
+            raise RuntimeError("Driver pool is closed")
+        if not self._slots.acquire(timeout=self.borrow_timeout):
+            raise TimeoutError(f"No driver available within {self.borrow_timeout} seconds")
+
+        pooled = None
+        try:
+            pooled = self._checkout()
+            yield pooled.driver
+            pooled.pages_served += 1
+        except WebDriverException as e:
+            # A missing element or a slow page is not a crash, the session can be reused
+            if pooled and not isinstance(e, (TimeoutException, NoSuchElementException)):
+                pooled.broken = True
+            raise
+        finally:
+            if pooled:
+                self._checkin(pooled)
+            self._slots.release()
+
+    def _checkout(self):
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                return self._create()
+            if self._is_healthy(pooled):
+                return pooled
+            self._discard(pooled)
+
+    def _checkin(self, pooled):
+        if pooled.broken or pooled.pages_served >= self.max_pages or self._closed:
+            self._discard(pooled)
+        else:
+            self._idle.put(pooled)
+
+    def _create(self):
+        pooled = PooledDriver(self.driver_factory())
+        with self._lock:
+            self._all.add(pooled)
+        logging.info(f"Driver pool: started a new browser session ({len(self._all)}/{self.size})")
+        return pooled
+
+    def _discard(self, pooled):
+        with self._lock:
+            self._all.discard(pooled)
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logging.warning(f"Driver pool: error while quitting a browser session: {e}")
+        logging.info(f"Driver pool: recycled a browser session after {pooled.pages_served} pages")
+
+    @staticmethod
+    def _is_healthy(pooled):
+        if pooled.broken:
+            return False
+        try:
+            # Cheap round trip to the driver, fails if the browser process has died
+            pooled.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        """
+        Quit every idle session. Borrowed sessions are quit when they are returned.
+        """
+        self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(pooled)
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "max_pages": self.max_pages,
+            "open_sessions": len(self._all),
+            "idle_sessions": self._idle.qsize(),
+        }
@@ -0,0 +1,112 @@
+import logging
+import os
+import threading
+
+import httpx
+
+from scraping.page_parser import extract_page_fields, is_product_page, build_product_data
+from scraping.image_cache import ImageCache
+from scraping.offers import SCRAPE_OFFERS, capture_offers, iter_page_offers
+from scraping.resilience import ScrapeBlocked
+from scraping.scraper_utilities import get_random_user_agent
+from utilities.common import ProductPartialParams
+from utilities.metrics import SCRAPE_STAGE_SECONDS
+
+logging.basicConfig(level=logging.INFO)
+
+HTTP_FETCH_TIMEOUT = float(os.getenv("HTTP_FETCH_TIMEOUT", "15"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "10"))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class PageRequiresBrowser(Exception):
+    """
+    The page could not be scraped without a browser (challenge page, blocked or JS-only content).
+    """
+
+
+def get_http_client() -> httpx.Client:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(
+                headers={
+                    "User-Agent": get_random_user_agent(),
+                    "Accept-Language": "it-IT,it;q=0.9,en;q=0.8",
+                },
+                timeout=HTTP_FETCH_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                    max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+            )
+        return _client
+
+
+def set_http_client(client: httpx.Client):
+    """
+    Replace the shared client, e.g. by one on an httpx.MockTransport replaying recorded pages.
+    """
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = client
+
+
+def close_http_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+image_cache = ImageCache(get_http_client)
+
+
+def retry_after_seconds(response: httpx.Response):
+    """
+    Pause asked by a Retry-After header given in seconds, None without one.
+    """
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+@SCRAPE_STAGE_SECONDS.labels("http_download").time()
+def fetch_page_html(url: str) -> str:
+    try:
+        response = get_http_client().get(url)
+    except httpx.HTTPError as e:
+        raise PageRequiresBrowser(f"HTTP request to {url} failed: {e}")
+    if response.status_code == 429:
+        # A browser would be rate limited just the same
+        raise ScrapeBlocked(f"HTTP request to {url} was rate limited", retry_after_seconds(response))
+    if response.status_code != 200:
+        raise PageRequiresBrowser(f"HTTP request to {url} returned status {response.status_code}")
+    return response.text
+
+
+def fetch_product_data_http(product_data: ProductPartialParams):
+    """
+    Browserless variant of `fetch_product_data`: one GET, one parse pass, same result dict.
+
+    Raises PageRequiresBrowser when the downloaded HTML is not a usable product page.
+    """
+    html = fetch_page_html(product_data.url)
+    fields = extract_page_fields(html, product_data.product_type, product_data.tcg_name)
+    if not is_product_page(fields):
+        raise PageRequiresBrowser(f"No product data found in the HTML of {product_data.url}")
+
+    scrape_date = None
+    if SCRAPE_OFFERS == "page":
+        scrape_date = capture_offers(product_data.url, iter_page_offers(html), fields)
+
+    image_hash = image_cache.get_image_hash(fields["image_url"])
+    product_data = build_product_data(product_data, fields, image_hash)
+    if scrape_date:
+        product_data["scrape_date"] = scrape_date
+    return product_data
@@ -0,0 +1,82 @@
+import logging
+import os
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import update
+
+from database.database import SessionLocal, session_scope
+from database.models.models import ImageSource
+from scraping.image_pipeline import store_image
+from utilities.metrics import SCRAPE_STAGE_SECONDS
+
+logging.basicConfig(level=logging.INFO)
+
+# A cached source URL is trusted without any request for this long, then revalidated with a conditional GET
+IMAGE_REVALIDATE_AFTER = timedelta(days=int(os.getenv("IMAGE_REVALIDATE_AFTER_DAYS", "30")))
+IMAGE_REFERER = "https://www.cardmarket.com/it/Pokemon"
+
+
+class ImageCache:
+    """
+    Image download cache keyed by source URL, backed by content-addressed blobs.
+
+    Blobs are keyed by the SHA-256 of the downloaded bytes, so identical images are stored
+    and thumbnailed once. Known source URLs are revalidated with ETag / If-Modified-Since.
+    """
+
+    def __init__(self, http_client_factory, session_factory=SessionLocal):
+        self.http_client_factory = http_client_factory
+        self.session_factory = session_factory
+
+    @SCRAPE_STAGE_SECONDS.labels("image_download").time()
+    def get_image_hash(self, image_url: str):
+        """
+        Return the hash of the blob holding the image at `image_url`, downloading it only if needed.
+        """
+        if not image_url:
+            logging.warning("Image element not found")
+            return None
+
+        with session_scope(self.session_factory) as session:
+            source = session.get(ImageSource, image_url)
+            if source and datetime.utcnow() - source.fetched_at < IMAGE_REVALIDATE_AFTER:
+                return source.image_hash
+            known_hash = source.image_hash if source else None
+
+            headers = {"Referer": IMAGE_REFERER}
+            if source and source.etag:
+                headers["If-None-Match"] = source.etag
+            if source and source.last_modified:
+                headers["If-Modified-Since"] = source.last_modified
+
+        # No pooled connection is held while the image downloads
+        try:
+            response = self.http_client_factory().get(image_url, headers=headers)
+        except httpx.HTTPError as e:
+            logging.error(f"Error downloading image from {image_url}: {e}")
+            return known_hash
+
+        if response.status_code == 304 and known_hash:
+            with session_scope(self.session_factory) as session:
+                session.execute(
+                    update(ImageSource).where(ImageSource.source_url == image_url).values(fetched_at=datetime.utcnow())
+                )
+            return known_hash
+        if response.status_code != 200:
+            logging.warning(f"Image download from {image_url} returned status {response.status_code}")
+            return known_hash
+
+        with session_scope(self.session_factory) as session:
+            image_hash = store_image(session, response.content, image_url)
+            if not image_hash:
+                return known_hash
+
+            session.merge(ImageSource(
+                source_url=image_url,
+                image_hash=image_hash,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                fetched_at=datetime.utcnow(),
+            ))
+        return image_hash
@@ -0,0 +1,74 @@
+import hashlib
+import logging
+import os
+from datetime import datetime
+from io import BytesIO
+
+from PIL import Image, features
+
+from database.db_operations import insert_ignore_existing
+from database.models.models import ImageBlob, ImageThumbnail
+
+logging.basicConfig(level=logging.INFO)
+
+# Bounding boxes (width, height) of the pre-sized thumbnails, card photos keep their aspect ratio
+THUMBNAIL_SIZES = {
+    "list": (160, 224),
+    "detail": (480, 672),
+}
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+THUMBNAIL_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+
+CONTENT_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp", "GIF": "image/gif"}
+
+
+def open_image(image_data: bytes, image_url: str = ""):
+    try:
+        image = Image.open(BytesIO(image_data))
+        image.load()
+        return image
+    except Exception as e:
+        logging.error(f"Error processing image from {image_url}: {e}")
+        return None
+
+
+def make_thumbnail(image: Image.Image, box) -> tuple:
+    thumbnail = image.copy()
+    thumbnail.thumbnail(box, Image.LANCZOS)
+    if thumbnail.mode not in ("RGB", "RGBA") or (THUMBNAIL_FORMAT == "JPEG" and thumbnail.mode == "RGBA"):
+        thumbnail = thumbnail.convert("RGB")
+    byte_io = BytesIO()
+    thumbnail.save(byte_io, format=THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+    return byte_io.getvalue(), thumbnail.width, thumbnail.height
+
+
+def store_thumbnails(session, image_hash: str, image: Image.Image):
+    rows = []
+    for size, box in THUMBNAIL_SIZES.items():
+        data, width, height = make_thumbnail(image, box)
+        rows.append({"image_hash": image_hash, "size": size, "data": data,
+                     "content_type": CONTENT_TYPES[THUMBNAIL_FORMAT], "width": width, "height": height})
+    insert_ignore_existing(session, ImageThumbnail, rows)
+
+
+def store_image(session, image_data: bytes, image_url: str = ""):
+    """
+    Store downloaded image bytes as a content-addressed blob plus its thumbnails.
+
+    The original encoding is kept as is; an already known hash costs no decoding at all.
+    Returns the image hash, or None if the bytes are not a readable image.
+    """
+    image_hash = hashlib.sha256(image_data).hexdigest()
+    if session.get(ImageBlob, image_hash):
+        return image_hash
+
+    image = open_image(image_data, image_url)
+    if image is None:
+        return None
+
+    insert_ignore_existing(session, ImageBlob, [{
+        "image_hash": image_hash, "data": image_data, "content_type": CONTENT_TYPES.get(image.format, "image/png"),
+        "created_at": datetime.utcnow(),
+    }])
+    store_thumbnails(session, image_hash, image)
+    return image_hash
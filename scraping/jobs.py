@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+
+from database.database import SessionLocal, session_scope
+from database.locks import AdvisoryLock
+from database.models.models import ScrapeJob, ScrapeJobItem
+from scraping.scheduler import ScrapeScheduler
+
+logging.basicConfig(level=logging.INFO)
+
+UNFINISHED_JOB_STATUSES = ("pending", "running")
+
+
+class ScrapeJobManager:
+    """
+    Runs scrape jobs in the background and persists the outcome of every URL.
+
+    A job is a list of URLs stored in `scrape_job_items`. Only items still `pending` are
+    scraped when a job (re)starts, so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, scheduler: ScrapeScheduler, session_factory=SessionLocal):
+        self.scheduler = scheduler
+        self.session_factory = session_factory
+        self._tasks = {}
+        self._stopping = set()
+
+    def create_job(self, product_urls, kind: str, mode: str = "local") -> str:
+        """
+        Persist a job and its items. "queue" jobs are not run here but leased by worker.py processes.
+        """
+        product_urls = list(dict.fromkeys(product_urls))
+        job_id = uuid.uuid4().hex
+        with session_scope(self.session_factory) as session:
+            session.add(ScrapeJob(job_id=job_id, kind=kind, status="pending", total_items=len(product_urls),
+                                  mode=mode))
+            session.bulk_insert_mappings(ScrapeJobItem, [
+                {"job_id": job_id, "position": position, "product_url": product_url, "status": "pending"}
+                for position, product_url in enumerate(product_urls)
+            ])
+        logging.info(f"Created {mode} scrape job {job_id} ({kind}) with {len(product_urls)} URLs")
+        return job_id
+
+    async def submit(self, product_urls, kind: str, mode: str = "local") -> str:
+        job_id = await run_in_threadpool(self.create_job, product_urls, kind, mode)
+        if mode == "local":
+            self.start(job_id)
+        return job_id
+
+    def start(self, job_id: str):
+        task = self._tasks.get(job_id)
+        if task and not task.done():
+            return
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+    def is_running(self, job_id: str) -> bool:
+        task = self._tasks.get(job_id)
+        return bool(task and not task.done())
+
+    async def stop(self, job_id: str):
+        """
+        Cancel a running job and mark it "stopped"; its pending URLs are kept for a manual resume.
+        """
+        task = self._tasks.get(job_id)
+        if task and not task.done():
+            self._stopping.add(job_id)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def wait(self, job_id: str, timeout: float = None) -> bool:
+        """
+        Wait for a job to finish, stopping it after `timeout` seconds. False if it was stopped.
+        """
+        task = self._tasks.get(job_id)
+        if not task:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logging.warning(f"Scrape job {job_id} exceeded its {timeout:.0f}s budget, stopping it")
+            await self.stop(job_id)
+            return False
+
+    async def _run(self, job_id: str):
+        # Every API replica resumes the unfinished jobs at startup, only the lock holder runs one
+        lock = AdvisoryLock(f"scrape-job:{job_id}")
+        if not await run_in_threadpool(lock.acquire):
+            logging.info(f"Scrape job {job_id} is run by another process, not starting it here")
+            self._tasks.pop(job_id, None)
+            return
+        try:
+            pending = await run_in_threadpool(self._start_job, job_id)
+            urls_by_item = {product_url: item_id for item_id, product_url in pending}
+
+            async def record(result):
+                await run_in_threadpool(self._record_result, urls_by_item[result["product_url"]], result)
+
+            await self.scheduler.run([product_url for _, product_url in pending], on_result=record)
+            await run_in_threadpool(self._finish_job, job_id, "completed")
+        except asyncio.CancelledError:
+            if job_id in self._stopping:
+                self._stopping.discard(job_id)
+                await run_in_threadpool(self._finish_job, job_id, "stopped")
+                return
+            # Left as "running": the job is picked up again by resume_unfinished_jobs
+            logging.warning(f"Scrape job {job_id} interrupted")
+            raise
+        except Exception as e:
+            logging.error(f"Scrape job {job_id} failed: {e}")
+            await run_in_threadpool(self._finish_job, job_id, "failed")
+        finally:
+            self._tasks.pop(job_id, None)
+            await run_in_threadpool(lock.release)
+
+    def _start_job(self, job_id: str):
+        with session_scope(self.session_factory) as session:
+            job = session.get(ScrapeJob, job_id)
+            job.status = "running"
+            job.started_at = job.started_at or datetime.utcnow()
+            job.finished_at = None
+            return (
+                session.query(ScrapeJobItem.item_id, ScrapeJobItem.product_url)
+                .filter(ScrapeJobItem.job_id == job_id, ScrapeJobItem.status == "pending")
+                .order_by(ScrapeJobItem.position)
+                .all()
+            )
+
+    def _record_result(self, item_id: int, result: dict):
+        with session_scope(self.session_factory) as session:
+            item = session.get(ScrapeJobItem, item_id)
+            item.status = result["status"]
+            item.message = result["message"]
+            item.finished_at = datetime.utcnow()
+
+    def _finish_job(self, job_id: str, status: str):
+        with session_scope(self.session_factory) as session:
+            job = session.get(ScrapeJob, job_id)
+            job.status = status
+            job.finished_at = datetime.utcnow()
+        logging.info(f"Scrape job {job_id} {status}")
+
+    async def resume(self, job_id: str) -> bool:
+        """
+        Restart a job that is not currently running. Returns False if the job does not exist.
+        """
+        mode = await run_in_threadpool(self._reset_failed_items, job_id)
+        if not mode:
+            return False
+        if mode == "local":
+            self.start(job_id)
+        return True
+
+    def _reset_failed_items(self, job_id: str):
+        """
+        Put the failed items of a job back to pending. Returns the job mode, None if there is no such job.
+        """
+        with session_scope(self.session_factory) as session:
+            job = session.get(ScrapeJob, job_id)
+            if not job:
+                return None
+            # Failed URLs get another chance when a job is resumed by hand
+            session.query(ScrapeJobItem) \
+                .filter(ScrapeJobItem.job_id == job_id, ScrapeJobItem.status == "error") \
+                .update({"status": "pending", "message": None, "finished_at": None, "attempts": 0,
+                         "available_at": None})
+            if job.mode == "queue" and job.status not in UNFINISHED_JOB_STATUSES:
+                # Workers only lease the items of open jobs
+                job.status = "pending"
+                job.finished_at = None
+            return job.mode
+
+    def _get_unfinished_job_ids(self):
+        with session_scope(self.session_factory) as session:
+            return [job_id for (job_id,) in
+                    session.query(ScrapeJob.job_id)
+                    .filter(ScrapeJob.mode == "local", ScrapeJob.status.in_(UNFINISHED_JOB_STATUSES))]
+
+    async def resume_unfinished_jobs(self):
+        for job_id in await run_in_threadpool(self._get_unfinished_job_ids):
+            logging.info(f"Resuming scrape job {job_id}")
+            self.start(job_id)
+
+    def get_status(self, job_id: str, finished_since: datetime = None):
+        """
+        Progress counters and throughput of a job, plus the URLs finished at or after `finished_since`.
+        """
+        with session_scope(self.session_factory) as session:
+            job = session.get(ScrapeJob, job_id)
+            if not job:
+                return None
+
+            counts = dict(
+                session.query(ScrapeJobItem.status, func.count(ScrapeJobItem.item_id))
+                .filter(ScrapeJobItem.job_id == job_id)
+                .group_by(ScrapeJobItem.status)
+                .all()
+            )
+            finished_items = session.query(ScrapeJobItem) \
+                .filter(ScrapeJobItem.job_id == job_id, ScrapeJobItem.status != "pending")
+            if finished_since:
+                finished_items = finished_items.filter(ScrapeJobItem.finished_at >= finished_since)
+            finished_items = finished_items.order_by(ScrapeJobItem.finished_at).all()
+
+            done = counts.get("success", 0) + counts.get("error", 0)
+            end = job.finished_at or datetime.utcnow()
+            elapsed = (end - job.started_at).total_seconds() if job.started_at else 0
+
+            return {
+                "job_id": job.job_id,
+                "kind": job.kind,
+                "status": job.status,
+                "mode": job.mode,
+                "running": self.is_running(job_id) if job.mode == "local" else job.status in UNFINISHED_JOB_STATUSES,
+                "created_at": job.created_at,
+                "started_at": job.started_at,
+                "finished_at": job.finished_at,
+                "total": job.total_items,
+                "done": done,
+                "succeeded": counts.get("success", 0),
+                "failed": counts.get("error", 0),
+                "pending": counts.get("pending", 0),
+                "leased": counts.get("leased", 0),
+                "elapsed_seconds": round(elapsed, 1),
+                "urls_per_minute": round(done / elapsed * 60, 2) if elapsed else 0,
+                "items": [
+                    {
+                        "item_id": item.item_id,
+                        "product_url": item.product_url,
+                        "status": item.status,
+                        "message": item.message,
+                        "finished_at": item.finished_at,
+                    }
+                    for item in finished_items
+                ],
+            }
@@ -0,0 +1,127 @@
+import logging
+import os
+from datetime import datetime
+
+from selenium.common import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+from sqlalchemy.exc import SQLAlchemyError
+
+from database.database import session_scope
+from database.db_operations import save_offers
+from scraping.page_parser import make_soup, select_text, parse_availability
+from scraping.price_statistics import parse_prices
+from scraping.scraper_utilities import try_table_expansion
+from scraping.scraping_selectors import ScrapingSelectorsEnum
+from utilities.metrics import SCRAPE_STAGE_SECONDS
+
+logging.basicConfig(level=logging.INFO)
+
+# "off" stores no offers, "page" stores the offers of the downloaded page and "full" expands
+# the whole offer table in the browser first
+SCRAPE_OFFERS = os.getenv("SCRAPE_OFFERS", "off")
+OFFER_MAX_ROWS = int(os.getenv("OFFER_MAX_ROWS", "2000"))
+OFFER_CHUNK_SIZE = int(os.getenv("OFFER_CHUNK_SIZE", "200"))
+OFFER_EXPANSION_TIMEOUT = float(os.getenv("OFFER_EXPANSION_TIMEOUT", "5"))
+
+COUNT_ROWS_SCRIPT = "return document.querySelectorAll(arguments[0]).length;"
+NEW_ROWS_SCRIPT = """
+    return Array.from(document.querySelectorAll(arguments[0]))
+        .slice(arguments[1], arguments[1] + arguments[2])
+        .map(row => row.outerHTML);
+"""
+
+
+def parse_offer_row(row):
+    prices = parse_prices([select_text(row, ScrapingSelectorsEnum.OFFER_PRICE.value)])
+    if prices.size == 0:
+        return None
+    return {
+        "seller": select_text(row, ScrapingSelectorsEnum.OFFER_SELLER.value) or None,
+        "condition": select_text(row, ScrapingSelectorsEnum.OFFER_CONDITION.value) or None,
+        "price": float(prices[0]),
+        "quantity": parse_availability(select_text(row, ScrapingSelectorsEnum.OFFER_QUANTITY.value)),
+    }
+
+
+def iter_offers(rows):
+    for row in rows:
+        offer = parse_offer_row(row)
+        if offer is not None:
+            yield offer
+
+
+def iter_page_offers(html: str):
+    """
+    Offers of the offer table as served in the page, without any expansion.
+    """
+    yield from iter_offers(make_soup(html).select(ScrapingSelectorsEnum.OFFER_ROWS.value))
+
+
+def expand_offer_table(driver, loaded_rows: int) -> bool:
+    """
+    Click "load more" and wait for new rows, False once the table is complete.
+    """
+    if not try_table_expansion(driver, OFFER_EXPANSION_TIMEOUT):
+        return False
+    try:
+        WebDriverWait(driver, OFFER_EXPANSION_TIMEOUT).until(
+            lambda d: d.execute_script(COUNT_ROWS_SCRIPT, ScrapingSelectorsEnum.OFFER_ROWS.value) > loaded_rows
+        )
+        return True
+    except TimeoutException:
+        logging.warning(f"No new offers appeared after expanding the table at {loaded_rows} rows")
+        return False
+
+
+def iter_expanded_offers(driver, max_rows: int = OFFER_MAX_ROWS):
+    """
+    Offers of the page open in `driver`, expanding the offer table until it is complete or
+    `max_rows` rows have been read.
+
+    After every expansion only the rows not read yet are copied out of the browser and parsed,
+    so the Python side never holds more than one expansion's worth of HTML.
+    """
+    loaded_rows = 0
+    while loaded_rows < max_rows:
+        fragments = driver.execute_script(NEW_ROWS_SCRIPT, ScrapingSelectorsEnum.OFFER_ROWS.value,
+                                          loaded_rows, max_rows - loaded_rows)
+        if fragments:
+            soup = make_soup("".join(fragments))
+            yield from iter_offers((soup.body or soup).find_all(recursive=False))
+            loaded_rows += len(fragments)
+        if loaded_rows >= max_rows or not expand_offer_table(driver, loaded_rows):
+            break
+    if loaded_rows >= max_rows:
+        logging.info(f"Stopped reading the offer table at the {max_rows} rows limit")
+
+
+@SCRAPE_STAGE_SECONDS.labels("offers").time()
+def capture_offers(product_id_url: str, offers, fields: dict):
+    """
+    Stream `offers` into the offers table and return the scrape date they are stored under.
+
+    When offers were stored, the price and quantity lists of `fields` are replaced by those of
+    every stored offer, so the scrape statistics cover the whole captured table.
+    """
+    scrape_date = datetime.utcnow()
+    prices = []
+    quantities = []
+
+    def tracked(offer_stream):
+        for offer in offer_stream:
+            prices.append(offer["price"])
+            quantities.append(offer["quantity"])
+            yield offer
+
+    try:
+        with session_scope() as session:
+            stored = save_offers(session, product_id_url, scrape_date, tracked(offers), OFFER_CHUNK_SIZE)
+    except SQLAlchemyError as e:
+        logging.error(f"An error occurred while saving the offers of {product_id_url}: {e}")
+        return scrape_date
+
+    logging.info(f"Stored {stored} offers of {product_id_url}")
+    if stored:
+        fields["offer_prices"] = prices
+        fields["availability_texts"] = quantities
+    return scrape_date
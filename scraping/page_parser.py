@@ -0,0 +1,114 @@
+from bs4 import BeautifulSoup, FeatureNotFound
+
+from scraping.price_statistics import compute_price_statistics, compute_price_statistics_from_prices
+from scraping.scraper_utilities import sum_availability_texts
+from scraping.scraping_selectors import ScrapingSelectorsEnum
+from utilities.common import ProductPartialParams
+from utilities.metrics import SCRAPE_SELECTOR_SECONDS, SCRAPE_STAGE_SECONDS
+
+
+@SCRAPE_STAGE_SECONDS.labels("html_parse").time()
+def make_soup(html: str) -> BeautifulSoup:
+    try:
+        return BeautifulSoup(html, "lxml")
+    except FeatureNotFound:
+        return BeautifulSoup(html, "html.parser")
+
+
+def select_text(soup, selector: str) -> str:
+    element = soup.select_one(selector)
+    return element.get_text(" ", strip=True) if element else ""
+
+
+def select_all_texts(soup, selector: str) -> list:
+    return [element.get_text(" ", strip=True) for element in soup.select(selector)]
+
+
+def timed_select(field: str, select, soup, selector: str):
+    with SCRAPE_SELECTOR_SECONDS.labels(field).time():
+        return select(soup, selector)
+
+
+def extract_page_fields(html: str, product_type: str, tcg_name: str) -> dict:
+    """
+    Parse a product page once and pull every field the scraper needs out of it.
+
+    Missing selectors produce empty values instead of errors, the caller decides
+    whether the page is usable through `is_product_page`.
+    """
+    soup = make_soup(html)
+    singles = product_type == "Singles"
+
+    title = ""
+    subtitle = ""
+    with SCRAPE_SELECTOR_SECONDS.labels("title").time():
+        h1_element = soup.select_one(ScrapingSelectorsEnum.PRODUCT_NAME.value)
+        if h1_element:
+            title = "".join(h1_element.find_all(string=True, recursive=False)).strip()
+            span = h1_element.find("span")
+            subtitle = span.get_text().strip() if span else ""
+
+    image_selector = ScrapingSelectorsEnum.SINGLES_IMAGE if singles else ScrapingSelectorsEnum.SEALED_IMAGE
+    with SCRAPE_SELECTOR_SECONDS.labels("image_url").time():
+        image_element = soup.select_one(image_selector.value)
+
+    availability_selector = ScrapingSelectorsEnum.SINGLES_TOTAL_AVAILABILITY if singles \
+        else ScrapingSelectorsEnum.SEALED_TOTAL_AVAILABILITY
+
+    fields = {
+        "title": title,
+        "subtitle": subtitle,
+        "image_url": image_element.get("src", "") if image_element else "",
+        "price_texts": timed_select("price_texts", select_all_texts, soup, ScrapingSelectorsEnum.TABLE_PRICES.value),
+        "availability_texts": timed_select("availability_texts", select_all_texts, soup,
+                                           ScrapingSelectorsEnum.TABLE_AVAILABILITIES.value),
+        "total_availability": timed_select("total_availability", select_text, soup, availability_selector.value),
+        "set_name": "",
+        "card_number": "",
+        "pokemon_species": "",
+    }
+
+    if singles:
+        fields["set_name"] = timed_select("set_name", select_text, soup, ScrapingSelectorsEnum.SET_NAME.value)
+        fields["card_number"] = timed_select("card_number", select_text, soup, ScrapingSelectorsEnum.CARD_NUMBER.value)
+        if tcg_name == "Pokemon":
+            fields["pokemon_species"] = timed_select("pokemon_species", select_text, soup,
+                                                     ScrapingSelectorsEnum.POKEMON_SPECIES.value)
+
+    return fields
+
+
+def parse_availability(text: str) -> int:
+    digits = "".join(char for char in text if char.isdigit())
+    return int(digits) if digits else 0
+
+
+def is_product_page(fields: dict) -> bool:
+    """
+    A rendered product page always has a title and at least one offer row.
+    """
+    return bool(fields["title"]) and bool(fields["price_texts"])
+
+
+def build_product_data(partial_params: ProductPartialParams, fields: dict, image_hash) -> dict:
+    if fields.get("offer_prices"):
+        price_statistics = compute_price_statistics_from_prices(fields["offer_prices"])
+    else:
+        price_statistics = compute_price_statistics(fields["price_texts"])
+
+    return {
+        "id_url": partial_params.url,
+        "product_name": partial_params.product_name,
+        "title": fields["title"] or "",
+        "subtitle": fields["subtitle"] or "",
+        "image_hash": image_hash,
+        "product_type": partial_params.product_type,
+        "set_name": fields["set_name"] or "",
+        "card_number": fields["card_number"] or "",
+        "language": partial_params.language,
+        "condition": partial_params.condition or "",
+        "tcg_name": partial_params.tcg_name,
+        "pokemon_species": fields["pokemon_species"] or "",
+        "detailed_availability": sum_availability_texts(fields["availability_texts"]),
+        "total_availability": parse_availability(fields["total_availability"]),
+    } | price_statistics
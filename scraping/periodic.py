@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+from fastapi.concurrency import run_in_threadpool
+
+from database.database import session_scope
+from database.locks import AdvisoryLock
+from database.partitions import ensure_scrape_partitions
+from database.rollup import delete_orphan_offers, rollup_scrapes
+from scraping.jobs import ScrapeJobManager
+from scraping.refresh_policy import get_product_urls_to_scrape
+from utilities.cron import CronSchedule
+
+logging.basicConfig(level=logging.INFO)
+
+# Cron expressions in UTC, an empty value disables the schedule
+SCRAPE_SCHEDULE_SINGLES = os.getenv("SCRAPE_SCHEDULE_SINGLES", "0 */6 * * *")
+SCRAPE_SCHEDULE_SEALED = os.getenv("SCRAPE_SCHEDULE_SEALED", "30 */12 * * *")
+SCRAPE_SCHEDULE_ROLLUP = os.getenv("SCRAPE_SCHEDULE_ROLLUP", "15 4 * * *")
+# A scheduled scrape run still going after this long is stopped, its remaining products stay due
+SCRAPE_RUN_MAX_MINUTES = float(os.getenv("SCRAPE_RUN_MAX_MINUTES", "120"))
+
+
+@dataclass
+class ScheduledTask:
+    name: str
+    schedule: CronSchedule
+    action: object  # async callable without arguments
+
+
+class PeriodicScraper:
+    """
+    Runs the scheduled scrape and maintenance tasks, in the API process or standalone.
+
+    Each run holds the advisory lock named after its task, so when several API replicas or
+    scheduler processes are up only one of them runs a given task; the others skip that run.
+    """
+
+    def __init__(self, job_manager: ScrapeJobManager, max_runtime_minutes: float = SCRAPE_RUN_MAX_MINUTES):
+        self.job_manager = job_manager
+        self.max_runtime = max_runtime_minutes * 60
+        self.tasks = []
+        for name, expression, action in (
+            ("scrape-singles", SCRAPE_SCHEDULE_SINGLES, lambda: self.scrape("Singles")),
+            ("scrape-sealed", SCRAPE_SCHEDULE_SEALED, lambda: self.scrape("Sealed")),
+            ("rollup", SCRAPE_SCHEDULE_ROLLUP, self.rollup),
+        ):
+            if expression.strip():
+                self.tasks.append(ScheduledTask(name, CronSchedule(expression), action))
+
+    @staticmethod
+    def load_product_urls(product_type: str):
+        with session_scope() as session:
+            return get_product_urls_to_scrape(session, product_type)
+
+    async def scrape(self, product_type: str):
+        product_urls, catalogue_size = await run_in_threadpool(self.load_product_urls, product_type)
+        if not product_urls:
+            logging.info(f"Scheduled {product_type} scrape: none of {catalogue_size} products is due")
+            return
+        job_id = await self.job_manager.submit(product_urls, f"Scheduled {product_type}")
+        logging.info(f"Scheduled {product_type} scrape: job {job_id} with {len(product_urls)} "
+                     f"of {catalogue_size} products")
+        await self.job_manager.wait(job_id, self.max_runtime)
+
+    @staticmethod
+    def run_rollup():
+        with session_scope() as session:
+            ensure_scrape_partitions(session)
+            rollup_scrapes(session)
+            delete_orphan_offers(session)
+
+    async def rollup(self):
+        await run_in_threadpool(self.run_rollup)
+
+    async def run_task(self, task: ScheduledTask):
+        lock = AdvisoryLock(f"periodic-scraper:{task.name}")
+        if not await run_in_threadpool(lock.acquire):
+            logging.info(f"Skipping {task.name}, another instance is running it")
+            return
+        try:
+            logging.info(f"Running scheduled task {task.name}")
+            await task.action()
+        except Exception as e:
+            logging.error(f"Scheduled task {task.name} failed: {e}")
+        finally:
+            await run_in_threadpool(lock.release)
+
+    async def run_forever(self):
+        """
+        Sleep until the next due task and run it, one task at a time.
+        """
+        if not self.tasks:
+            logging.info("No scrape schedules configured")
+            return
+        next_runs = {task.name: task.schedule.next_after(datetime.utcnow()) for task in self.tasks}
+        while True:
+            task = min(self.tasks, key=lambda item: next_runs[item.name])
+            delay = (next_runs[task.name] - datetime.utcnow()).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.run_task(task)
+            next_runs[task.name] = task.schedule.next_after(datetime.utcnow())
@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+
+# Offers further than this many scaled MADs from the median are rejected as outliers
+MAD_THRESHOLD = float(os.getenv("PRICE_MAD_THRESHOLD", "3.5"))
+# Fraction cut from each end of the sorted prices for the trimmed mean
+TRIM_FRACTION = float(os.getenv("PRICE_TRIM_FRACTION", "0.1"))
+# Scales the MAD to the standard deviation of normally distributed prices
+MAD_SCALE = 1.4826
+
+STATISTICS_FIELDS = ("median_price", "trimmed_mean_price", "p10_price", "p25_price", "mad_price",
+                     "offer_count", "outlier_count")
+
+
+def parse_price(text: str):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_prices(price_texts) -> np.ndarray:
+    """
+    Cardmarket price labels ("1.234,56 €") to a float array. Each label is one price, labels that
+    do not parse and non-finite values are dropped, like the per-label parser did.
+
+    The whole table is cleaned with three str.replace calls over the joined labels and converted
+    in one go; only a table with invalid labels is converted label by label.
+    """
+    # NUL never occurs in a label, so every label stays a single token whatever whitespace it holds
+    labels = "\0".join(price_texts).replace(".", "").replace("€", "").replace(",", ".").split("\0")
+    try:
+        prices = np.array(labels, dtype=float)
+    except ValueError:
+        prices = np.array([price for price in map(parse_price, labels) if price is not None], dtype=float)
+    return prices[np.isfinite(prices)]
+
+
+def legacy_prices(prices: np.ndarray) -> tuple:
+    """
+    (avg, min, max) as the scraper always stored them: offers outside 1/9 - 5 times the mean are
+    dropped and the minimum is the mean of the two cheapest remaining offers.
+    """
+    if prices.size == 0:
+        return 0, 0, 0
+    mean = prices.mean()
+    kept = np.sort(prices[(prices >= mean / 9) & (prices <= 5 * mean)])
+    if kept.size == 0:
+        return 0, 0, 0
+    return round(float(kept.mean()), 2), round(float(kept[:2].mean()), 2), round(float(kept[-1]), 2)
+
+
+def robust_statistics(prices: np.ndarray) -> dict:
+    """
+    Median, trimmed mean, p10/p25 and MAD of the offers left after MAD outlier rejection.
+
+    The median of the kept offers is also their p50. With a MAD of zero (most offers at the same
+    price) nothing is rejected.
+    """
+    if prices.size == 0:
+        return {field: None for field in STATISTICS_FIELDS} | {"offer_count": 0, "outlier_count": 0}
+
+    median = np.median(prices)
+    deviations = np.abs(prices - median)
+    mad = np.median(deviations)
+    kept = prices[deviations <= MAD_THRESHOLD * MAD_SCALE * mad] if mad > 0 else prices
+
+    kept = np.sort(kept)
+    p10, p25, p50 = np.percentile(kept, (10, 25, 50))
+    trim = int(kept.size * TRIM_FRACTION)
+    trimmed = kept[trim:kept.size - trim] if kept.size > 2 * trim else kept
+    return {
+        "median_price": round(float(p50), 2),
+        "trimmed_mean_price": round(float(trimmed.mean()), 2),
+        "p10_price": round(float(p10), 2),
+        "p25_price": round(float(p25), 2),
+        "mad_price": round(float(np.median(np.abs(kept - p50))), 2),
+        "offer_count": int(prices.size),
+        "outlier_count": int(prices.size - kept.size),
+    }
+
+
+def compute_price_statistics(price_texts) -> dict:
+    """
+    Legacy avg/min/max plus the robust statistics of one offer table, from its price labels.
+    """
+    return compute_price_statistics_from_prices(parse_prices(price_texts))
+
+
+def compute_price_statistics_from_prices(prices) -> dict:
+    prices = np.asarray(prices, dtype=float)
+    avg_price, min_price, max_price = legacy_prices(prices)
+    return {"avg_price": avg_price, "min_price": min_price, "max_price": max_price} | robust_statistics(prices)
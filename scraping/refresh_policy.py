@@ -0,0 +1,130 @@
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from database.models.models import Product, ScrapeData, LatestScrape
+from utilities.common import get_product_urls, get_product_urls_by_product_type
+
+SCRAPE_MIN_INTERVAL_HOURS = float(os.getenv("SCRAPE_MIN_INTERVAL_HOURS", "6"))
+SCRAPE_MAX_INTERVAL_HOURS = float(os.getenv("SCRAPE_MAX_INTERVAL_HOURS", "168"))
+# Volatility is measured over the most recent stored scrapes of each product
+SCRAPE_VOLATILITY_SAMPLES = int(os.getenv("SCRAPE_VOLATILITY_SAMPLES", "20"))
+# ... stored within this many days, so a scheduling pass only scans the recent scrapes
+SCRAPE_VOLATILITY_LOOKBACK_DAYS = float(os.getenv("SCRAPE_VOLATILITY_LOOKBACK_DAYS", "60"))
+# Volatility score at which the refresh interval is half the maximum one
+SCRAPE_VOLATILITY_REFERENCE = float(os.getenv("SCRAPE_VOLATILITY_REFERENCE", "0.02"))
+# With fewer stored scrapes a product is refreshed at the minimum interval
+MIN_SAMPLES_FOR_VOLATILITY = 3
+
+
+def volatility_score(samples: int, mean_price: float, mean_square_price: float, min_availability: int,
+                     max_availability: int, mean_availability: float):
+    """
+    Coefficient of variation of the min price plus half the relative availability range,
+    None without enough samples to tell.
+    """
+    if samples < MIN_SAMPLES_FOR_VOLATILITY or not mean_price:
+        return None
+    variance = max(mean_square_price - mean_price ** 2, 0.0)
+    price_variation = variance ** 0.5 / mean_price
+    availability_variation = (max_availability - min_availability) / max(mean_availability, 1.0)
+    return price_variation + 0.5 * availability_variation
+
+
+def refresh_interval(score) -> timedelta:
+    """
+    Maximum interval for a flat product, shrinking towards the minimum as volatility grows.
+    """
+    if score is None:
+        return timedelta(hours=SCRAPE_MIN_INTERVAL_HOURS)
+    hours = SCRAPE_MAX_INTERVAL_HOURS / (1 + score / SCRAPE_VOLATILITY_REFERENCE)
+    return timedelta(hours=max(SCRAPE_MIN_INTERVAL_HOURS, hours))
+
+
+def get_refresh_intervals(sess, now: datetime = None) -> dict:
+    """
+    Refresh interval of every product with scrapes stored in the lookback window, by id_url.
+
+    One grouped query over the last SCRAPE_VOLATILITY_SAMPLES scrapes of each product; the
+    variance comes from avg(x²) - avg(x)² so it runs on every dialect. The window is bounded by
+    date before it is ranked, so only the recent partitions of scrapes are read.
+    """
+    since = (now or datetime.utcnow()) - timedelta(days=SCRAPE_VOLATILITY_LOOKBACK_DAYS)
+    recent = (
+        sess.query(
+            ScrapeData.product_id_url,
+            ScrapeData.min_price,
+            ScrapeData.detailed_availability,
+            func.row_number().over(
+                partition_by=ScrapeData.product_id_url, order_by=ScrapeData.scrape_date.desc()
+            ).label("recency"),
+        )
+        .filter(ScrapeData.scrape_date >= since)
+        .subquery()
+    )
+    rows = (
+        sess.query(
+            recent.c.product_id_url,
+            func.count(),
+            func.avg(recent.c.min_price),
+            func.avg(recent.c.min_price * recent.c.min_price),
+            func.min(recent.c.detailed_availability),
+            func.max(recent.c.detailed_availability),
+            func.avg(recent.c.detailed_availability),
+        )
+        .filter(recent.c.recency <= SCRAPE_VOLATILITY_SAMPLES)
+        .group_by(recent.c.product_id_url)
+        .all()
+    )
+    return {id_url: refresh_interval(volatility_score(*stats)) for id_url, *stats in rows}
+
+
+def get_due_product_urls(sess, product_type: str = None, now: datetime = None) -> list:
+    """
+    URLs of the products whose refresh interval has passed since they were last checked.
+
+    `product_type` is None for every product, "Singles" for singles and anything else for sealed.
+    Never scraped products are always due. A product without any stored change in the lookback
+    window has been flat all along and is refreshed at the maximum interval.
+    """
+    now = now or datetime.utcnow()
+    intervals = get_refresh_intervals(sess, now)
+    lookback = timedelta(days=SCRAPE_VOLATILITY_LOOKBACK_DAYS)
+
+    def interval(id_url, last_changed_at):
+        if id_url in intervals:
+            return intervals[id_url]
+        if now - last_changed_at > lookback:
+            return timedelta(hours=SCRAPE_MAX_INTERVAL_HOURS)
+        return timedelta(hours=SCRAPE_MIN_INTERVAL_HOURS)
+
+    query = (
+        sess.query(Product.id_url, func.coalesce(LatestScrape.last_checked_at, LatestScrape.scrape_date),
+                   LatestScrape.scrape_date)
+        .outerjoin(LatestScrape, LatestScrape.product_id_url == Product.id_url)
+    )
+    if product_type == "Singles":
+        query = query.filter(Product.product_type == "Singles")
+    elif product_type is not None:
+        query = query.filter(Product.product_type != "Singles")
+
+    return [
+        id_url for id_url, last_checked_at, last_changed_at in query
+        if last_checked_at is None or now - last_checked_at >= interval(id_url, last_changed_at)
+    ]
+
+
+def get_product_urls_to_scrape(sess, product_type: str = None, force: bool = False):
+    """
+    (URLs to scrape, catalogue size) for the product type, None meaning every product.
+
+    Unless `force` is set only the products due according to their refresh interval are returned.
+    """
+    if product_type is None:
+        product_urls = get_product_urls(sess)
+    else:
+        product_urls = get_product_urls_by_product_type(sess, product_type)
+    if force or not product_urls:
+        return product_urls, len(product_urls)
+    return get_due_product_urls(sess, product_type), len(product_urls)
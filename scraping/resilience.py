@@ -0,0 +1,163 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+
+import httpx
+from selenium.common import NoSuchElementException, TimeoutException
+
+logging.basicConfig(level=logging.INFO)
+
+SCRAPE_RETRY_ATTEMPTS = int(os.getenv("SCRAPE_RETRY_ATTEMPTS", "3"))
+SCRAPE_RETRY_BASE_SECONDS = float(os.getenv("SCRAPE_RETRY_BASE_SECONDS", "2"))
+SCRAPE_RETRY_MAX_SECONDS = float(os.getenv("SCRAPE_RETRY_MAX_SECONDS", "60"))
+# The breaker opens when this share of the last SCRAPE_BREAKER_WINDOW fetches failed
+SCRAPE_BREAKER_WINDOW = int(os.getenv("SCRAPE_BREAKER_WINDOW", "20"))
+SCRAPE_BREAKER_ERROR_RATE = float(os.getenv("SCRAPE_BREAKER_ERROR_RATE", "0.5"))
+SCRAPE_BREAKER_MIN_CALLS = int(os.getenv("SCRAPE_BREAKER_MIN_CALLS", "10"))
+SCRAPE_BREAKER_PAUSE_SECONDS = float(os.getenv("SCRAPE_BREAKER_PAUSE_SECONDS", "120"))
+
+
+class ScrapeFailure(Exception):
+    """
+    A fetch that did not produce product data, with the kind of failure and whether it is worth retrying.
+    """
+    kind = "unexpected"
+    retryable = False
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ScrapeTimeout(ScrapeFailure):
+    kind = "timeout"
+    retryable = True
+
+
+class ScrapeBlocked(ScrapeFailure):
+    """
+    Rate limited or blocked by the site, `retry_after` is the pause it asked for, if any.
+    """
+    kind = "blocked"
+    retryable = True
+
+
+class MissingSelector(ScrapeFailure):
+    """
+    An element the page must have was not found, usually a page that did not finish rendering.
+    """
+    kind = "missing_selector"
+    retryable = True
+
+
+class ParseError(ScrapeFailure):
+    kind = "parse_error"
+
+
+FAILURE_KINDS = ("timeout", "blocked", "missing_selector", "parse_error", "unexpected")
+
+
+def classify_failure(error: Exception) -> ScrapeFailure:
+    if isinstance(error, ScrapeFailure):
+        return error
+    if isinstance(error, (TimeoutException, httpx.TimeoutException, TimeoutError)):
+        return ScrapeTimeout(getattr(error, "msg", None) or str(error) or "Timed out")
+    if isinstance(error, NoSuchElementException):
+        return MissingSelector(error.msg or str(error))
+    if isinstance(error, (ValueError, KeyError, IndexError, TypeError, AttributeError)):
+        return ParseError(f"{type(error).__name__}: {error}")
+    return ScrapeFailure(f"{type(error).__name__}: {error}")
+
+
+class RetryPolicy:
+    """
+    Retry budget of a single URL: at most `max_attempts` fetches, separated by exponential
+    backoff with full jitter, or by the pause the site asked for when that is longer.
+    """
+
+    def __init__(self, max_attempts=SCRAPE_RETRY_ATTEMPTS, base_delay=SCRAPE_RETRY_BASE_SECONDS,
+                 max_delay=SCRAPE_RETRY_MAX_SECONDS):
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        return max(backoff, min(retry_after or 0, self.max_delay))
+
+
+class CircuitBreaker:
+    """
+    Pauses every fetch of the run while the site is failing.
+
+    Opens for `pause_seconds` when at least `error_rate` of the last `window` fetches failed, or
+    for as long as a blocked response asked. The window starts empty again after a pause, so it
+    takes `min_calls` new fetches before the breaker can open again.
+    """
+
+    def __init__(self, window=SCRAPE_BREAKER_WINDOW, error_rate=SCRAPE_BREAKER_ERROR_RATE,
+                 min_calls=SCRAPE_BREAKER_MIN_CALLS, pause_seconds=SCRAPE_BREAKER_PAUSE_SECONDS):
+        self.error_rate = error_rate
+        self.min_calls = min(min_calls, window)
+        self.pause_seconds = pause_seconds
+        self.trips = 0
+        self._outcomes = deque(maxlen=window)
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def remaining_pause(self) -> float:
+        with self._lock:
+            return max(self._open_until - time.monotonic(), 0.0)
+
+    def wait(self):
+        """
+        Block the calling thread while the breaker is open.
+        """
+        remaining = self.remaining_pause()
+        while remaining > 0:
+            time.sleep(remaining)
+            remaining = self.remaining_pause()
+
+    def record(self, success: bool, retry_after: float = None):
+        with self._lock:
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            pause = retry_after or 0
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.error_rate:
+                pause = max(pause, self.pause_seconds)
+            now = time.monotonic()
+            if pause and now + pause > self._open_until:
+                if self._open_until <= now:
+                    self.trips += 1
+                    logging.warning(f"Circuit breaker open, pausing scraping for {pause:.1f}s "
+                                    f"({failures} of the last {len(self._outcomes)} fetches failed)")
+                self._open_until = now + pause
+                self._outcomes.clear()
+
+
+class FailureMetrics:
+    """
+    Thread-safe counters of fetch attempts, outcomes and failures by kind.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, event: str):
+        with self._lock:
+            self._counts[event] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            "attempts": counts.get("attempts", 0),
+            "successes": counts.get("successes", 0),
+            "retries": counts.get("retries", 0),
+            "gave_up": counts.get("gave_up", 0),
+            "failures": {kind: counts.get(f"failure:{kind}", 0) for kind in FAILURE_KINDS},
+        }
@@ -0,0 +1,194 @@
+import asyncio
+import inspect
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from fastapi import HTTPException
+
+from scraping.driver_pool import DRIVER_POOL_SIZE
+from scraping.resilience import CircuitBreaker, FailureMetrics, RetryPolicy, ScrapeFailure, classify_failure
+from utilities.common import get_url_partial_params
+from utilities.metrics import SCRAPE_FETCHES, SCRAPE_RETRIES, SCRAPE_STAGE_SECONDS
+
+logging.basicConfig(level=logging.INFO)
+
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", str(DRIVER_POOL_SIZE)))
+SCRAPE_RATE_PER_HOST = float(os.getenv("SCRAPE_RATE_PER_HOST", "0.5"))
+SCRAPE_BURST_PER_HOST = float(os.getenv("SCRAPE_BURST_PER_HOST", "2"))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, at most `capacity` stored.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self):
+        """
+        Block the calling thread until a token is available, then consume it.
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """
+    One token bucket per host, so every cardmarket domain gets its own polite limit.
+    """
+
+    def __init__(self, rate=SCRAPE_RATE_PER_HOST, burst=SCRAPE_BURST_PER_HOST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    def acquire(self, url: str):
+        self.bucket_for(url).acquire()
+
+
+class ScrapeScheduler:
+    """
+    Runs blocking fetch + save calls on a bounded worker pool, off the API event loop.
+
+    `fetch` receives the ProductPartialParams of a URL and returns the scraped dict, which is
+    persisted by `save`, or with `writer_factory` buffered in a ScrapeBatchWriter created for
+    each run. Both run in a worker thread. The result of a buffered URL is only reported once
+    the batch holding it has been written.
+
+    Failed fetches are classified and retried within the URL's `retry_policy` budget; the
+    `circuit_breaker` pauses every fetch while the error rate is too high.
+    """
+
+    def __init__(self, fetch, save=None, writer_factory=None, concurrency=SCRAPE_CONCURRENCY,
+                 rate_limiter: HostRateLimiter = None, retry_policy: RetryPolicy = None,
+                 circuit_breaker: CircuitBreaker = None):
+        self.fetch = fetch
+        self.save = save
+        self.writer_factory = writer_factory
+        self.concurrency = concurrency
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.metrics = FailureMetrics()
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="scraper")
+
+    def fetch_with_retries(self, partial_params) -> dict:
+        """
+        Fetch one product, retrying retryable failures. Raises the ScrapeFailure of the last attempt.
+        """
+        max_attempts = self.retry_policy.max_attempts
+        for attempt in range(1, max_attempts + 1):
+            self.circuit_breaker.wait()
+            self.rate_limiter.acquire(partial_params.url)
+            self.metrics.record("attempts")
+            try:
+                with SCRAPE_STAGE_SECONDS.labels("fetch").time():
+                    product_data = self.fetch(partial_params)
+            except Exception as e:
+                failure = classify_failure(e)
+                self.metrics.record(f"failure:{failure.kind}")
+                SCRAPE_FETCHES.labels(failure.kind, type(e).__name__).inc()
+                self.circuit_breaker.record(False, failure.retry_after)
+                if not failure.retryable or attempt == max_attempts:
+                    self.metrics.record("gave_up")
+                    if failure is e:
+                        raise
+                    raise failure from e
+                delay = self.retry_policy.delay(attempt, failure.retry_after)
+                logging.warning(f"Attempt {attempt}/{max_attempts} on {partial_params.url} failed "
+                                f"({failure.kind}: {failure}), retrying in {delay:.1f}s")
+                self.metrics.record("retries")
+                SCRAPE_RETRIES.inc()
+                time.sleep(delay)
+            else:
+                self.circuit_breaker.record(True)
+                self.metrics.record("successes")
+                SCRAPE_FETCHES.labels("success", "").inc()
+                return product_data
+
+    def scrape_one(self, product_url: str, writer=None):
+        """
+        Scrape one URL. Returns its result and the list of results now final: its own, unless it
+        is still buffered in `writer`, plus those of any batch `writer` wrote meanwhile.
+        """
+        try:
+            partial_params = get_url_partial_params(product_url)
+            product_data = self.fetch_with_retries(partial_params)
+            result = {"product_url": product_url, "status": "success",
+                      "message": f"Salvataggio di {product_data['title']} avvenuto con successo!"}
+            if writer is None:
+                self.save(product_data)
+                return result, [result]
+            return result, writer.add(product_data, result)
+        except HTTPException as e:
+            result = {"product_url": product_url, "status": "error", "message": str(e.detail)}
+        except ScrapeFailure as e:
+            logging.error(f"Error scraping {product_url}: {e.kind}: {e}")
+            result = {"product_url": product_url, "status": "error", "message": f"{e.kind}: {e}", "failure": e.kind}
+        except Exception as e:
+            logging.error(f"Error scraping {product_url}: {e}")
+            result = {"product_url": product_url, "status": "error", "message": "An unexpected error occurred"}
+        return result, [result]
+
+    async def run(self, product_urls, on_result=None) -> list:
+        """
+        Scrape every URL with at most `concurrency` fetches in flight.
+
+        Results are returned in the same order as `product_urls`. `on_result`, if given, is
+        called on the event loop with each result as soon as it is available, and awaited
+        when it is a coroutine function.
+        """
+        loop = asyncio.get_running_loop()
+        writer = self.writer_factory() if self.writer_factory else None
+
+        async def report(finished):
+            for result in finished:
+                if on_result:
+                    callback_result = on_result(result)
+                    if inspect.isawaitable(callback_result):
+                        await callback_result
+
+        async def run_one(product_url):
+            result, finished = await loop.run_in_executor(self.executor, self.scrape_one, product_url, writer)
+            await report(finished)
+            # Final once the last flush below has written it
+            return result
+
+        try:
+            return await asyncio.gather(*(run_one(product_url) for product_url in product_urls))
+        finally:
+            if writer:
+                await report(await loop.run_in_executor(self.executor, writer.flush))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
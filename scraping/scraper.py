@@ -1,45 +1,47 @@
 import logging
-import random
-import requests
+import os
+from functools import lru_cache
 
-from io import BytesIO
-from PIL import Image
 from selenium import webdriver
-from selenium.common import NoSuchElementException, TimeoutException
+from selenium.common import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 
-from scraping.scraper_utilities import calculate_final_prices, sum_table_availabilities
+from scraping.driver_pool import DriverPool
+from scraping.http_fetcher import fetch_product_data_http, PageRequiresBrowser, image_cache
+from scraping.offers import SCRAPE_OFFERS, capture_offers, iter_expanded_offers, iter_page_offers
+from scraping.page_parser import extract_page_fields, build_product_data
+from scraping.resilience import MissingSelector
+from scraping.scraper_utilities import get_random_user_agent
 from scraping.scraping_selectors import ScrapingSelectorsEnum
 from utilities.common import ProductPartialParams
-from fake_useragent import UserAgent
+from utilities.metrics import SCRAPE_STAGE_SECONDS
 
 logging.basicConfig(level=logging.INFO)
 
-ua = UserAgent()
-user_agents = [
-    ua.random,
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36",
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:55.0) Gecko/20100101 Firefox/55.0",
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Safari/537.36 Edge/91.0.864.59"
-]
+# "http" tries a plain HTTP download first and falls back to Selenium, "selenium" always uses the browser
+SCRAPE_BACKEND = os.getenv("SCRAPE_BACKEND", "http")
 
 
-def get_random_user_agent():
-    return random.choice(user_agents)
+@lru_cache(maxsize=1)
+def get_chromedriver_path():
+    return ChromeDriverManager().install()
 
 
+@SCRAPE_STAGE_SECONDS.labels("driver_startup").time()
 def setup_driver():
     user_agent = get_random_user_agent()
     options = Options()
     options.add_argument("--start-maximized")
     options.add_argument(f"user-agent={user_agent}")
-    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    return webdriver.Chrome(service=Service(get_chromedriver_path()), options=options)
+
+
+driver_pool = DriverPool(setup_driver)
 
 
 def wait_for_element(driver, selector, timeout=10):
@@ -52,120 +54,55 @@ def wait_for_element(driver, selector, timeout=10):
         return None
 
 
-def fetch_product_data(product_data: ProductPartialParams):
-    with setup_driver() as driver:
-        driver.get(product_data.url)
+def fetch_product_data(product_data: ProductPartialParams, pool: DriverPool = None):
+    # Expanding the whole offer table needs the browser
+    if SCRAPE_BACKEND == "http" and SCRAPE_OFFERS != "full":
         try:
-            set_name = ""
-            card_number = 0
-            pokemon_species = ""
-
-            product_title = get_product_title(driver, ScrapingSelectorsEnum.PRODUCT_NAME.value)
-            product_subtitle = get_product_subtitle(driver, ScrapingSelectorsEnum.PRODUCT_NAME.value)
-            final_average, min_price, max_price = get_price_data(driver, ScrapingSelectorsEnum.TABLE_PRICES.value)
-            table_availability = get_table_availability(driver, ScrapingSelectorsEnum.TABLE_AVAILABILITIES.value)
-
-            if product_data.product_type == "Singles":
-                set_name = get_text_from_element(driver, ScrapingSelectorsEnum.SET_NAME.value)
-                card_number = get_text_from_element(driver, ScrapingSelectorsEnum.CARD_NUMBER.value)
-                product_image = get_product_image(driver, ScrapingSelectorsEnum.SINGLES_IMAGE.value)
-                if product_data.tcg_name == "Pokemon":  # gestire ste cose se non è pokemon che so diverse
-                    pokemon_species = get_text_from_element(driver, ScrapingSelectorsEnum.POKEMON_SPECIES.value)
-                    total_availability = get_total_availability(driver,
-                                                                ScrapingSelectorsEnum.SINGLES_TOTAL_AVAILABILITY.value)
-            else:
-                product_image = get_product_image(driver, ScrapingSelectorsEnum.SEALED_IMAGE.value)
-                total_availability = get_total_availability(driver,
-                                                            ScrapingSelectorsEnum.SEALED_TOTAL_AVAILABILITY.value)
-
-            product_data = {
-                "id_url": product_data.url,
-                "product_name": product_data.product_name,
-                "title": product_title or "",
-                "subtitle": product_subtitle or "",
-                "image": product_image,
-                "product_type": product_data.product_type,
-                "set_name": set_name or "",
-                "card_number": card_number or "",
-                "language": product_data.language,
-                "condition": product_data.condition or "",
-                "tcg_name": product_data.tcg_name,
-                "pokemon_species": pokemon_species or "",
-                "avg_price": final_average,
-                "min_price": min_price,
-                "detailed_availability": table_availability,
-                "total_availability": total_availability,
-                "max_price": max_price
-            }
-
-            logging.info(f"Product data: {product_data}")
-            return product_data
-        except (NoSuchElementException, TimeoutException) as e:
-            logging.error(f"An error occurred during scraping: {e}")
-
-
-def get_product_title(driver, selector):
-    h1_element = wait_for_element(driver, selector)
-    if h1_element:
-        clean_title_text = h1_element.get_attribute("innerHTML").split("<span")[0].strip()
-        return clean_title_text
-    return ""
-
-
-def get_product_subtitle(driver, selector):
-    h1_element = wait_for_element(driver, selector)
-    if h1_element:
-        soup = BeautifulSoup(h1_element.get_attribute("innerHTML"), 'html.parser')
-        subtitle_text = soup.find('span').get_text().strip()
-        return subtitle_text
-    return ""
-
-
-def get_text_from_element(driver, selector):
-    element = wait_for_element(driver, selector)
-    return element.text if element else ""
-
-
-def get_product_image(driver, selector):
-    h1_element = wait_for_element(driver, selector)
-    if h1_element:
-        image_url = h1_element.get_attribute("src")
-        headers = {
-            'User-Agent': get_random_user_agent(),
-            'Referer': 'https://www.cardmarket.com/it/Pokemon'
-        }
-        response = requests.get(image_url, headers=headers, allow_redirects=True)
-
-        if response.status_code == 200:
-            try:
-                image_data = response.content
-                image = Image.open(BytesIO(image_data))
-                byte_io = BytesIO()
-                image.save(byte_io, format='PNG')  # You can change the format to suit your need (e.g., 'JPEG', 'PNG')
-
-                return byte_io.getvalue()
-            except Exception as e:
-                logging.error(f"Error processing image from {image_url}: {e}")
-                return ""
-    logging.warning("Image element not found")
-    return ""
-
-
-def get_total_availability(driver, selector):
-    element = wait_for_element(driver, selector)
-    return element.text if element else ""
-
-
-def get_price_data(driver, selector):
-    price_elements = WebDriverWait(driver, 10).until(
-        EC.presence_of_all_elements_located((By.CSS_SELECTOR, selector))
-    )
-    final_average, minimum_price, max_price = calculate_final_prices(price_elements)
-    return final_average, minimum_price, max_price
-
-
-def get_table_availability(driver, selector):
-    availability_elements = WebDriverWait(driver, 10).until(
-        EC.presence_of_all_elements_located((By.CSS_SELECTOR, selector))
-    )
-    return sum_table_availabilities(availability_elements)
+            return fetch_product_data_http(product_data)
+        except PageRequiresBrowser as e:
+            logging.info(f"Falling back to Selenium: {e}")
+    return fetch_product_data_selenium(product_data, pool)
+
+
+def fetch_product_data_selenium(product_data: ProductPartialParams, pool: DriverPool = None):
+    """
+    Raises MissingSelector when the product title is never rendered; Selenium errors propagate
+    to the caller, which classifies and retries them.
+    """
+    with (pool or driver_pool).borrow() as driver:
+        with SCRAPE_STAGE_SECONDS.labels("page_load").time():
+            driver.get(product_data.url)
+            html = get_ready_page_source(driver)
+        if html is None:
+            raise MissingSelector(f"Product title not rendered on {product_data.url}")
+
+        fields = extract_page_fields(html, product_data.product_type, product_data.tcg_name)
+        if not fields["price_texts"]:
+            logging.warning(f"No offers found in the price table of {product_data.url}")
+
+        scrape_date = None
+        if SCRAPE_OFFERS == "full":
+            scrape_date = capture_offers(product_data.url, iter_expanded_offers(driver), fields)
+        elif SCRAPE_OFFERS == "page":
+            scrape_date = capture_offers(product_data.url, iter_page_offers(html), fields)
+
+        image_hash = image_cache.get_image_hash(fields["image_url"])
+        product_data = build_product_data(product_data, fields, image_hash)
+        if scrape_date:
+            product_data["scrape_date"] = scrape_date
+
+        logging.info(f"Scraped {product_data['id_url']}: min price {product_data['min_price']}, "
+                     f"availability {product_data['detailed_availability']}")
+        return product_data
+
+
+def get_ready_page_source(driver, timeout=10):
+    """
+    Wait once for the product title to be rendered, then grab the whole DOM in a single call.
+
+    Every field is parsed locally from the returned HTML, so optional selectors that are
+    missing from the page cost nothing instead of a full wait timeout each.
+    """
+    if not wait_for_element(driver, ScrapingSelectorsEnum.PRODUCT_NAME.value, timeout):
+        return None
+    return driver.page_source
@@ -1,60 +1,61 @@
+import logging
+import random
+
+from fake_useragent import UserAgent
+from selenium.common import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from scraping.price_statistics import legacy_prices, parse_prices
+from scraping.scraping_selectors import ScrapingSelectorsEnum
 
-def calculate_final_prices(price_elements):
-    prices = []
-    for element in price_elements:
-        try:
-            price_text = element.text.replace(".", "").replace(",", ".").replace("€", "").strip()
-            price = float(price_text)
-            prices.append(price)
-        except ValueError:
-            continue
-
-    if not prices:
-        return 0, 0, 0  # No valid prices available
+logging.basicConfig(level=logging.INFO)
 
-    initial_average = sum(prices) / len(prices) if prices else 0
-    filtered_prices = filter_prices(prices, initial_average)
+ua = UserAgent()
+user_agents = [
+    ua.random,
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:55.0) Gecko/20100101 Firefox/55.0",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Safari/537.36 Edge/91.0.864.59"
+]
 
-    if not filtered_prices:
-        return 0, 0, 0
 
-    final_average_price = sum(filtered_prices) / len(filtered_prices)
-    max_price = max(filtered_prices)
-    sorted_prices = sorted(filtered_prices)
+def get_random_user_agent():
+    return random.choice(user_agents)
 
-    if len(sorted_prices) >= 2:
-        minimum_price = sum(sorted_prices[:2]) / 2
-    else:
-        minimum_price = sorted_prices[0]
 
-    return round(final_average_price, 2), round(minimum_price, 2), round(max_price, 2)
+def calculate_final_prices(price_elements):
+    return calculate_final_prices_from_texts(element.text for element in price_elements)
 
 
-def filter_prices(prices, initial_average):
-    return [price for price in prices if (1 / 9) * initial_average <= price <= 5 * initial_average]
+def calculate_final_prices_from_texts(price_texts):
+    return legacy_prices(parse_prices(price_texts))
 
 
-def try_table_expansion(driver):
+def try_table_expansion(driver, timeout=10):
     try:
-        expand_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, "#loadMoreButton"))
+        expand_button = WebDriverWait(driver, timeout).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, ScrapingSelectorsEnum.LOAD_MORE_BUTTON.value))
         )
-        if expand_button:
-            expand_button.click()
-    except Exception:
-        print(
-            "Pulsante di espansione non è stato trovato. Procedo senza espandere la tabella.")
+        expand_button.click()
+        return True
+    except TimeoutException:
+        # No "load more" button once the table is complete, other WebDriver errors mean a broken browser
+        logging.debug("Load more button not found, the offer table is complete")
+        return False
 
 
 def sum_table_availabilities(availabilities_from_table):
+    return sum_availability_texts(av.text for av in availabilities_from_table)
+
+
+def sum_availability_texts(availability_texts):
     final_availability = 0
-    for av in availabilities_from_table:
+    for av in availability_texts:
         try:
-            final_availability += int(av.text)
+            final_availability += int(av)
         except ValueError:
             continue
     return final_availability
+
@@ -12,6 +12,12 @@ class ScrapingSelectorsEnum(Enum):
     CARD_NUMBER = "#tabContent-info > div > div.col-12.col-lg-6.mx-auto > div > div.info-list-container.col-12.col-md-8.col-lg-12.mx-auto.align-self-start > dl > dd.d-none.d-md-block.col-6.col-xl-7"
     SET_NAME = "#tabContent-info > div > div.col-12.col-lg-6.mx-auto > div > div.info-list-container.col-12.col-md-8.col-lg-12.mx-auto.align-self-start > dl > dd:nth-child(6) > div > a.mb-2"
     POKEMON_SPECIES = "#tabContent-info > div > div.col-12.col-lg-6.mx-auto > div > div.info-list-container.col-12.col-md-8.col-lg-12.mx-auto.align-self-start > dl > dd:nth-child(10) > a"
+    OFFER_ROWS = ".article-table .table-body .article-row"
+    OFFER_SELLER = ".col-seller .seller-name a"
+    OFFER_CONDITION = ".product-attributes .article-condition"
+    OFFER_PRICE = ".col-offer .price-container"
+    OFFER_QUANTITY = ".col-offer .amount-container span"
+    LOAD_MORE_BUTTON = "#loadMoreButton"
 
 
     # Species and TotalAvailability
\ No newline at end of file
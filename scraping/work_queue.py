@@ -0,0 +1,170 @@
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, and_, select, update
+
+from database.database import SessionLocal, session_scope
+from database.models.models import ScrapeJob, ScrapeJobItem
+
+logging.basicConfig(level=logging.INFO)
+
+QUEUE_LEASE_SECONDS = int(os.getenv("QUEUE_LEASE_SECONDS", "300"))
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", "3"))
+QUEUE_RETRY_BASE_SECONDS = float(os.getenv("QUEUE_RETRY_BASE_SECONDS", "30"))
+
+OPEN_JOB_STATUSES = ("pending", "running")
+
+
+class ScrapeWorkQueue:
+    """
+    Work queue over the items of "queue" mode scrape jobs, shared by any number of workers.
+
+    A worker leases items for `lease_seconds`; an item whose lease expires (crashed or stuck
+    worker) becomes leasable again, unless it used up its attempts: a URL that keeps killing its
+    worker ends as "error" instead of being leased forever. Failed items go back to "pending"
+    with an exponential backoff until `max_attempts` leases were used, then end as "error".
+
+    On PostgreSQL leasing uses SELECT ... FOR UPDATE SKIP LOCKED so concurrent workers never
+    wait on each other; elsewhere each item is claimed with a conditional UPDATE.
+    """
+
+    def __init__(self, session_factory=SessionLocal, lease_seconds=QUEUE_LEASE_SECONDS,
+                 max_attempts=QUEUE_MAX_ATTEMPTS, retry_base_seconds=QUEUE_RETRY_BASE_SECONDS):
+        self.session_factory = session_factory
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+
+    def leasable(self, now: datetime):
+        open_jobs = select(ScrapeJob.job_id).where(ScrapeJob.mode == "queue",
+                                                   ScrapeJob.status.in_(OPEN_JOB_STATUSES))
+        return and_(
+            ScrapeJobItem.job_id.in_(open_jobs),
+            or_(
+                and_(ScrapeJobItem.status == "pending",
+                     or_(ScrapeJobItem.available_at.is_(None), ScrapeJobItem.available_at <= now)),
+                and_(ScrapeJobItem.status == "leased", ScrapeJobItem.lease_expires_at < now,
+                     ScrapeJobItem.attempts < self.max_attempts),
+            ),
+        )
+
+    def fail_exhausted_leases(self, session, now: datetime) -> int:
+        """
+        Mark "error" the expired leases of items that have no attempt left.
+        """
+        failed = session.execute(
+            update(ScrapeJobItem)
+            .where(ScrapeJobItem.status == "leased", ScrapeJobItem.lease_expires_at < now,
+                   ScrapeJobItem.attempts >= self.max_attempts)
+            .values(status="error", message=f"Lease expired after {self.max_attempts} attempts",
+                    leased_by=None, lease_expires_at=None, finished_at=now)
+        ).rowcount
+        if failed:
+            logging.warning(f"{failed} queue items failed, their leases expired on every attempt")
+        return failed
+
+    def lease(self, worker_id: str, limit: int) -> list:
+        """
+        Lease up to `limit` items for `worker_id`. Returns (item_id, product_url) pairs.
+        """
+        now = datetime.utcnow()
+        lease_values = {
+            "status": "leased",
+            "leased_by": worker_id,
+            "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+            "attempts": ScrapeJobItem.attempts + 1,
+        }
+        with session_scope(self.session_factory) as session:
+            self.fail_exhausted_leases(session, now)
+            candidates = (
+                select(ScrapeJobItem.item_id, ScrapeJobItem.product_url, ScrapeJobItem.job_id)
+                .where(self.leasable(now))
+                .order_by(ScrapeJobItem.item_id)
+                .limit(limit)
+            )
+            if session.get_bind().dialect.name == "postgresql":
+                rows = session.execute(candidates.with_for_update(skip_locked=True)).all()
+                if rows:
+                    session.execute(
+                        update(ScrapeJobItem)
+                        .where(ScrapeJobItem.item_id.in_([row.item_id for row in rows]))
+                        .values(**lease_values)
+                    )
+                leased = rows
+            else:
+                leased = []
+                for row in session.execute(candidates).all():
+                    claimed = session.execute(
+                        update(ScrapeJobItem)
+                        .where(ScrapeJobItem.item_id == row.item_id, self.leasable(now))
+                        .values(**lease_values)
+                    ).rowcount
+                    if claimed:
+                        leased.append(row)
+
+            job_ids = {row.job_id for row in leased}
+            if job_ids:
+                session.execute(
+                    update(ScrapeJob)
+                    .where(ScrapeJob.job_id.in_(job_ids), ScrapeJob.status == "pending")
+                    .values(status="running", started_at=now)
+                )
+            return [(row.item_id, row.product_url) for row in leased]
+
+    def complete(self, worker_id: str, item_id: int, result: dict):
+        """
+        Record the result of a leased item; failures are retried until the attempts run out.
+
+        Results of a lease that expired and moved to another worker are discarded.
+        """
+        now = datetime.utcnow()
+        with session_scope(self.session_factory) as session:
+            item = session.get(ScrapeJobItem, item_id, with_for_update=True)
+            if item is None or item.status != "leased" or item.leased_by != worker_id:
+                logging.warning(f"Lease of queue item {item_id} lost by {worker_id}, result discarded")
+                return
+
+            item.leased_by = None
+            item.lease_expires_at = None
+            item.message = result["message"]
+            if result["status"] == "success" or item.attempts >= self.max_attempts:
+                item.status = result["status"]
+                item.finished_at = now
+            else:
+                item.status = "pending"
+                item.available_at = now + timedelta(seconds=self.retry_delay(item.attempts))
+            session.flush()
+            self.finish_drained_jobs(session, now)
+
+    def close_drained_jobs(self):
+        now = datetime.utcnow()
+        with session_scope(self.session_factory) as session:
+            self.fail_exhausted_leases(session, now)
+            self.finish_drained_jobs(session, now)
+
+    @staticmethod
+    def finish_drained_jobs(session, now: datetime = None):
+        """
+        Mark "completed" the open queue jobs without pending or leased items left.
+
+        Also run by idle workers, which catches jobs whose last two items were completed
+        concurrently and each saw the other one still unfinished.
+        """
+        unfinished = select(ScrapeJobItem.item_id).where(
+            ScrapeJobItem.job_id == ScrapeJob.job_id, ScrapeJobItem.status.in_(("pending", "leased"))
+        )
+        finished = session.execute(
+            update(ScrapeJob)
+            .where(ScrapeJob.mode == "queue", ScrapeJob.status.in_(OPEN_JOB_STATUSES), ~unfinished.exists())
+            .values(status="completed", finished_at=now or datetime.utcnow())
+        ).rowcount
+        if finished:
+            logging.info(f"{finished} queued scrape jobs completed")
+
+    def retry_delay(self, attempts: int) -> float:
+        """
+        Exponential backoff with full jitter: up to base * 2^(attempts - 1) seconds.
+        """
+        return random.uniform(0, self.retry_base_seconds * 2 ** (attempts - 1))
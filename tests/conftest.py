@@ -0,0 +1,47 @@
+"""
+The suite runs offline on a throwaway SQLite database: config.py is not versioned, so a config
+module pointing DATABASE_URL at a temporary file is installed before any application module
+is imported.
+"""
+import os
+import sys
+import tempfile
+import types
+from pathlib import Path
+
+import pytest
+
+TEST_DATABASE_DIR = Path(tempfile.mkdtemp(prefix="cardmarket-tests-"))
+
+config = types.ModuleType("config")
+config.DATABASE_URL = f"sqlite:///{TEST_DATABASE_DIR / 'test.sqlite'}"
+sys.modules["config"] = config
+os.environ["CACHE_URL"] = "memory://"
+
+
+@pytest.fixture
+def db_session():
+    """
+    Session on freshly created tables, with an empty response cache.
+    """
+    from database.database import SessionLocal, engine
+    from database.models.models import Base
+    from utilities.cache import cache
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    cache.clear()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db_session):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    return TestClient(main.app)
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from database.batch_writer import ScrapeBatchWriter
+from database.models.models import LatestScrape, Product, ScrapeData
+from utilities.cache import cache, product_tag
+
+
+def product_data(image_hash, min_price=1.0):
+    return {"id_url": "https://x/a", "product_name": "a", "title": "A", "subtitle": "", "image_hash": image_hash,
+            "product_type": "Singles", "set_name": "S1", "card_number": "1", "language": "5", "condition": "2",
+            "tcg_name": "Pokemon", "pokemon_species": "", "total_availability": 1, "detailed_availability": 1,
+            "min_price": min_price, "max_price": min_price, "avg_price": min_price}
+
+
+def test_results_are_handed_back_once_written(db_session):
+    writer = ScrapeBatchWriter(batch_size=2)
+    result = {"product_url": "https://x/a", "status": "success", "message": "ok"}
+
+    assert writer.add(product_data("h1"), result) == []
+    assert writer.flush() == [result]
+    assert result["status"] == "success"
+    assert db_session.query(ScrapeData).count() == 1
+    assert db_session.get(LatestScrape, "https://x/a").min_price == 1.0
+
+
+def test_a_revalidated_image_replaces_the_stored_hash(db_session):
+    writer = ScrapeBatchWriter()
+    writer.add(product_data("h1"))
+    writer.flush()
+    versions = cache.versions([product_tag("Singles", "Pokemon")])
+
+    # Same prices: the scrape itself is skipped as unchanged, the new image still lands
+    writer.add(product_data("h2") | {"scrape_date": None})
+    writer.flush()
+    db_session.expire_all()
+
+    assert db_session.get(Product, "https://x/a").image_hash == "h2"
+    assert db_session.query(ScrapeData).count() == 1
+    assert cache.versions([product_tag("Singles", "Pokemon")]) != versions
+
+
+def test_a_missing_image_keeps_the_stored_hash(db_session):
+    writer = ScrapeBatchWriter()
+    writer.add(product_data("h1"))
+    writer.add(product_data(None) | {"scrape_date": datetime.utcnow()})
+    writer.flush()
+    db_session.expire_all()
+
+    assert db_session.get(Product, "https://x/a").image_hash == "h1"
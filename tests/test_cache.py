@@ -0,0 +1,88 @@
+from datetime import datetime
+
+import pytest
+
+from database.models.models import LatestScrape, Product
+from utilities.cache import Cache, MemoryBackend, cache, product_tag
+
+
+@pytest.fixture
+def tagged_cache():
+    return Cache(MemoryBackend(max_entries=2), ttl=60)
+
+
+def test_invalidating_a_tag_drops_its_entries(tagged_cache):
+    tagged_cache.set("a", 1, tagged_cache.versions(["t1"]))
+    tagged_cache.set("b", 2, tagged_cache.versions(["t2"]))
+
+    tagged_cache.invalidate("t1")
+
+    assert tagged_cache.get("a") is None
+    assert tagged_cache.get("b") == 2
+
+
+def test_values_computed_during_an_invalidation_are_not_served(tagged_cache):
+    def compute():
+        # A scrape lands while the value is being computed
+        tagged_cache.invalidate("t1")
+        return "stale"
+
+    assert tagged_cache.get_or_compute("a", ["t1"], compute) == "stale"
+    assert tagged_cache.get("a") is None
+    assert tagged_cache.get_or_compute("a", ["t1"], lambda: "fresh") == "fresh"
+    assert tagged_cache.get("a") == "fresh"
+
+
+def test_least_recently_used_entries_are_evicted(tagged_cache):
+    for key in ("a", "b", "c"):
+        tagged_cache.set(key, key, tagged_cache.versions([]))
+
+    assert tagged_cache.get("a") is None
+    assert tagged_cache.get("c") == "c"
+
+
+def test_a_zero_ttl_disables_the_cache():
+    disabled = Cache(MemoryBackend(), ttl=0)
+    disabled.set("a", 1, disabled.versions([]))
+
+    assert disabled.get("a") is None
+
+
+@pytest.fixture
+def product(db_session):
+    db_session.add(Product(id_url="https://x/a", product_name="a", title="A", product_type="Singles", language="5",
+                           tcg_name="Pokemon"))
+    db_session.add(LatestScrape(product_id_url="https://x/a", scrape_date=datetime(2026, 1, 1), total_availability=1,
+                                detailed_availability=1, min_price=1.0, max_price=1.0, avg_price=1.0))
+    db_session.commit()
+
+
+def set_min_price(session, min_price):
+    session.query(LatestScrape).update({"min_price": min_price})
+    session.commit()
+
+
+def test_matching_etags_get_a_304(client, product):
+    first = client.get("/api/products/singlesPokemon")
+    etag = first.headers["etag"]
+
+    revalidated = client.get("/api/products/singlesPokemon", headers={"If-None-Match": etag})
+
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert revalidated.content == b""
+
+
+def test_responses_are_cached_until_their_tag_is_invalidated(client, db_session, product):
+    first = client.get("/api/products/singlesPokemon")
+    set_min_price(db_session, 2.0)
+
+    cached = client.get("/api/products/singlesPokemon", headers={"If-None-Match": first.headers["etag"]})
+    cache.invalidate(product_tag("Singles", "Pokemon"))
+    fresh = client.get("/api/products/singlesPokemon", headers={"If-None-Match": first.headers["etag"]})
+
+    assert cached.status_code == 304
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != first.headers["etag"]
+    assert fresh.json()[0]["current_min_price"] == 2.0
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+
+from utilities.cron import CronSchedule, parse_cron_field
+
+
+def test_parse_cron_field():
+    assert parse_cron_field("*", 0, 5) == {0, 1, 2, 3, 4, 5}
+    assert parse_cron_field("*/15", 0, 59) == {0, 15, 30, 45}
+    assert parse_cron_field("1-3,10", 0, 23) == {1, 2, 3, 10}
+    assert parse_cron_field("5/20", 0, 59) == {5, 25, 45}
+
+
+@pytest.mark.parametrize("field", ["60", "3-1", "*/0", "a"])
+def test_parse_cron_field_rejects_invalid_fields(field):
+    with pytest.raises(ValueError):
+        parse_cron_field(field, 0, 59)
+
+
+def test_next_after_is_strictly_later():
+    schedule = CronSchedule("0 */6 * * *")
+
+    assert schedule.next_after(datetime(2026, 1, 1, 5, 59, 30)) == datetime(2026, 1, 1, 6, 0)
+    assert schedule.next_after(datetime(2026, 1, 1, 6, 0)) == datetime(2026, 1, 1, 12, 0)
+    assert schedule.next_after(datetime(2026, 1, 31, 23, 0)) == datetime(2026, 2, 1, 0, 0)
+
+
+def test_sunday_is_both_0_and_7():
+    # 2026-01-04 is a Sunday
+    assert CronSchedule("30 4 * * 0").next_after(datetime(2026, 1, 1)) == datetime(2026, 1, 4, 4, 30)
+    assert CronSchedule("30 4 * * 7").next_after(datetime(2026, 1, 1)) == datetime(2026, 1, 4, 4, 30)
+
+
+def test_restricted_day_fields_match_either_day():
+    # The 15th or any Monday, whichever comes first
+    schedule = CronSchedule("0 0 15 * 1")
+
+    assert schedule.next_after(datetime(2026, 1, 1)) == datetime(2026, 1, 5)
+    assert schedule.next_after(datetime(2026, 1, 13)) == datetime(2026, 1, 15)
+
+
+def test_invalid_expressions():
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 * *")
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 30 2 *").next_after(datetime(2026, 1, 1))
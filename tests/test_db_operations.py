@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pytest
+
+from database import db_operations
+from database.db_operations import insert_ignore_existing, mark_latest_scrapes_checked, upsert_latest_scrapes
+from database.models.models import LatestScrape, Product
+
+
+@pytest.fixture(params=["on_conflict", "fallback"])
+def dialect(request, monkeypatch):
+    # The fallback is the path of databases without INSERT ... ON CONFLICT
+    if request.param == "fallback":
+        monkeypatch.setattr(db_operations, "dialect_insert", lambda session, model: None)
+    return request.param
+
+
+def product_row(id_url, title):
+    return {"id_url": id_url, "product_name": id_url, "title": title, "product_type": "Singles", "language": "5",
+            "tcg_name": "Pokemon", "in_my_collection": False}
+
+
+def scrape(id_url, day, min_price):
+    return {"product_id_url": id_url, "scrape_date": datetime(2026, 1, day), "total_availability": 1,
+            "detailed_availability": 1, "min_price": min_price, "max_price": min_price, "avg_price": min_price}
+
+
+def test_insert_ignore_existing_keeps_stored_rows(db_session, dialect):
+    insert_ignore_existing(db_session, Product, [product_row("a", "first")])
+    insert_ignore_existing(db_session, Product, [product_row("a", "second"), product_row("b", "first"),
+                                                 product_row("b", "second")])
+    db_session.commit()
+
+    assert {product.id_url: product.title for product in db_session.query(Product)} == {"a": "first", "b": "first"}
+
+
+def test_upsert_latest_scrapes_keeps_the_newest(db_session, dialect):
+    insert_ignore_existing(db_session, Product, [product_row("a", "A"), product_row("b", "B")])
+    upsert_latest_scrapes(db_session, [scrape("a", 2, 2.0)])
+    upsert_latest_scrapes(db_session, [scrape("a", 1, 1.0), scrape("b", 1, 5.0), scrape("b", 3, 6.0)])
+    upsert_latest_scrapes(db_session, [scrape("a", 4, 4.0)])
+    db_session.commit()
+    db_session.expire_all()
+
+    latest = {row.product_id_url: (row.scrape_date.day, row.min_price) for row in db_session.query(LatestScrape)}
+    assert latest == {"a": (4, 4.0), "b": (3, 6.0)}
+
+
+def test_mark_latest_scrapes_checked_only_moves_forward(db_session):
+    insert_ignore_existing(db_session, Product, [product_row("a", "A"), product_row("b", "B")])
+    upsert_latest_scrapes(db_session, [scrape("a", 2, 2.0), scrape("b", 2, 2.0)])
+
+    mark_latest_scrapes_checked(db_session, [scrape("a", 5, 2.0), scrape("b", 1, 2.0)])
+    db_session.commit()
+    db_session.expire_all()
+
+    checked = {row.product_id_url: row.last_checked_at.day for row in db_session.query(LatestScrape)}
+    assert checked == {"a": 5, "b": 2}
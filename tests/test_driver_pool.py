@@ -0,0 +1,83 @@
+import pytest
+from selenium.common import NoSuchElementException, WebDriverException
+
+from scraping.driver_pool import DriverPool
+
+
+class StubDriver:
+    def __init__(self):
+        self.quit_called = False
+        self.alive = True
+
+    @property
+    def current_url(self):
+        if not self.alive:
+            raise WebDriverException("browser process died")
+        return "about:blank"
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def drivers():
+    return []
+
+
+@pytest.fixture
+def pool(drivers):
+    def factory():
+        drivers.append(StubDriver())
+        return drivers[-1]
+
+    return DriverPool(factory, size=1, max_pages=3, borrow_timeout=1)
+
+
+def borrow_once(pool):
+    with pool.borrow() as driver:
+        return driver
+
+
+def test_reuses_a_driver_until_max_pages(pool, drivers):
+    served = [borrow_once(pool) for _ in range(3)]
+
+    assert served == [drivers[0]] * 3
+    assert drivers[0].quit_called
+    assert borrow_once(pool) is drivers[1]
+    assert len(drivers) == 2
+
+
+def test_replaces_a_driver_that_crashed_while_borrowed(pool, drivers):
+    with pytest.raises(WebDriverException):
+        with pool.borrow():
+            raise WebDriverException("tab crashed")
+
+    assert drivers[0].quit_called
+    assert borrow_once(pool) is drivers[1]
+
+
+def test_keeps_a_driver_after_a_missing_element(pool, drivers):
+    with pytest.raises(NoSuchElementException):
+        with pool.borrow():
+            raise NoSuchElementException("no offer table")
+
+    assert not drivers[0].quit_called
+    assert borrow_once(pool) is drivers[0]
+
+
+def test_replaces_an_idle_driver_whose_browser_died(pool, drivers):
+    borrow_once(pool)
+    drivers[0].alive = False
+
+    assert borrow_once(pool) is drivers[1]
+    assert drivers[0].quit_called
+
+
+def test_close_quits_the_idle_drivers(pool, drivers):
+    borrow_once(pool)
+    pool.close()
+
+    assert drivers[0].quit_called
+    assert pool.stats()["open_sessions"] == 0
+    with pytest.raises(RuntimeError):
+        borrow_once(pool)
@@ -0,0 +1,69 @@
+import pytest
+
+from benchmarks.recorded_pages import load_pages
+from benchmarks.scraper_benchmark import SEALED_URL, SINGLES_URL
+from scraping.page_parser import build_product_data, extract_page_fields, is_product_page
+from scraping.price_statistics import compute_price_statistics
+from utilities.common import get_url_partial_params
+
+
+@pytest.fixture(scope="module")
+def pages():
+    return load_pages()
+
+
+def parse(pages, kind, url):
+    params = get_url_partial_params(url)
+    return params, extract_page_fields(pages[kind], params.product_type, params.tcg_name)
+
+
+def test_extracts_the_fields_of_a_singles_page(pages):
+    _, fields = parse(pages, "singles", SINGLES_URL)
+
+    assert is_product_page(fields)
+    assert fields["title"] == "Sylveon VMAX (BRS TG15)"
+    assert fields["subtitle"] == "Brilliant Stars Trainer Gallery"
+    assert fields["image_url"].endswith("/612345.jpg")
+    assert (fields["set_name"], fields["card_number"], fields["pokemon_species"]) == ("Brilliant Stars", "TG15",
+                                                                                      "Sylveon")
+    assert len(fields["price_texts"]) == len(fields["availability_texts"]) == 50
+    assert fields["price_texts"][0] == "34,76 €"
+
+
+def test_sealed_pages_have_no_card_fields(pages):
+    _, fields = parse(pages, "sealed", SEALED_URL)
+
+    assert is_product_page(fields)
+    assert fields["title"] == "Twilight Masquerade Booster Box"
+    assert (fields["set_name"], fields["card_number"], fields["pokemon_species"]) == ("", "", "")
+
+
+def test_build_product_data_from_a_singles_page(pages):
+    params, fields = parse(pages, "singles", SINGLES_URL)
+
+    product_data = build_product_data(params, fields, "abc")
+
+    assert product_data["id_url"] == SINGLES_URL
+    assert product_data["product_type"] == "Singles"
+    assert product_data["image_hash"] == "abc"
+    assert product_data["total_availability"] == 1482
+    assert product_data["detailed_availability"] == sum(int(text) for text in fields["availability_texts"])
+    assert product_data["offer_count"] == 50
+    assert product_data.items() >= compute_price_statistics(fields["price_texts"]).items()
+    assert product_data["min_price"] <= product_data["median_price"] <= product_data["max_price"]
+
+
+def test_build_product_data_prefers_the_captured_offers(pages):
+    params, fields = parse(pages, "sealed", SEALED_URL)
+
+    product_data = build_product_data(params, fields | {"offer_prices": [10.0, 12.0]}, None)
+
+    assert product_data["offer_count"] == 2
+    assert product_data["median_price"] == 11.0
+
+
+def test_a_page_without_offers_is_not_a_product_page():
+    fields = extract_page_fields("<html><body><h1>Access denied</h1></body></html>", "Singles", "Pokemon")
+
+    assert not is_product_page(fields)
+    assert fields["price_texts"] == []
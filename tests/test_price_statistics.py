@@ -0,0 +1,47 @@
+import numpy as np
+
+from scraping.price_statistics import legacy_prices, parse_prices, robust_statistics
+
+
+def test_parse_prices_reads_cardmarket_labels():
+    assert parse_prices(["1.234,56 €", "0,02 €", "12,00 €"]).tolist() == [1234.56, 0.02, 12.0]
+
+
+def test_parse_prices_of_an_empty_table():
+    prices = parse_prices([])
+
+    assert prices.size == 0
+    assert legacy_prices(prices) == (0, 0, 0)
+
+
+def test_parse_prices_drops_invalid_and_non_finite_labels():
+    assert parse_prices(["nan", "inf", "-inf", "", "n/d", "2,50 €"]).tolist() == [2.5]
+
+
+def test_parse_prices_keeps_one_price_per_label():
+    # Whitespace inside a label must not split it into several prices
+    assert parse_prices(["1 2", "3,00 €"]).tolist() == [3.0]
+
+
+def test_robust_statistics_of_no_offers():
+    statistics = robust_statistics(np.array([]))
+
+    assert statistics["offer_count"] == statistics["outlier_count"] == 0
+    assert statistics["median_price"] is None
+
+
+def test_robust_statistics_rejects_outliers():
+    statistics = robust_statistics(np.array([10.0, 10.5, 11.0, 9.5, 10.0, 500.0]))
+
+    assert statistics["offer_count"] == 6
+    assert statistics["outlier_count"] == 1
+    assert statistics["median_price"] == 10.0
+
+
+def test_robust_statistics_with_identical_prices():
+    statistics = robust_statistics(np.array([5.0] * 4 + [50.0]))
+
+    # A MAD of zero rejects nothing
+    assert statistics["outlier_count"] == 0
+    assert statistics["median_price"] == 5.0
+    assert statistics["mad_price"] == 0.0
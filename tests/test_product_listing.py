@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+
+from database.models.models import LatestScrape, Product
+
+PRICES = {"https://x/a": 3.0, "https://x/b": 1.0, "https://x/c": 2.0, "https://x/d": 2.0, "https://x/e": 5.0}
+
+
+@pytest.fixture
+def products(db_session):
+    for id_url, min_price in PRICES.items():
+        db_session.add(Product(id_url=id_url, product_name=id_url[-1], title=id_url[-1].upper(),
+                               product_type="Singles", language="5", tcg_name="Pokemon", set_name="S1"))
+        db_session.add(LatestScrape(product_id_url=id_url, scrape_date=datetime(2026, 1, 1), total_availability=1,
+                                    detailed_availability=1, min_price=min_price, max_price=min_price,
+                                    avg_price=min_price))
+    db_session.commit()
+
+
+def read_pages(client, **params):
+    pages = []
+    cursor = None
+    while True:
+        response = client.get("/api/products/singlesPokemon",
+                              params=params | ({"cursor": cursor} if cursor else {}))
+        assert response.status_code == 200
+        pages.append([item["id_url"] for item in response.json()])
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return pages
+
+
+def test_keyset_pages_cover_every_product_once(client, products):
+    pages = read_pages(client, limit=2, fields="id_url,current_min_price")
+
+    # Singles are listed by descending price, ties broken by descending id_url
+    assert pages == [["https://x/e", "https://x/a"], ["https://x/d", "https://x/c"], ["https://x/b"]]
+
+
+def test_no_cursor_without_a_limit(client, products):
+    response = client.get("/api/products/singlesPokemon")
+
+    assert len(response.json()) == len(PRICES)
+    assert "x-next-cursor" not in response.headers
+
+
+def test_filters_apply_to_every_page(client, products):
+    pages = read_pages(client, limit=1, min_price=2.0, max_price=3.0)
+
+    assert pages == [["https://x/a"], ["https://x/d"], ["https://x/c"]]
+
+
+def test_invalid_cursor_and_fields(client, products):
+    assert client.get("/api/products/singlesPokemon", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/products/singlesPokemon", params={"fields": "id_url,password"}).status_code == 400
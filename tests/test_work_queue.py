@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from database.models.models import ScrapeJob, ScrapeJobItem
+from scraping.work_queue import ScrapeWorkQueue
+
+URLS = ["https://x/a", "https://x/b", "https://x/c"]
+
+
+@pytest.fixture
+def job_id(db_session):
+    db_session.add(ScrapeJob(job_id="job", kind="Custom", status="pending", total_items=len(URLS), mode="queue"))
+    db_session.add_all(ScrapeJobItem(job_id="job", position=position, product_url=url, status="pending")
+                       for position, url in enumerate(URLS))
+    db_session.commit()
+    return "job"
+
+
+@pytest.fixture
+def queue():
+    return ScrapeWorkQueue(lease_seconds=60, max_attempts=2, retry_base_seconds=0)
+
+
+def expire_leases(session):
+    session.query(ScrapeJobItem).filter(ScrapeJobItem.status == "leased") \
+        .update({"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    session.commit()
+
+
+def item_states(session):
+    session.expire_all()
+    return {item.product_url: (item.status, item.attempts)
+            for item in session.query(ScrapeJobItem).order_by(ScrapeJobItem.position)}
+
+
+def test_items_are_leased_once(db_session, job_id, queue):
+    first = queue.lease("w1", 2)
+    second = queue.lease("w2", 2)
+
+    assert [url for _, url in first] == URLS[:2]
+    assert [url for _, url in second] == URLS[2:]
+    assert queue.lease("w3", 2) == []
+    assert db_session.get(ScrapeJob, job_id).status == "running"
+
+
+def test_expired_leases_are_leased_again(db_session, job_id, queue):
+    queue.lease("w1", 1)
+    expire_leases(db_session)
+
+    assert [url for _, url in queue.lease("w2", 1)] == URLS[:1]
+    assert item_states(db_session)[URLS[0]] == ("leased", 2)
+
+
+def test_expired_leases_without_attempts_left_fail(db_session, job_id, queue):
+    for _ in range(2):
+        assert [url for _, url in queue.lease("w1", 1)] == URLS[:1]
+        expire_leases(db_session)
+
+    leased = queue.lease("w2", 1)
+
+    assert [url for _, url in leased] == URLS[1:2]
+    assert item_states(db_session)[URLS[0]] == ("error", 2)
+
+
+def test_complete_retries_failures_until_the_attempts_run_out(db_session, job_id, queue):
+    for attempt in range(2):
+        (item_id, _), = queue.lease("w1", 1)
+        queue.complete("w1", item_id, {"status": "error", "message": "boom"})
+
+    assert item_states(db_session)[URLS[0]] == ("error", 2)
+
+
+def test_results_of_a_lost_lease_are_discarded(db_session, job_id, queue):
+    (item_id, _), = queue.lease("w1", 1)
+    expire_leases(db_session)
+    queue.lease("w2", 1)
+
+    queue.complete("w1", item_id, {"status": "success", "message": "late"})
+
+    assert item_states(db_session)[URLS[0]] == ("leased", 2)
+
+
+def test_drained_jobs_are_completed(db_session, job_id, queue):
+    for item_id, _ in queue.lease("w1", len(URLS)):
+        queue.complete("w1", item_id, {"status": "success", "message": "ok"})
+
+    db_session.expire_all()
+    assert db_session.get(ScrapeJob, job_id).status == "completed"
@@ -0,0 +1,261 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from utilities.metrics import CACHE_LOOKUPS
+
+logging.basicConfig(level=logging.INFO)
+
+# "memory://" keeps entries in each process, "redis://host:6379/0" shares them (and their invalidations)
+# between the API processes and the scrape workers
+CACHE_URL = os.getenv("CACHE_URL", "memory://")
+# Upper bound on the staleness of an entry whose invalidation was missed, 0 disables the cache
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+# Clients must revalidate with the ETag on every use, unchanged responses then cost a 304
+RESPONSE_CACHE_CONTROL = "private, no-cache"
+
+
+def product_category_name(product_type: str) -> str:
+    return "Singles" if product_type == "Singles" else "Sealed"
+
+
+def product_tag(product_type: str, tcg_name: str = None) -> str:
+    """
+    Tag of the cached results built from the latest scrapes of a product category, of one TCG or of all of them.
+    """
+    category = product_category_name(product_type)
+    return f"products:{tcg_name}:{category}" if tcg_name else f"products:{category}"
+
+
+def product_tags(product_type: str, tcg_name: str) -> list:
+    """
+    Tags invalidated by a new scrape of a product.
+    """
+    return [product_tag(product_type), product_tag(product_type, tcg_name)]
+
+
+def owned_tag(product_type: str) -> str:
+    return f"owned:{product_category_name(product_type)}"
+
+
+class MemoryBackend:
+    """
+    LRU of at most `max_entries` entries, each expiring `ttl` seconds after it was stored.
+    """
+    shared = False
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def tag_versions(self, tags) -> dict:
+        with self._lock:
+            return {tag: self._versions.get(tag, 0) for tag in tags}
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """
+    Entries and tag versions in Redis, shared by every process pointed at the same `url`.
+    Values must be JSON serialisable.
+    """
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "cardmarket:cache:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, value, ttl: float):
+        self.client.set(self.prefix + key, json.dumps(value), px=max(int(ttl * 1000), 1))
+
+    def tag_versions(self, tags) -> dict:
+        tags = list(tags)
+        versions = self.client.mget([f"{self.prefix}tag:{tag}" for tag in tags]) if tags else []
+        return {tag: int(version or 0) for tag, version in zip(tags, versions)}
+
+    def bump(self, tags):
+        pipeline = self.client.pipeline()
+        for tag in tags:
+            pipeline.incr(f"{self.prefix}tag:{tag}")
+        pipeline.execute()
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+def create_backend(url: str = CACHE_URL):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    return MemoryBackend()
+
+
+class Cache:
+    """
+    Tagged cache on top of a backend.
+
+    Every entry is stored with the versions its tags had before its value was computed, and
+    invalidating a tag bumps its version: entries of an older version are misses from then on,
+    including those computed while the invalidation happened. Backend errors are logged and
+    treated as misses, the cache never fails a request.
+    """
+
+    def __init__(self, backend, ttl: float = CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+
+    def versions(self, tags) -> dict:
+        try:
+            return self.backend.tag_versions(tags)
+        except Exception as e:
+            logging.error(f"Cache error reading the versions of {tags}: {e}")
+            return None
+
+    def get(self, key: str):
+        if self.ttl <= 0:
+            return None
+        try:
+            entry = self.backend.get(key)
+            if entry is not None:
+                value, versions = entry
+                if self.backend.tag_versions(list(versions)) == versions:
+                    CACHE_LOOKUPS.labels("hit").inc()
+                    return value
+        except Exception as e:
+            logging.error(f"Cache error reading {key}: {e}")
+        CACHE_LOOKUPS.labels("miss").inc()
+        return None
+
+    def set(self, key: str, value, versions: dict):
+        """
+        Store `value` under the tag `versions` read before it was computed.
+        """
+        if self.ttl <= 0 or versions is None:
+            return
+        try:
+            self.backend.set(key, [value, versions], self.ttl)
+        except Exception as e:
+            logging.error(f"Cache error storing {key}: {e}")
+
+    def get_or_compute(self, key: str, tags, compute):
+        value = self.get(key)
+        if value is None:
+            versions = self.versions(tags)
+            value = compute()
+            self.set(key, value, versions)
+        return value
+
+    def invalidate(self, *tags):
+        try:
+            self.backend.bump(tags)
+            logging.debug(f"Cache tags invalidated: {', '.join(tags)}")
+        except Exception as e:
+            logging.error(f"Cache error invalidating {tags}, their entries stay for up to {self.ttl}s: {e}")
+
+    def clear(self):
+        try:
+            self.backend.clear()
+        except Exception as e:
+            logging.error(f"Cache error clearing the entries: {e}")
+
+
+cache = Cache(create_backend())
+
+
+def warn_if_cache_not_shared(process: str):
+    """
+    Scrapes stored by `process` only invalidate its own in-process cache, the API keeps serving
+    the cached responses they change for up to CACHE_TTL_SECONDS.
+    """
+    if not cache.backend.shared and cache.ttl > 0:
+        logging.warning(f"CACHE_URL is {CACHE_URL}: the scrapes saved by the {process} do not invalidate the API "
+                        f"responses, which stay stale for up to {cache.ttl:g}s. Point CACHE_URL at Redis.")
+
+
+async def call_cache(function, *args):
+    # A shared backend is a network round trip, keep it off the event loop
+    if cache.backend.shared:
+        return await run_in_threadpool(function, *args)
+    return function(*args)
+
+
+def request_cache_key(request: Request) -> str:
+    return f"response:{request.url.path}?{urlencode(sorted(request.query_params.multi_items()))}"
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    return etag in request.headers.get("if-none-match", "")
+
+
+async def cached_response(request: Request, tags, compute) -> Response:
+    """
+    JSON response of `await compute(response)` cached under the request's path and query until
+    one of `tags` is invalidated. Headers `compute` sets on `response` are cached with the body.
+
+    The ETag is the hash of the body, a request whose If-None-Match still matches gets a 304.
+    """
+    key = request_cache_key(request)
+    entry = await call_cache(cache.get, key)
+    if entry is None:
+        versions = await call_cache(cache.versions, tags)
+        scratch = Response()
+        content = await compute(scratch)
+        body = JSONResponse(jsonable_encoder(content)).body
+        headers = {name: value for name, value in scratch.headers.items() if name != "content-length"}
+        headers["etag"] = f'"{hashlib.sha256(body).hexdigest()}"'
+        entry = {"body": body.decode(), "headers": headers}
+        await call_cache(cache.set, key, entry, versions)
+
+    headers = entry["headers"] | {"cache-control": RESPONSE_CACHE_CONTROL}
+    if not_modified(request, headers["etag"]):
+        CACHE_LOOKUPS.labels("not_modified").inc()
+        return Response(status_code=304, headers={"etag": headers["etag"], "cache-control": RESPONSE_CACHE_CONTROL})
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
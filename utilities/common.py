@@ -1,12 +1,9 @@
-import base64
-import logging
 from dataclasses import dataclass
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import urlparse, parse_qs, quote
 from fastapi import HTTPException
-from sqlalchemy import func
-from collections import defaultdict
 
-from database.models.models import Product, OwnedProduct, ScrapeData
+from database.models.models import Product
+from utilities.portfolio import get_portfolio_valuation
 
 
 @dataclass
@@ -19,12 +16,28 @@ class ProductPartialParams:
     tcg_name: str
 
 
-def encode_product_image(image_binary: bytes) -> str | None:
-    if image_binary:
-        return base64.b64encode(image_binary).decode('utf-8')
+def get_product_image_url(id_url: str, image_hash: str | None, has_legacy_image: bool = False,
+                          size: str = None) -> str | None:
+    """
+    URL of the image endpoint serving a product image, so list payloads don't carry the bytes.
+    `size` picks a pre-sized thumbnail ("list" or "detail").
+    """
+    if image_hash:
+        return f"/api/images/{image_hash}?size={size}" if size else f"/api/images/{image_hash}"
+    if has_legacy_image:
+        return f"/api/images/product?id_url={quote(id_url, safe='')}"
     return None
 
 
+def get_product_image_bytes(product: Product) -> bytes | None:
+    """
+    Image of a product: the legacy inline column if set, otherwise its cached image blob.
+    """
+    if product.image:
+        return product.image
+    return product.image_blob.data if product.image_blob else None
+
+
 def get_url_partial_params(product_url: str):
     try:
         parsed_url = urlparse(product_url)
@@ -63,56 +76,11 @@ def get_product_urls_by_product_type(sess, product_type: str):
     return [product[0] for product in products]
 
 
-def get_total_current_price(sess, product_type: str):
-    my_condition = lambda: Product.product_type == "Singles" if product_type == "Singles" \
-        else Product.product_type != "Singles"
-    # logging.info(f"Query {my_condition}")
-
-    owned_entries = (
-        sess.query(OwnedProduct)
-        .join(Product, OwnedProduct.product_id == Product.id_url)
-        .filter(my_condition())
-        .all()
-    )
-
-    product_ownership_counts = defaultdict(int)
-    for owned in owned_entries:
-        product_ownership_counts[owned.product_id] += 1
-
-    total_price = 0.0
-    for product_id_url, count in product_ownership_counts.items():
-        all_scrapes = (
-            sess.query(ScrapeData)
-            .filter_by(product_id_url=product_id_url)
-            .order_by(ScrapeData.scrape_date.desc())
-            .all()
-        )
-        latest_scrape = all_scrapes[0] if all_scrapes else None
-
-        if latest_scrape and latest_scrape.min_price:
-            total_price += count * latest_scrape.min_price
-
-    # logging.info(f"Query {product_ownership_counts}")
-
-    return total_price
-
-
-def get_total_bought_price(sess, product_type: str):
-    my_condition = lambda: Product.product_type == "Singles" if product_type == "Singles" \
-        else Product.product_type != "Singles"
-    logging.info(f"Query {my_condition}")
-
-    owned_entries = (
-        sess.query(OwnedProduct)
-        .join(Product, OwnedProduct.product_id == Product.id_url)
-        .filter(my_condition())
-        .all()
-    )
-
-    total_price = 0.0
-    for owned in owned_entries:
-        total_price += owned.buy_price
+async def get_total_current_price(session, product_type: str):
+    category = "Singles" if product_type == "Singles" else "Sealed"
+    return (await get_portfolio_valuation(session))[category]["current_value"]
 
-    logging.info(f"Query {owned_entries}")
 
-    return total_price
+async def get_total_bought_price(session, product_type: str):
+    category = "Singles" if product_type == "Singles" else "Sealed"
+    return (await get_portfolio_valuation(session))[category]["cost_basis"]
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+# (first, last) value of each of the five cron fields, day of week 7 is Sunday like 0
+CRON_FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+# Give up looking for a matching minute after this many days (e.g. "0 0 30 2 *" never fires)
+MAX_LOOKAHEAD_DAYS = 5 * 366
+
+
+def parse_cron_field(field: str, first: int, last: int) -> set:
+    """
+    Values of one cron field: "*", numbers, "a-b" ranges and "/step" on either, comma separated.
+    """
+    values = set()
+    for part in field.split(","):
+        value_range, _, step = part.partition("/")
+        if value_range == "*":
+            start, end = first, last
+        elif "-" in value_range:
+            start, end = (int(value) for value in value_range.split("-", 1))
+        else:
+            start = int(value_range)
+            end = last if step else start
+        step = int(step) if step else 1
+        if step < 1 or start < first or end > last or start > end:
+            raise ValueError(f"Invalid cron field '{field}'")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    Standard five-field cron expression (minute hour day-of-month month day-of-week).
+
+    Day of week 0 and 7 are Sunday. As in cron, when both day fields are restricted a day
+    matching either of them fires.
+    """
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expression}' must have 5 fields")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            parse_cron_field(field, first, last) for field, (first, last) in zip(fields, CRON_FIELD_RANGES)
+        )
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def matches_day(self, day: datetime) -> bool:
+        if day.month not in self.months:
+            return False
+        day_match = day.day in self.days
+        # datetime weekday() is 0 on Monday, cron's is 0 on Sunday
+        weekday_match = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_match and weekday_match
+        return day_match or weekday_match
+
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        First minute strictly after `moment` matching the schedule.
+        """
+        start = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(MAX_LOOKAHEAD_DAYS):
+            if self.matches_day(day):
+                for hour in sorted(self.hours):
+                    for minute in sorted(self.minutes):
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"Cron expression '{self.expression}' never fires")
+
+    def __repr__(self):
+        return f"CronSchedule('{self.expression}')"
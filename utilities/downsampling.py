@@ -0,0 +1,38 @@
+def lttb_indices(xs: list, ys: list, threshold: int) -> list:
+    """
+    Largest-Triangle-Three-Buckets: indices of at most `threshold` points that keep the visual
+    shape of the (xs, ys) series. The first and last points are always kept.
+    """
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        raise ValueError("LTTB needs a threshold of at least 3 points")
+
+    selected = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        bucket_start = int(i * bucket_size) + 1
+        bucket_end = int((i + 1) * bucket_size) + 1
+
+        # Average point of the next bucket, the third vertex of the triangles
+        next_start = bucket_end
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        next_count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / next_count
+        avg_y = sum(ys[next_start:next_end]) / next_count
+
+        ax, ay = xs[a], ys[a]
+        best_area = -1
+        best_index = bucket_start
+        for j in range(bucket_start, bucket_end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best_index = j
+        selected.append(best_index)
+        a = best_index
+
+    selected.append(n - 1)
+    return selected
@@ -0,0 +1,49 @@
+import logging
+import os
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+logging.basicConfig(level=logging.INFO)
+
+# Port of the /metrics server started by the standalone scraper processes, unset to disable it
+METRICS_PORT = os.getenv("METRICS_PORT")
+
+# Whole page fetches take seconds, single selectors microseconds
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+SELECTOR_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+SCRAPE_STAGE_SECONDS = Histogram(
+    "scrape_stage_seconds", "Time spent in each stage of a product scrape", ["stage"], buckets=STAGE_BUCKETS
+)
+SCRAPE_SELECTOR_SECONDS = Histogram(
+    "scrape_selector_seconds", "Time spent extracting each field from a parsed product page", ["field"],
+    buckets=SELECTOR_BUCKETS,
+)
+SCRAPE_FETCHES = Counter(
+    "scrape_fetches_total", "Product fetch attempts by outcome (success or failure kind) and error class",
+    ["outcome", "error_class"],
+)
+SCRAPE_RETRIES = Counter("scrape_retries_total", "Product fetches retried after a failure")
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "API request latency by router", ["router", "method", "status"]
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Cache lookups by result: hit, miss, or not_modified when a response's ETag matched",
+    ["result"],
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Connections of each engine's pool by state (checked_out, idle, overflow) and its size",
+    ["engine", "state"],
+)
+DB_CONNECTION_LEAKS = Counter(
+    "db_connection_leaks_total", "Connections held past DB_LEAK_WARN_SECONDS", ["engine"]
+)
+
+
+def start_metrics_server():
+    """
+    Serve /metrics on METRICS_PORT from a process without the API, e.g. worker.py.
+    """
+    if METRICS_PORT:
+        start_http_server(int(METRICS_PORT))
+        logging.info(f"Serving metrics on port {METRICS_PORT}")
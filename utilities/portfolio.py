@@ -0,0 +1,75 @@
+from sqlalchemy import func, case
+
+from database.models.models import Product, OwnedProduct, LatestScrape
+from utilities.cache import cache, call_cache, owned_tag, product_tag
+
+PORTFOLIO_TAGS = [owned_tag("Singles"), owned_tag("Sealed"), product_tag("Singles"), product_tag("Sealed")]
+
+
+def product_category():
+    return case((Product.product_type == "Singles", "Singles"), else_="Sealed")
+
+
+def compute_portfolio_valuation(sess) -> dict:
+    """
+    Current value, cost basis and P&L of the owned products, per product and per product type.
+
+    A single grouped query over owned_products joined with latest_scrapes. `buy_price` is the
+    price paid for a whole purchase, all of its `owned_qty` units, and the current value of a
+    unit is the latest minimum price.
+    """
+    rows = (
+        sess.query(
+            Product.id_url,
+            Product.title,
+            product_category().label("category"),
+            func.sum(OwnedProduct.owned_qty).label("owned_qty"),
+            func.sum(OwnedProduct.buy_price).label("cost_basis"),
+            LatestScrape.min_price,
+        )
+        .join(OwnedProduct, OwnedProduct.product_id == Product.id_url)
+        .outerjoin(LatestScrape, LatestScrape.product_id_url == Product.id_url)
+        .group_by(Product.id_url, Product.title, LatestScrape.min_price)
+        .all()
+    )
+
+    valuation = {
+        category: {"current_value": 0.0, "cost_basis": 0.0, "profit_loss": 0.0, "owned_qty": 0, "products": []}
+        for category in ("Singles", "Sealed")
+    }
+    for id_url, title, category, owned_qty, cost_basis, min_price in rows:
+        current_value = owned_qty * min_price if min_price else 0.0
+        totals = valuation[category]
+        totals["current_value"] += current_value
+        totals["cost_basis"] += cost_basis or 0.0
+        totals["owned_qty"] += owned_qty
+        totals["products"].append({
+            "id_url": id_url,
+            "title": title,
+            "owned_qty": owned_qty,
+            "current_min_price": min_price,
+            "current_value": round(current_value, 2),
+            "cost_basis": round(cost_basis or 0.0, 2),
+            "profit_loss": round(current_value - (cost_basis or 0.0), 2),
+        })
+
+    for totals in valuation.values():
+        totals["profit_loss"] = totals["current_value"] - totals["cost_basis"]
+        for key in ("current_value", "cost_basis", "profit_loss"):
+            totals[key] = round(totals[key], 2)
+    return valuation
+
+
+async def get_portfolio_valuation(session) -> dict:
+    """
+    Cached `compute_portfolio_valuation`, invalidated by any purchase or new scrape.
+
+    The cache is read from the event loop through `call_cache` and only the query runs in the
+    session's `run_sync`, a Redis round trip never blocks the loop.
+    """
+    valuation = await call_cache(cache.get, "portfolio:valuation")
+    if valuation is None:
+        versions = await call_cache(cache.versions, PORTFOLIO_TAGS)
+        valuation = await session.run_sync(compute_portfolio_valuation)
+        await call_cache(cache.set, "portfolio:valuation", valuation, versions)
+    return valuation
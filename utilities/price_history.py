@@ -0,0 +1,101 @@
+from datetime import datetime
+
+from sqlalchemy import func, case, select, literal_column
+
+from database.models.models import ScrapeData
+from utilities.downsampling import lttb_indices
+
+HISTORY_METRICS = ("min_price", "avg_price", "max_price", "detailed_availability")
+
+
+def bucket_expression(dialect: str, bucket: str):
+    """
+    SQL expression truncating scrape_date to the start of its day or ISO week (Monday).
+    """
+    if dialect == "postgresql":
+        return func.date_trunc(bucket, ScrapeData.scrape_date)
+    if bucket == "day":
+        return func.date(ScrapeData.scrape_date)
+    return func.date(ScrapeData.scrape_date, "weekday 0", "-6 days")
+
+
+def window_filters(id_url: str, start: datetime = None, end: datetime = None):
+    filters = [ScrapeData.product_id_url == id_url]
+    if start:
+        filters.append(ScrapeData.scrape_date >= start)
+    if end:
+        filters.append(ScrapeData.scrape_date < end)
+    return filters
+
+
+def get_bucketed_history(sess, id_url: str, bucket: str, start: datetime = None, end: datetime = None) -> list:
+    """
+    Daily or weekly OHLC series of every metric in HISTORY_METRICS, aggregated in SQL.
+
+    Open and close are the first and last scrape of each bucket, picked with row_number().
+    `samples` counts raw scrapes, rolled-up rows included with their sample_count.
+    """
+    dialect = sess.get_bind().dialect.name
+    bucket_column = bucket_expression(dialect, bucket).label("bucket")
+
+    ranked = (
+        select(
+            bucket_column,
+            ScrapeData.sample_count,
+            *[getattr(ScrapeData, metric) for metric in HISTORY_METRICS],
+            func.row_number().over(
+                partition_by=bucket_column, order_by=(ScrapeData.scrape_date.asc(), ScrapeData.scrape_id.asc())
+            ).label("first_rank"),
+            func.row_number().over(
+                partition_by=bucket_column, order_by=(ScrapeData.scrape_date.desc(), ScrapeData.scrape_id.desc())
+            ).label("last_rank"),
+        )
+        .where(*window_filters(id_url, start, end))
+        .subquery()
+    )
+
+    aggregates = [func.sum(ranked.c.sample_count).label("samples")]
+    for metric in HISTORY_METRICS:
+        column = ranked.c[metric]
+        aggregates += [
+            func.max(case((ranked.c.first_rank == 1, column))).label(f"{metric}_open"),
+            func.max(column).label(f"{metric}_high"),
+            func.min(column).label(f"{metric}_low"),
+            func.max(case((ranked.c.last_rank == 1, column))).label(f"{metric}_close"),
+        ]
+
+    statement = (
+        select(ranked.c.bucket, *aggregates)
+        .group_by(ranked.c.bucket)
+        .order_by(literal_column("bucket"))
+    )
+
+    series = []
+    for row in sess.execute(statement).mappings():
+        point = {"bucket": row["bucket"], "samples": row["samples"]}
+        for metric in HISTORY_METRICS:
+            point[metric] = {
+                "open": row[f"{metric}_open"],
+                "high": row[f"{metric}_high"],
+                "low": row[f"{metric}_low"],
+                "close": row[f"{metric}_close"],
+            }
+        series.append(point)
+    return series
+
+
+def get_downsampled_history(sess, id_url: str, max_points: int, start: datetime = None,
+                            end: datetime = None) -> list:
+    """
+    Raw scrapes of the window, reduced to at most `max_points` with LTTB on the min price.
+    """
+    rows = sess.execute(
+        select(ScrapeData.scrape_date, ScrapeData.avg_price, ScrapeData.min_price, ScrapeData.max_price,
+               ScrapeData.detailed_availability, ScrapeData.total_availability)
+        .where(*window_filters(id_url, start, end))
+        .order_by(ScrapeData.scrape_date.asc(), ScrapeData.scrape_id.asc())
+    ).mappings().all()
+
+    indices = lttb_indices([row["scrape_date"].timestamp() for row in rows],
+                           [row["min_price"] for row in rows], max_points)
+    return [dict(rows[index]) for index in indices]
@@ -0,0 +1,73 @@
+"""
+Scrape worker: leases the items of "queue" mode scrape jobs from the database, scrapes them
+and records the results. Run as many as needed, on any host reaching the database; a worker
+that dies only delays its leased items until their lease expires.
+
+    python worker.py [--worker-id NAME] [--concurrency N] [--batch-size N] [--once]
+
+A leased batch has to be scraped and saved within the lease, keep --batch-size small enough
+for --lease-seconds at the per-host rate limit.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+
+from fastapi.concurrency import run_in_threadpool
+
+from database.batch_writer import ScrapeBatchWriter
+from scraping.http_fetcher import close_http_client
+from scraping.scheduler import SCRAPE_CONCURRENCY, ScrapeScheduler
+from scraping.scraper import driver_pool, fetch_product_data
+from scraping.work_queue import QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS, ScrapeWorkQueue
+from utilities.cache import warn_if_cache_not_shared
+from utilities.metrics import start_metrics_server
+
+logging.basicConfig(level=logging.INFO)
+
+
+async def run_batch(queue: ScrapeWorkQueue, scheduler: ScrapeScheduler, worker_id: str, leased):
+    # URLs of a batch that could not be saved come back as errors and are retried
+    results = await scheduler.run([product_url for _, product_url in leased])
+    for (item_id, _), result in zip(leased, results):
+        await run_in_threadpool(queue.complete, worker_id, item_id, result)
+
+
+async def main(args):
+    queue = ScrapeWorkQueue(lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
+    scheduler = ScrapeScheduler(fetch=fetch_product_data, writer_factory=ScrapeBatchWriter,
+                                concurrency=args.concurrency)
+    start_metrics_server()
+    warn_if_cache_not_shared("scrape worker")
+    logging.info(f"Scrape worker {args.worker_id} started")
+    try:
+        while True:
+            leased = await run_in_threadpool(queue.lease, args.worker_id, args.batch_size)
+            if leased:
+                logging.info(f"Worker {args.worker_id} leased {len(leased)} items")
+                await run_batch(queue, scheduler, args.worker_id, leased)
+                continue
+            await run_in_threadpool(queue.close_drained_jobs)
+            if args.once:
+                break
+            await asyncio.sleep(args.idle_seconds)
+    finally:
+        scheduler.shutdown()
+        driver_pool.close()
+        close_http_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape the queued scrape jobs.")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--concurrency", type=int, default=SCRAPE_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=SCRAPE_CONCURRENCY * 2)
+    parser.add_argument("--lease-seconds", type=int, default=QUEUE_LEASE_SECONDS)
+    parser.add_argument("--max-attempts", type=int, default=QUEUE_MAX_ATTEMPTS)
+    parser.add_argument("--idle-seconds", type=float, default=10)
+    parser.add_argument("--once", action="store_true", help="Exit as soon as the queue is empty")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        logging.info("Scrape worker stopped")